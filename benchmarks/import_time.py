@@ -0,0 +1,68 @@
+""" 
+Measure how long it takes to import vic3-reader and to get a ready parser in a new process,
+like a process pool worker does. Uses `python -X importtime`.
+
+Exit code is 1 if any measure is over its limit, so it can be used to check startup stays fast.
+
+Usage:  python benchmarks/import_time.py
+
+The measured processes import vic3_reader from the src/ folder of this repository,
+so it does not need to be installed.
+"""
+
+from pathlib import Path
+import os
+import re
+import subprocess
+import sys
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Limits in seconds for each measured statement
+LIMITS = {
+    "import vic3_reader": 0.05,
+    "import vic3_reader.parser.parallel": 0.05,
+    "from vic3_reader.parser import get_parser; get_parser()": 1.0,
+}
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(statement: str):
+    """ Returns total seconds of the statement and the 5 slowest top-level imports (cumulative). """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", 
+         f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))},
+    )
+    total = float(result.stdout.strip().splitlines()[-1])
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m and len(m.group(3)) == 1:  # direct imports, not nested ones
+            top_level.append((int(m.group(2)) / 1e6, m.group(4)))
+
+    return total, sorted(top_level, reverse=True)[:5]
+
+
+def main() -> int:
+    # warm up: the first run builds Lark's parser cache and Python bytecode
+    measure("from vic3_reader.parser import get_parser; get_parser()")
+
+    failed = False
+    for statement, limit in LIMITS.items():
+        total, slowest = measure(statement)
+        status = "OK" if total <= limit else "TOO SLOW"
+        failed |= total > limit
+
+        print(f"{statement}\n    {total:.3f}s (limit {limit}s) {status}")
+        for seconds, module in slowest:
+            print(f"        {seconds:.3f}s  {module}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+""" 
+Use this script to list what changed between two saves, i.e. to debug a metric jump between two autosaves.
+
+Example:
+    python compare_saves.py saves/autosave_1.v3 saves/autosave_2.v3 --tags 5 GBR --sections country_manager
+"""
+
+import argparse
+from pathlib import Path
+
+from vic3_reader.utils.diff import diff_saves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two Victoria 3 saves section by section.")
+    parser.add_argument("old", help="Older save (plain text, cached JSON or binary).")
+    parser.add_argument("new", help="Newer save.")
+    parser.add_argument("--tags", nargs="+", help="Countries to compare: tag ids, 3 letter tags or player names.")
+    parser.add_argument("--sections", nargs="+", help="Top-level sections to compare, i.e. country_manager.")
+    parser.add_argument("--max-changes", type=int, help="Stop after this number of changes.")
+    parser.add_argument("--tokens", help="Token table file, only needed for binary saves.")
+    parser.add_argument("--output", help="Save the changes to this file (any format supported by pandas, i.e. .csv).")
+    args = parser.parse_args()
+
+    if args.tokens:
+        from vic3_reader.parser.binary import use_token_table
+        use_token_table(args.tokens)
+
+    changes = diff_saves(args.old, args.new, args.tags, args.sections, args.max_changes)
+
+    if args.output:
+        # the format is inferred from the extension, as in Orchestrator.save_long()
+        extension = Path(args.output).suffix[1:].lower()
+        if not hasattr(changes, f"to_{extension}"):
+            raise ValueError(f"Unsupported file format: {extension}")
+        getattr(changes, f"to_{extension}")(args.output, index=False)
+    else:
+        import pandas as pd
+        with pd.option_context('display.max_rows', None, 'display.max_colwidth', 60, 'display.width', 200):
+            print(changes.to_string(index=False))
+
+    print("--- %s changes ---" % len(changes))
+
+
+if __name__ == '__main__':
+    main()
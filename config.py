@@ -3,6 +3,10 @@
 
 FOLDER_SAVES = 'saves/'
 
+# Saves can be plain text or native binary saves. Binary saves need a token table file,
+# a line per token with its id and name (i.e. '0x2d82 country_manager'). None if all saves are plain text.
+TOKENS_FILE = None
+
 
 # Which format and where you want to save the results? 
 # The file extension needs to be valid for pandas (excel, ods, csv, parquet, feather, json, html, ...)
@@ -11,14 +15,88 @@ FOLDER_SAVES = 'saves/'
 FOLDER_RESULTS = 'results/'
 FILE_RESULTS = "results.csv"
 
+# SQLite database in FOLDER_RESULTS where the metrics of each save are added as soon as they are extracted
+# (i.e. "results.sqlite"). Saves already in it with the same TAGS and METRICS are not processed again,
+# and a metric can be read as a table per tag without loading all results (see vic3_reader.ResultsStore).
+# Use None to disable it.
+FILE_DATABASE = None
+
+
+# Saves that cannot be read or processed (i.e. an autosave copied while the game was writing it)
+# are skipped and listed in this csv file in FOLDER_RESULTS. Set STOP_ON_ERROR = True to stop the run instead.
+FILE_ERRORS = "errors.csv"
+STOP_ON_ERROR = False
+
+# Folder where the metrics of each save are kept as soon as they are extracted. If the run is stopped,
+# running it again only processes the saves without results. Use None to disable it.
+# Remove the folder if you change the code of a metric function, results of other TAGS or METRICS are ignored.
+FOLDER_CHECKPOINT = None
+
+
+# Skip saves that duplicate another one: same content (i.e. renamed copies) or same game date.
+# When several saves have the same game date, which one is used? "newest", "oldest" or "largest" file,
+# "all" to use all of them (repeated rows in the results) or "error" to stop and list them.
+SKIP_DUPLICATES = True
+SAME_DATE_POLICY = "newest"
+
+
+# Only for main_distributed.py: shared folder where several machines coordinate which saves each one processes.
+# Every machine must see FOLDER_SAVES and FOLDER_WORK at the same paths, i.e. in a NFS mount.
+FOLDER_WORK = 'work/'
+
+# Seconds after which a save claimed by a machine that stopped working (i.e. killed or restarted) is processed
+# by another one. Running machines refresh their claims, so it only has to be longer than a few seconds.
+# Use None to never take over claimed saves.
+LOCK_TIMEOUT = 600
+
+
+# Only for main_batch.py: processes shared by all the campaigns of a batch (None to use all CPUs).
+# Each campaign is a file like this one, with its own FOLDER_SAVES, TAGS, METRICS and results files.
+BATCH_WORKERS = None
+
+
+# Only for save_server.py: a local process that keeps parsed saves in memory for notebooks (see vic3_reader.SaveClient).
+# Address is a Unix socket path or 'host:port' (None for the default), and the least recently used saves are
+# removed over the number of saves or the memory in MB (None for no limit).
+# The memory is not measured but estimated from the size of the parsed saves, the real usage may differ.
+SERVER_ADDRESS = None
+SERVER_MAX_SAVES = None
+SERVER_ESTIMATED_MEMORY_MB = 4000
+
 
 # If you are running through the same files multiple times, you may want to set this as True to save time
 # Warning! Vic3 saves as JSON are around 500MB, be careful with your disk space
 CACHE_AS_JSON = False
 
+# Faster than the JSON: stores the saves already validated for the TAGS in use.
+# It is ignored and rewritten when the save, the TAGS or the data models change.
+TRUSTED_CACHE = False
+
+# Maximum disk space in MB for all the caches (None for no limit), and days before an unused cache is removed.
+# The least recently used caches are removed first. Caches of saves that changed or no longer exist are always removed.
+CACHE_BUDGET_MB = None
+CACHE_MAX_AGE_DAYS = None
+
+# Also store a hash of each save, so its caches are kept when the save is copied (same content, new modification time).
+# Hashing reads every save in full on each run.
+CACHE_VERIFY_HASH = False
+
+
+# How many CPU processes are used to parse each save? 
+# Each save is split in blocks parsed in parallel. Use None to use all CPUs.
+PARSE_WORKERS = 1
+
+
+# How many saves are read from disk in advance while the current one is parsed?
+# Useful when saves are in a slow or network disk. Each file read in advance is kept in memory,
+# set a limit in MB for all of them with PREFETCH_MEMORY_MB (None for no limit).
+PREFETCH_FILES = 0
+PREFETCH_MEMORY_MB = None
+
 
 # Define what metrics you want to extract importing the main functions
-# from the 'metrics' modules
+# from the 'metrics' modules. Names of groups or metrics of the registry (i.e. "population", "get_gdp") also work.
+# Only the sections of the save that the selected metrics read are parsed.
 
 from vic3_reader.metrics import get_adm, get_economy
 
@@ -32,6 +110,8 @@ METRICS = [
 
 # Hint: If you are not sure about the Tag IDs (numeric), you can explore the 
 # a plain-text save searching for "definition=" or use or 
+# You can also write 3 letter tags (i.e. "GER") or player names. These are resolved
+# to the tag ID of each save, following the country even when its tag changes.
 
 TAGS = [
     "1",      # GBR
@@ -1,15 +1,29 @@
 
 def main():
-	from config import CACHE_AS_JSON, FILE_RESULTS, FOLDER_RESULTS, FOLDER_SAVES, METRICS, TAGS
+	from config import CACHE_AS_JSON, CACHE_BUDGET_MB, CACHE_MAX_AGE_DAYS, CACHE_VERIFY_HASH, FILE_DATABASE, FILE_ERRORS, FILE_RESULTS, FOLDER_CHECKPOINT, FOLDER_RESULTS, FOLDER_SAVES, METRICS, PARSE_WORKERS, PREFETCH_FILES, PREFETCH_MEMORY_MB, SAME_DATE_POLICY, SKIP_DUPLICATES, STOP_ON_ERROR, TAGS, TOKENS_FILE, TRUSTED_CACHE
 
 
+	from pathlib import Path
 	from vic3_reader.orchestrator import Orchestrator
 
 	orchestrator = Orchestrator(
 			folder_path=FOLDER_SAVES, 
 			wanted_tags=TAGS,
 			metrics_fn=METRICS,
-			save_as_json=CACHE_AS_JSON
+			save_as_json=CACHE_AS_JSON,
+			parse_workers=PARSE_WORKERS,
+			prefetch_files=PREFETCH_FILES,
+			prefetch_memory_mb=PREFETCH_MEMORY_MB,
+			trusted_cache=TRUSTED_CACHE,
+			cache_budget_mb=CACHE_BUDGET_MB,
+			cache_max_age_days=CACHE_MAX_AGE_DAYS,
+			cache_verify_hash=CACHE_VERIFY_HASH,
+			tokens_file=TOKENS_FILE,
+			stop_on_error=STOP_ON_ERROR,
+			checkpoint_dir=FOLDER_CHECKPOINT,
+			skip_duplicates=SKIP_DUPLICATES,
+			same_date_policy=SAME_DATE_POLICY,
+			results_db=Path(FOLDER_RESULTS) / FILE_DATABASE if FILE_DATABASE else None
 			)
 
 	# You can save the table as long format (each row is a year and tag; each column is a metric. )
@@ -20,6 +34,20 @@ def main():
 	orchestrator.save_long(FILE_RESULTS, folder=FOLDER_RESULTS)
 	# orchestrator.save_multiple_sheets(FILE_RESULTS, folder=FOLDER_RESULTS)
 
+	# Saves that could not be processed are skipped and listed in FILE_ERRORS
+	if orchestrator.errors:
+		print("--- %s saves failed, see %s ---" % (len(orchestrator.errors), FILE_ERRORS))
+		orchestrator.errors_report().to_csv(Path(FOLDER_RESULTS) / FILE_ERRORS, index=False)
+
+	if orchestrator.duplicates:
+		print("--- %s duplicated saves skipped ---" % len(orchestrator.duplicates))
+
+	if orchestrator.resumed_files:
+		print("--- %s saves resumed from the checkpoint or the database ---" % len(orchestrator.resumed_files))
+
+	if orchestrator.peak_rss_mb is not None:
+		print("--- peak memory of the process: %.0f MB ---" % orchestrator.peak_rss_mb)
+
 
 if __name__ == '__main__':
 	import time
@@ -0,0 +1,69 @@
+""" 
+Use this script to process several campaigns (a saves folder each) in one run, sharing one pool of processes.
+Each campaign is a file like config.py with its own FOLDER_SAVES, TAGS, METRICS and results files.
+The biggest saves of all campaigns are processed first, so all cores stay busy until the end.
+
+Example:
+    python main_batch.py campaigns/prussia.py campaigns/usa.py --workers 8
+"""
+
+import argparse
+
+
+def load_config(path: str):
+	"""
+	Import a campaign config file as a module named after the file.
+	Its folder is added to sys.path, so the worker processes can import the metric functions defined in it.
+	"""
+	import importlib.util
+	import sys
+	from pathlib import Path
+
+	path = Path(path).resolve()
+	name = path.stem
+	loaded = sys.modules.get(name)
+	if loaded is not None:
+		if Path(getattr(loaded, '__file__', '') or '').resolve() == path:
+			return loaded
+		raise ValueError(f"The campaign config {path} has the same name as the module '{name}', rename the file.")
+
+	if str(path.parent) not in sys.path:
+		sys.path.insert(0, str(path.parent))
+
+	spec = importlib.util.spec_from_file_location(name, path)
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module		# before running it, so functions defined in it can be pickled
+	try:
+		spec.loader.exec_module(module)
+	except BaseException:
+		del sys.modules[name]
+		raise
+	return module
+
+
+def main():
+	from config import BATCH_WORKERS
+
+	from pathlib import Path
+	from vic3_reader.batch import BatchOrchestrator, Campaign
+
+	parser = argparse.ArgumentParser(description="Extract the metrics of several campaigns of Victoria 3 saves with one pool of processes.")
+	parser.add_argument("configs", nargs="+", help="Config files of the campaigns, with the variables of config.py.")
+	parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Processes of the pool. Defaults to the number of CPUs.")
+	args = parser.parse_args()
+
+	campaigns = [Campaign(load_config(path), name=Path(path).stem) for path in args.configs]
+	batch = BatchOrchestrator(campaigns, workers=args.workers)
+
+	for campaign in batch.campaigns:
+		print("--- %s: %s rows, %s saves failed, %s duplicated saves skipped, %s saves resumed ---" % (
+			campaign.name, len(campaign.metrics_df), len(campaign.errors), len(campaign.duplicates), len(campaign.resumed_files),
+			))
+
+
+if __name__ == '__main__':
+	import time
+	start = time.time()
+	main()
+	stop = time.time()
+	print("--- %s seconds ---" % (stop - start))
@@ -0,0 +1,33 @@
+""" 
+Run this script in every machine (or several times in the same machine) to share the saves between them.
+Each run claims saves through FOLDER_WORK, and the runs that finish last save the merged results.
+"""
+
+def main():
+	from config import FILE_RESULTS, FOLDER_RESULTS, FOLDER_SAVES, FOLDER_WORK, LOCK_TIMEOUT, METRICS, PARSE_WORKERS, TAGS, TOKENS_FILE
+
+
+	from vic3_reader.distributed import DistributedOrchestrator
+
+	orchestrator = DistributedOrchestrator(
+			folder_path=FOLDER_SAVES, 
+			wanted_tags=TAGS,
+			metrics_fn=METRICS,
+			work_dir=FOLDER_WORK,
+			lock_timeout=LOCK_TIMEOUT,
+			parse_workers=PARSE_WORKERS,
+			tokens_file=TOKENS_FILE
+			)
+
+	print("--- processed %s saves in this node ---" % len(orchestrator.processed_files))
+
+	# Every node waits until all saves are processed, so any of them can save the results
+	orchestrator.save_long(FILE_RESULTS, folder=FOLDER_RESULTS)
+
+
+if __name__ == '__main__':
+	import time
+	start = time.time()
+	main()
+	stop = time.time()
+	print("--- %s seconds ---" % (stop - start))
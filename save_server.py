@@ -0,0 +1,48 @@
+""" 
+Use this script to start a local server that keeps parsed saves in memory, i.e. while exploring saves in a notebook.
+Queries for saves already in memory are answered in milliseconds instead of parsing the save again.
+
+Example:
+    python save_server.py --estimated-memory-mb 8000
+
+Then, in a notebook:
+    from vic3_reader import SaveClient
+
+    client = SaveClient()
+    client.metrics("saves/autosave.v3", ["GBR", "FRA"], ["economy", "population"])
+    client.get("saves/autosave.v3", "country_manager.database.1.budget")
+"""
+
+import argparse
+
+
+def main():
+	from config import PARSE_WORKERS, SERVER_ADDRESS, SERVER_ESTIMATED_MEMORY_MB, SERVER_MAX_SAVES, TOKENS_FILE
+
+	from vic3_reader.server import SaveServer, parse_address
+
+	parser = argparse.ArgumentParser(description="Keep Victoria 3 saves in memory and answer queries from local clients.")
+	parser.add_argument("--address", default=SERVER_ADDRESS, help="Unix socket path or host:port. Defaults to a socket in ~/.vic3_reader.")
+	parser.add_argument("--max-saves", type=int, default=SERVER_MAX_SAVES, help="Maximum number of saves and sections in memory.")
+	parser.add_argument("--estimated-memory-mb", type=float, default=SERVER_ESTIMATED_MEMORY_MB, help="Maximum MB of saves in memory, estimated from the size of the parsed text.")
+	parser.add_argument("--tokens", default=TOKENS_FILE, help="Token table file, only needed for binary saves.")
+	parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="Processes used to parse each plain-text save.")
+	args = parser.parse_args()
+
+	server = SaveServer(
+			address=parse_address(args.address),
+			max_entries=args.max_saves,
+			estimated_memory_mb=args.estimated_memory_mb,
+			tokens_file=args.tokens,
+			parse_workers=args.workers,
+			)
+
+	print("--- serving saves at %s, stop it with Ctrl+C or SaveClient().shutdown() ---" % (server.address,))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,38 @@
+"""
+Entry points of vic3-reader are imported lazily, so `import vic3_reader` does not load
+pandas, pydantic or lark until they are needed.
+"""
+
+_LAZY_IMPORTS = {
+    "BatchOrchestrator": "vic3_reader.batch",
+    "Campaign": "vic3_reader.batch",
+    "DistributedOrchestrator": "vic3_reader.distributed",
+    "merge_shards": "vic3_reader.distributed",
+    "Orchestrator": "vic3_reader.orchestrator",
+    "ResultsStore": "vic3_reader.results_store",
+    "SaveClient": "vic3_reader.server",
+    "SaveMetrics": "vic3_reader.orchestrator",
+    "SaveServer": "vic3_reader.server",
+    "Vic3Reader": "vic3_reader.parser.reader",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        from importlib import import_module
+        return getattr(import_module(_LAZY_IMPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+        "BatchOrchestrator",
+        "Campaign",
+        "DistributedOrchestrator",
+        "merge_shards",
+        "Orchestrator",
+        "ResultsStore",
+        "SaveClient",
+        "SaveMetrics",
+        "SaveServer",
+        "Vic3Reader",
+        ]
@@ -0,0 +1,371 @@
+"""
+Process several campaigns (a saves folder each, with its own tags, metrics and outputs) with one pool of workers.
+
+Running an Orchestrator per campaign one after the other leaves cores idle at the end of each campaign,
+while its last big saves are parsed. Here the saves of all campaigns are jobs of a single process pool:
+the biggest saves start first, whatever their campaign, so the small ones fill the gaps at the end
+(longest processing time first scheduling). Each worker reads, parses, validates and measures a whole save.
+
+Each campaign is configured like config.py, with a module or a dictionary of the same variables:
+    FOLDER_SAVES, TAGS, METRICS                                 required
+    TOKENS_FILE, FOLDER_RESULTS, FILE_RESULTS, FILE_ERRORS,     optional, same meaning as in config.py
+    STOP_ON_ERROR, FOLDER_CHECKPOINT, FILE_DATABASE,
+    SKIP_DUPLICATES, SAME_DATE_POLICY
+
+The results of a campaign are written as soon as its last save is measured. Saves found in its checkpoint
+or results database are not processed again. The JSON and trusted caches are not written in a batch
+(existing JSON caches are read), as workers of several campaigns would update their manifests at once.
+"""
+
+from datetime import date
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from warnings import warn
+import os
+
+import pandas as pd
+
+from vic3_reader.checkpoint import Checkpoint, SaveError, errors_to_frame, run_fingerprint
+from vic3_reader.metrics.models import TagIDStr, Vic3Save
+from vic3_reader.metrics.models.basic import ProcessingWarning
+from vic3_reader.metrics.tags_and_players import SaveTags, TagIndex, needs_tag_index, scan_save_tags
+from vic3_reader.orchestrator import (
+    SaveMetrics, empty_seq_metrics_fn_error, metric_plan, needs_all_countries, none_wanted_tag_error,
+    save_long, to_long_df, validate_save,
+    )
+from vic3_reader.parser.binary import use_token_table
+from vic3_reader.parser.dedup import deduplicate_saves
+from vic3_reader.parser.prefetch import file_size
+from vic3_reader.results_store import ResultsStore
+
+missing_setting_error = "Campaign '{name}' has no {setting}, it is required in a campaign config."
+duplicated_campaign_error = "Several campaigns are named '{name}', give them different names."
+unpicklable_metrics_error = (
+    "The METRICS of campaign '{name}' cannot be sent to the worker processes: {error}." \
+    " Metric functions must be importable, i.e. defined at the top level of a module" \
+    " (see load_config() in main_batch.py for campaign files)."
+    )
+
+
+class Campaign():
+    """
+    One campaign of a batch: a saves folder measured with its own tags and metrics.
+
+    Parameters:
+    -   config: module or Dict. Variables with the names of config.py (see the top of this module).
+
+    -   name: str, optional. Name in warnings and reports. NAME in the config, or the folder name of the saves.
+
+    Attributes (after the batch runs):
+    -   self.metrics_df: long-format table with metrics (columns) per year and Tag (row multi-index),
+                    the same table an Orchestrator would build for the folder.
+
+    -   self.errors, self.resumed_files, self.duplicates, self.tag_index: as in Orchestrator.
+
+    Methods:
+    -   self.errors_report(). Table with a row per failed save: path, stage, error type and message.
+    """
+    def __init__(self, config: ModuleType | Dict[str, Any], name: Optional[str] = None):
+        if isinstance(config, dict):
+            setting = config.get
+        else:
+            setting = lambda key, default=None: getattr(config, key, default)
+
+        folder_saves = setting("FOLDER_SAVES")
+        self.name = name or setting("NAME") or (Path(folder_saves).name if folder_saves else "campaign")
+        if folder_saves is None:
+            raise ValueError(missing_setting_error.format(name=self.name, setting="FOLDER_SAVES"))
+
+        self.folder_saves = Path(folder_saves)
+        self.wanted_tags: Sequence[str] = setting("TAGS")
+        self.metrics_fn: Sequence[Callable | str] = setting("METRICS")
+        if not self.wanted_tags:
+            raise ValueError(none_wanted_tag_error)
+        if not self.metrics_fn:
+            raise ValueError(empty_seq_metrics_fn_error)
+
+        self.tokens_file = setting("TOKENS_FILE")
+        self.folder_results = setting("FOLDER_RESULTS")
+        self.file_results = setting("FILE_RESULTS")
+        self.file_errors = setting("FILE_ERRORS")
+        self.stop_on_error = setting("STOP_ON_ERROR", False)
+        self.skip_duplicates = setting("SKIP_DUPLICATES", True)
+        self.same_date_policy = setting("SAME_DATE_POLICY", "newest")
+        self.folder_checkpoint = setting("FOLDER_CHECKPOINT")
+        self.file_database = setting("FILE_DATABASE")
+
+        self.metrics_df: Optional[pd.DataFrame] = None
+        self.errors: List[SaveError] = []
+        self.resumed_files: List[Path] = []
+        self.duplicates: Dict[Path, Tuple[Path, str]] = {}
+        self.tag_index: Optional[TagIndex] = None
+        self.checkpoint: Optional[Checkpoint] = None
+        self.results_store: Optional[ResultsStore] = None
+
+    def __repr__(self) -> str:
+        return f"<Campaign {self.name} {self.folder_saves}>"
+
+    def errors_report(self) -> pd.DataFrame:
+        return errors_to_frame(self.errors)
+
+    # ─── Steps of the batch ─────────────────────────────────────────────────
+
+    def list_saves(self) -> List[Path]:
+        """ Saves of the folder without the duplicated ones. Also opens the checkpoint and results database. """
+        self.run_fingerprint = run_fingerprint(self.wanted_tags, self.metrics_fn)
+        if self.folder_checkpoint is not None:
+            self.checkpoint = Checkpoint(self.folder_checkpoint, self.run_fingerprint)
+        if self.file_database is not None:
+            self.results_store = ResultsStore(Path(self.folder_results or ".") / self.file_database)
+
+        filepaths = list(self.folder_saves.iterdir())
+        if self.skip_duplicates:
+            use_token_table(self.tokens_file)   # the dates of binary saves are read with the table of this campaign
+            filepaths, self.duplicates = deduplicate_saves(filepaths, self.same_date_policy)
+            for skipped, (kept, reason) in self.duplicates.items():
+                warn(f"[{self.name}] Skipping {skipped.name}, {reason} as {kept.name}.", ProcessingWarning)
+
+        self.filepaths = [filepath for filepath in filepaths if filepath.is_file()]
+        self._saved_metrics: List[Tuple[date, pd.DataFrame, Path]] = []
+        return self.filepaths
+
+    def restore(self, filepath: Path) -> bool:
+        """ Take the metrics of a save from the results database or the checkpoint. False if they are not there. """
+        restored = None
+        if self.results_store is not None:
+            restored = self.results_store.load(filepath, self.run_fingerprint)
+        if restored is None and self.checkpoint is not None:
+            restored = self.checkpoint.load(filepath)
+            if restored is not None and self.results_store is not None:
+                self.results_store.store(*restored, self.run_fingerprint)
+
+        if restored is None:
+            return False
+        self._saved_metrics.append(restored)
+        self.resumed_files.append(filepath)
+        return True
+
+    def resolve_tags(self, filepath: Path) -> Set[TagIDStr]:
+        """ Tag ids to measure in a save, see Orchestrator._resolve_tags(). """
+        if self.tag_index is None:
+            return {str(tag) for tag in self.wanted_tags}
+        resolved = self.tag_index.resolve_all(self.wanted_tags, filepath)
+        return {tag_id for tag_id in resolved.values() if tag_id is not None}
+
+    def add_result(self, game_date: date, df: pd.DataFrame, filepath: Path) -> None:
+        self._saved_metrics.append((game_date, df, filepath))
+        if self.checkpoint is not None:
+            self.checkpoint.store(game_date, df, filepath)
+        if self.results_store is not None:
+            self.results_store.store(game_date, df, filepath, self.run_fingerprint)
+
+    def record_error(self, error: SaveError) -> None:
+        self.errors.append(error)
+        first_line = next(iter(error.message.splitlines()), "")
+        warn(
+            f"[{self.name}] Skipping {Path(error.path).name}, it failed in the {error.stage} stage: {error.error}: {first_line}",
+            ProcessingWarning,
+        )
+        if self.checkpoint is not None:
+            self.checkpoint.write_errors(self.errors)
+
+    def finish(self) -> None:
+        """ Build the long table once every save is measured and write the outputs of the campaign. """
+        self.metrics_df = to_long_df(sorted(self._saved_metrics, key=lambda x: x[0]))
+        del self._saved_metrics
+
+        if self.file_results:
+            save_long(self.metrics_df, self.file_results, folder=self.folder_results)
+        if self.errors and self.file_errors:
+            errors_folder = Path(self.folder_results or ".")
+            errors_folder.mkdir(parents=True, exist_ok=True)
+            self.errors_report().to_csv(errors_folder / self.file_errors, index=False)
+
+
+class BatchOrchestrator():
+    """
+    Measure the saves of several campaigns with one shared pool of processes, biggest saves first.
+
+    Parameters:
+    -   campaigns: Sequence of Campaign, modules or Dicts. Configs of the campaigns, like config.py.
+
+    -   workers: int, optional. Processes of the pool, each one measures a save at a time. Defaults to the number of CPUs.
+                    Memory grows with the workers: each of them holds a whole parsed save.
+
+    Attributes:
+    -   self.campaigns: List of Campaign, with their metrics_df and errors after the run.
+
+    -   self.order: List of (campaign name, path of save) in the order the saves were sent to the pool.
+    """
+    def __init__(self, campaigns: Sequence[Campaign | ModuleType | Dict[str, Any]], workers: Optional[int] = None):
+        self.campaigns = [campaign if isinstance(campaign, Campaign) else Campaign(campaign) for campaign in campaigns]
+
+        names = [campaign.name for campaign in self.campaigns]
+        for name in names:
+            if names.count(name) > 1:
+                raise ValueError(duplicated_campaign_error.format(name=name))
+
+        for campaign in self.campaigns:
+            _check_picklable(campaign)
+
+        self.workers = workers or os.cpu_count() or 1
+        self.order: List[Tuple[str, Path]] = []
+        self._run()
+
+    def __getitem__(self, name: str) -> Campaign:
+        return next(campaign for campaign in self.campaigns if campaign.name == name)
+
+    def _run(self) -> None:
+        from concurrent.futures import ProcessPoolExecutor
+        from vic3_reader.parser import get_parser
+
+        for campaign in self.campaigns:
+            campaign.list_saves()
+
+        # each worker loads the parser once when it starts, from the disk cache
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=get_parser) as pool:
+            try:
+                self._index_tags(pool)
+                self._measure(pool)
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def _index_tags(self, pool) -> None:
+        """ Scan the saves of the campaigns with 3 letter tags or player names, in the pool. """
+        from concurrent.futures import as_completed
+
+        jobs = [
+            (campaign, filepath)
+            for campaign in self.campaigns if needs_tag_index(campaign.wanted_tags)
+            for filepath in campaign.filepaths
+        ]
+        for campaign in {campaign for campaign, _ in jobs}:
+            campaign.tag_index = TagIndex()
+
+        futures = {
+            pool.submit(scan_tags, filepath, campaign.tokens_file): (campaign, filepath)
+            for campaign, filepath in _biggest_first(jobs)
+        }
+        for future in as_completed(futures):
+            campaign, filepath = futures[future]
+            try:
+                campaign.tag_index.saves[filepath] = future.result()
+            except Exception as error:
+                if campaign.stop_on_error:
+                    raise
+                campaign.record_error(SaveError.from_exception(filepath, "tags", error))
+
+    def _measure(self, pool) -> None:
+        """ Send every save not restored to the pool, biggest first, and finish each campaign when its last save is back. """
+        from concurrent.futures import as_completed
+
+        jobs = []
+        for campaign in self.campaigns:
+            failed = {Path(error.path) for error in campaign.errors}
+            jobs += [
+                (campaign, filepath)
+                for filepath in campaign.filepaths
+                if filepath not in failed and not campaign.restore(filepath)
+            ]
+
+        futures = {}
+        for campaign, filepath in _biggest_first(jobs):
+            future = pool.submit(
+                measure_save,
+                filepath,
+                campaign.resolve_tags(filepath),
+                campaign.metrics_fn,
+                campaign.tokens_file,
+                campaign.stop_on_error,
+            )
+            futures[future] = (campaign, filepath)
+            self.order.append((campaign.name, filepath))
+
+        pending = {campaign.name: 0 for campaign in self.campaigns}
+        for campaign, _ in jobs:
+            pending[campaign.name] += 1
+        for campaign in self.campaigns:
+            if not pending[campaign.name]:
+                campaign.finish()
+
+        for future in as_completed(futures):
+            campaign, filepath = futures[future]
+            result = future.result()    # raises the error of the save if the campaign stops on errors
+
+            if isinstance(result, SaveError):
+                campaign.record_error(result)
+            else:
+                campaign.add_result(*result, filepath)
+
+            pending[campaign.name] -= 1
+            if not pending[campaign.name]:
+                campaign.finish()
+
+
+def _check_picklable(campaign: Campaign) -> None:
+    """ Raise before the pool starts if the metric functions cannot be pickled for the workers (i.e. a lambda). """
+    import pickle
+
+    try:
+        pickle.dumps(list(campaign.metrics_fn))
+    except Exception as error:
+        raise ValueError(unpicklable_metrics_error.format(name=campaign.name, error=error)) from error
+
+
+def _biggest_first(jobs: Iterable[Tuple[Campaign, Path]]) -> List[Tuple[Campaign, Path]]:
+    """ Jobs sorted by the size of the file each one reads (the cached JSON if it exists), biggest first. """
+    from vic3_reader.parser.reader import select_source
+
+    def size(job: Tuple[Campaign, Path]) -> int:
+        try:
+            return file_size(select_source(job[1], use_json=True))
+        except OSError:
+            return 0    # fails later in the worker, where the error is recorded
+
+    return sorted(jobs, key=size, reverse=True)
+
+
+def scan_tags(filepath: Path, tokens_file: Optional[Path | str] = None) -> SaveTags:
+    """ scan_save_tags() with the token table of the campaign, in a worker of the pool. """
+    use_token_table(tokens_file)
+    return scan_save_tags(filepath)
+
+
+def measure_save(
+        filepath: Path,
+        wanted_tags: Set[TagIDStr],
+        metrics_fn: Sequence[Callable | str],
+        tokens_file: Optional[Path | str] = None,
+        stop_on_error: bool = False
+        ) -> Tuple[date, pd.DataFrame] | SaveError:
+    """
+    Read, parse, validate and measure one save, in a worker of the pool.
+    Returns (game date, metrics table), or the SaveError with the stage that failed (raised if stop_on_error).
+    """
+    from vic3_reader.parser.reader import manage_parsing, read, select_source
+
+    use_token_table(tokens_file)    # the worker may have measured a save of another campaign before
+    fields = metric_plan(metrics_fn).fields
+    sections = None if fields is None else Vic3Save.sections_for(fields)
+
+    stage = "read"
+    try:
+        extension, text = read(select_source(filepath, use_json=True))
+
+        stage = "parse"
+        json_tags = wanted_tags if extension == '.json' and not needs_all_countries(fields) else None
+        data = manage_parsing(extension, text, 1, sections, json_tags)
+        del text
+
+        stage = "validate"
+        save = validate_save(data, wanted_tags, fields)
+        del data
+
+        stage = "metrics"
+        return SaveMetrics(save, wanted_tags, metrics_fn).to_dataframe()
+    except Exception as error:
+        if stop_on_error:
+            raise
+        return SaveError.from_exception(filepath, stage, error)
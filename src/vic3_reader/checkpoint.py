@@ -0,0 +1,115 @@
+"""
+Keep the results of a run on disk while it runs, so a restarted run does not process finished saves again,
+and record the saves that failed so one broken save (i.e. an autosave copied mid-write) does not stop the run.
+
+Checkpoint folder layout:
+    results/<save name>.pkl     metrics of each finished save, with the fingerprint of the save and of the run
+    errors.json                 saves that failed in the last run, with the stage and the error
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import os
+import pickle
+import threading
+import traceback
+
+import pandas as pd
+from pydantic import BaseModel
+
+ERRORS_NAME = "errors.json"
+ERROR_COLUMNS = ["path", "stage", "error", "message"]
+
+
+class SaveError(BaseModel):
+    """ A save that could not be processed: the stage that failed (read, parse, validate, metrics) and the error. """
+    path: str
+    stage: str
+    error: str
+    message: str
+    traceback: str
+
+    @classmethod
+    def from_exception(cls, filepath: Path, stage: str, error: BaseException) -> 'SaveError':
+        return cls(
+            path=str(filepath),
+            stage=stage,
+            error=type(error).__name__,
+            message=str(error),
+            traceback="".join(traceback.format_exception(error)),
+        )
+
+
+def errors_to_frame(errors: Iterable[SaveError]) -> pd.DataFrame:
+    """ Table with a row per failed save. Tracebacks are left out, see SaveError.traceback. """
+    return pd.DataFrame([error.model_dump(include=set(ERROR_COLUMNS)) for error in errors], columns=ERROR_COLUMNS)
+
+
+def run_fingerprint(wanted_tags: Iterable[str], metrics_fn: Sequence[Callable | str]) -> Dict:
+    """
+    What a checkpointed result depends on besides the save: the wanted tags and the metric functions (or names).
+    Changes inside a metric function are not detected, remove the checkpoint folder after editing one.
+    """
+    return {
+        "wanted_tags": sorted(str(tag) for tag in wanted_tags),
+        "metrics": [fn if isinstance(fn, str) else f"{fn.__module__}.{fn.__qualname__}" for fn in metrics_fn],
+    }
+
+
+def save_fingerprint(filepath: Path) -> Dict:
+    stat = filepath.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Checkpoint():
+    """
+    Checkpoint folder of a run.
+
+    Parameters:
+    -   path: Path or str. Folder for the checkpoint, created if it does not exist.
+
+    -   fingerprint: Dict. Fingerprint of the run (see run_fingerprint). Results of runs with
+                    other tags or metrics are ignored and overwritten.
+    """
+    def __init__(self, path: Path | str, fingerprint: Dict):
+        self.path = Path(path)
+        self.results = self.path / "results"
+        self.results.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+
+    def result_path(self, filepath: Path) -> Path:
+        return self.results / (filepath.name + ".pkl")
+
+    def load(self, filepath: Path) -> Optional[Tuple[date, pd.DataFrame, Path]]:
+        """ Returns the stored (game date, metrics table, path of save) if it was made by this run from this save. """
+        result_path = self.result_path(filepath)
+        if not filepath.is_file() or not result_path.is_file():
+            return None
+
+        try:
+            with open(result_path, 'rb') as f:
+                header, result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None     # a checkpoint written when the run was killed is just processed again
+
+        if header != {"run": self.fingerprint, "save": save_fingerprint(filepath)}:
+            return None
+        return result
+
+    def store(self, game_date: date, df: pd.DataFrame, filepath: Path) -> None:
+        """ Write the result of a save atomically: a killed run never leaves a partial checkpoint. """
+        header = {"run": self.fingerprint, "save": save_fingerprint(filepath)}
+        result_path = self.result_path(filepath)
+        tmp_path = result_path.with_name(f"{result_path.name}.{os.getpid()}.tmp")
+
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((header, (game_date, df, filepath)), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, result_path)
+
+    def write_errors(self, errors: List[SaveError]) -> None:
+        """ Write the error report of the run, replacing the one of the previous run. """
+        tmp_path = self.path / f"{ERRORS_NAME}.{os.getpid()}.{threading.get_ident()}.tmp"   # unique per writer
+        tmp_path.write_text(json.dumps([error.model_dump() for error in errors], indent=1), encoding='utf-8')
+        os.replace(tmp_path, self.path / ERRORS_NAME)
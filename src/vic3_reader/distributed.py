@@ -0,0 +1,363 @@
+"""
+Process a folder of saves with several machines (or processes) sharing a folder, i.e. an NFS mount.
+
+There is no broker: each node claims a save by creating its lock file atomically in a shared work folder,
+processes it and writes the result as a shard. Any node can then merge all the shards into the same
+long table that Orchestrator.metrics_df would have for the whole folder.
+
+Work folder layout:
+    locks/<save name>.lock      claimed saves, with the node that claimed them
+    locks/<save name>.lock.steal    held for a moment by the node removing an abandoned lock
+    shards/<save name>.pkl      finished saves: header, then (game date, metrics table, path of save)
+    failed/<save name>.json     saves that failed in a node (see checkpoint.SaveError), not retried by other nodes
+
+Shards and failures have a header with the fingerprints of the run (tags and metrics) and of the save,
+as the checkpoint does. A shard made by another run or from an older version of the save is not done:
+the save is processed again and its shard replaced.
+
+Nodes refresh the locks of the saves they are processing, so the lock of a node that died (i.e. killed
+or out of memory) gets old and another node claims the save after lock_timeout seconds. Only the node
+holding the steal lock of a save can remove its abandoned lock, and it checks again that the lock is the
+same old one before removing it: a lock just created by another node is never removed.
+
+Saves restored from a checkpoint or a results database by a node also get a shard, so they are merged.
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import os
+import pickle
+import socket
+import threading
+import time
+
+import pandas as pd
+
+from vic3_reader.checkpoint import SaveError, errors_to_frame, run_fingerprint, save_fingerprint
+from vic3_reader.orchestrator import Orchestrator, to_long_df
+
+DEFAULT_LOCK_TIMEOUT = 600     # seconds without refreshing a lock before it is considered abandoned
+
+
+class WorkDir():
+    """
+    Shared work folder with the locks and shards of a distributed run.
+
+    Parameters:
+    -   path: Path or str. Shared folder, created if it does not exist.
+
+    -   lock_timeout: float, optional. Seconds without refreshing a lock after which it is considered
+                    abandoned (i.e. the node crashed) and another node can claim the save. None to never steal locks.
+
+    -   fingerprint: Dict, optional. Fingerprint of the run (see checkpoint.run_fingerprint).
+                    Shards and failures of other runs are not done and not read. None to accept any run.
+    """
+    def __init__(self, path: Path | str, lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT, fingerprint: Optional[Dict] = None):
+        self.path = Path(path)
+        self.locks = self.path / "locks"
+        self.shards = self.path / "shards"
+        self.failed = self.path / "failed"
+        for folder in (self.locks, self.shards, self.failed):
+            folder.mkdir(parents=True, exist_ok=True)
+        self.lock_timeout = lock_timeout
+        self.fingerprint = fingerprint
+
+    def lock_path(self, filepath: Path) -> Path:
+        return self.locks / (filepath.name + ".lock")
+
+    def shard_path(self, filepath: Path) -> Path:
+        return self.shards / (filepath.name + ".pkl")
+
+    def failure_path(self, filepath: Path) -> Path:
+        return self.failed / (filepath.name + ".json")
+
+    def _header(self, filepath: Path) -> Dict:
+        return {"run": self.fingerprint, "save": save_fingerprint(filepath)}
+
+    def _matches(self, header: Dict, filepath: Path) -> bool:
+        """ True if a shard or failure header was written by this run for the current version of the save. """
+        if not isinstance(header, dict):    # shards written before they had a header
+            return False
+        if self.fingerprint is not None and header.get("run") != self.fingerprint:
+            return False
+        try:
+            return header.get("save") == save_fingerprint(filepath)
+        except OSError:
+            return self.fingerprint is None     # the save is gone, only merging without a run accepts it
+
+    def _read_shard(self, shard: Path) -> Optional[Tuple[Dict, Tuple[date, pd.DataFrame, Path]]]:
+        try:
+            with open(shard, 'rb') as f:
+                header = pickle.load(f)
+                return header, pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+
+    def _shard_header(self, filepath: Path) -> Optional[Dict]:
+        """ Header of the shard of a save, without loading its metrics table. None if there is no readable shard. """
+        try:
+            with open(self.shard_path(filepath), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+
+    def _read_failure(self, failure: Path) -> Optional[Tuple[Dict, SaveError]]:
+        try:
+            content = json.loads(failure.read_text(encoding='utf-8'))
+            return content["header"], SaveError.model_validate(content["error"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def is_done(self, filepath: Path) -> bool:
+        """ True if the save has a shard or failed in some node, in this run and for its current version. """
+        header = self._shard_header(filepath)
+        if header is not None and self._matches(header, filepath):
+            return True
+        failure = self._read_failure(self.failure_path(filepath))
+        return failure is not None and self._matches(failure[0], filepath)
+
+    def claim(self, filepath: Path, node_id: str) -> bool:
+        """
+        Try to claim a save for this node. Returns True if this node got it.
+        Creating the lock with O_CREAT | O_EXCL is atomic, so only one node can succeed.
+        """
+        if self.is_done(filepath):
+            return False
+
+        lock = self.lock_path(filepath)
+        self._steal_if_abandoned(lock, node_id)
+
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{node_id}\n{time.time()}\n")
+
+        if self.is_done(filepath):     # finished by another node between the check and the lock
+            self.release(filepath)
+            return False
+        return True
+
+    def _is_abandoned(self, lock: Path) -> Optional[os.stat_result]:
+        """ The stat of the lock if it was not refreshed for lock_timeout seconds, else None. """
+        try:
+            stat = lock.stat()
+        except FileNotFoundError:
+            return None
+        return stat if time.time() - stat.st_mtime > self.lock_timeout else None
+
+    def _steal_if_abandoned(self, lock: Path, node_id: str) -> None:
+        """
+        Remove an abandoned lock so the save can be claimed again.
+        Nodes steal one at a time, holding the steal lock (created with O_CREAT | O_EXCL) while they check the
+        lock again and remove it. A lock refreshed or created by another node in between is left alone.
+        """
+        if self.lock_timeout is None or self._is_abandoned(lock) is None:
+            return
+
+        steal = lock.with_name(lock.name + ".steal")
+        if self._is_abandoned(steal) is not None:
+            steal.unlink(missing_ok=True)   # left by a node that died while stealing, held for a moment otherwise
+        try:
+            fd = os.open(steal, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return      # another node is stealing it
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f"{node_id}\n")
+            if self._is_abandoned(lock) is not None:   # not released, refreshed or replaced meanwhile
+                lock.unlink(missing_ok=True)
+        finally:
+            steal.unlink(missing_ok=True)
+
+    def release(self, filepath: Path) -> None:
+        self.lock_path(filepath).unlink(missing_ok=True)
+
+    def refresh(self, filepath: Path) -> None:
+        """ Update the time of the lock of a save being processed, so other nodes do not take it as abandoned. """
+        try:
+            os.utime(self.lock_path(filepath))
+        except FileNotFoundError:
+            pass
+
+    def write_shard(self, game_date: date, df: pd.DataFrame, filepath: Path) -> None:
+        """ Write the result of a save atomically: other nodes never see a partial shard. """
+        shard = self.shard_path(filepath)
+        tmp_path = shard.with_name(f"{shard.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self._header(filepath), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((game_date, df, filepath), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, shard)
+
+    def write_failure(self, error: SaveError) -> None:
+        """ Mark a save as failed so other nodes do not wait for it or process it again. """
+        filepath = Path(error.path)
+        failure = self.failure_path(filepath)
+        tmp_path = failure.with_name(f"{failure.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+        content = {"header": self._header(filepath), "error": error.model_dump()}
+        tmp_path.write_text(json.dumps(content, indent=1), encoding='utf-8')
+        os.replace(tmp_path, failure)
+
+    def read_failures(self) -> List[SaveError]:
+        """ Errors of the saves that failed in any node, in this run and for their current version. """
+        errors = []
+        for path in sorted(self.failed.glob("*.json")):
+            failure = self._read_failure(path)
+            if failure is not None and self._matches(failure[0], Path(failure[1].path)):
+                errors.append(failure[1])
+        return errors
+
+    def read_shards(self, filepaths: Optional[Iterable[Path]] = None) -> List[Tuple[date, pd.DataFrame, Path]]:
+        """
+        Read the shards of the given saves (all shards if None), sorted by game date.
+        Shards of other runs or of older versions of the saves are left out.
+        """
+        if filepaths is None:
+            shard_paths = sorted(self.shards.glob("*.pkl"))
+        else:
+            shard_paths = [self.shard_path(filepath) for filepath in filepaths if self.shard_path(filepath).is_file()]
+
+        saved_metrics = []
+        for shard in shard_paths:
+            read_shard = self._read_shard(shard)
+            if read_shard is None:
+                continue
+            header, result = read_shard
+            if self._matches(header, Path(result[2])):
+                saved_metrics.append(result)
+
+        return sorted(saved_metrics, key=lambda x: x[0])
+
+
+class DistributedOrchestrator(Orchestrator):
+    """
+    Orchestrator that shares the saves of a folder with other nodes through a shared work folder.
+
+    Every node runs the same DistributedOrchestrator over the same saves folder. Each save is processed
+    by the node that claims it and its result is written as a shard. With wait_for_all=True, the node
+    keeps claiming until every save has a shard, and self.metrics_df is the merge of all shards:
+    the same table a single Orchestrator would build for the whole folder.
+
+    Parameters (plus the ones of Orchestrator):
+    -   work_dir: Path or str. Shared work folder for locks and shards.
+
+    -   node_id: str, optional. Name of this node in the locks. Defaults to hostname-pid.
+
+    -   wait_for_all: bool, default True. Wait for other nodes to finish before merging.
+                    If False, self.metrics_df only merges the shards that exist when this node runs out of work.
+
+    -   poll_seconds: float, default 5. Seconds between checks while waiting for other nodes.
+
+    -   lock_timeout: float, default 600. Seconds without refreshing a lock after which the save can be
+                    claimed again. Locks are refreshed every third of it while a save is processed,
+                    so only locks of nodes that died get old. None to never claim locked saves again.
+    """
+    def __init__(
+            self,
+            folder_path: Path | str,
+            wanted_tags,
+            metrics_fn,
+            work_dir: Path | str,
+            node_id: Optional[str] = None,
+            wait_for_all: bool = True,
+            poll_seconds: float = 5,
+            lock_timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT,
+            **kwargs
+            ):
+        self.work_dir = WorkDir(work_dir, lock_timeout, run_fingerprint(wanted_tags, metrics_fn))
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.wait_for_all = wait_for_all
+        self.poll_seconds = poll_seconds
+        self.processed_files: List[Path] = []
+
+        super().__init__(folder_path, wanted_tags, metrics_fn, **kwargs)
+
+    def _claimed_files(self, filepaths: Sequence[Path]) -> Iterator[Path]:
+        """ Yields the saves this node claims, until none is left (or until every save is done if waiting). """
+        filepaths = [filepath for filepath in filepaths if filepath.is_file()]
+
+        while True:
+            for filepath in filepaths:
+                if self.work_dir.claim(filepath, self.node_id):
+                    yield filepath
+
+            pending = [filepath for filepath in filepaths if not self.work_dir.is_done(filepath)]
+            if not pending or not self.wait_for_all:
+                return
+            time.sleep(self.poll_seconds)
+
+    def _run_pipeline(self, filepaths: Iterable[Path]) -> Iterator[Tuple[date, pd.DataFrame, Path]]:
+        claimed = self._claimed_files(list(filepaths))
+        results = super()._run_pipeline(_track(claimed, self._claimed))
+        stop_heartbeat = self._start_heartbeat()
+        try:
+            for game_date, df, filepath in results:
+                self.work_dir.write_shard(game_date, df, filepath)
+                self.work_dir.release(filepath)
+                self._claimed.discard(filepath)
+                self.processed_files.append(filepath)
+                yield game_date, df, filepath
+        finally:
+            stop_heartbeat.set()
+            for filepath in self._claimed:     # let other nodes retry saves this node could not finish
+                self.work_dir.release(filepath)
+            self._claimed.clear()
+
+    def _start_heartbeat(self) -> threading.Event:
+        """ Refresh the locks of the claimed saves in a thread until the returned event is set. """
+        stop = threading.Event()
+        if self.work_dir.lock_timeout is None:
+            return stop
+
+        def heartbeat():
+            while not stop.wait(self.work_dir.lock_timeout / 3):
+                for filepath in tuple(self._claimed):
+                    self.work_dir.refresh(filepath)
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        return stop
+
+    def _parse_files(self):
+        self._claimed = set()
+        super()._parse_files()
+
+    def _restore(self, filepath: Path) -> Optional[Tuple[date, pd.DataFrame, Path]]:
+        """ Saves restored from the checkpoint or results database are not processed, their shard is written here. """
+        restored = super()._restore(filepath)
+        if restored is not None and not self.work_dir.is_done(filepath):
+            self.work_dir.write_shard(*restored)
+        return restored
+
+    def _record_error(self, filepath: Path, stage: str, error: Exception) -> None:
+        super()._record_error(filepath, stage, error)
+        self.work_dir.write_failure(self.errors[-1])
+
+    def errors_report(self) -> pd.DataFrame:
+        """ Table with a row per save that failed in any node. """
+        return errors_to_frame(self.work_dir.read_failures())
+
+    def _get_df_long_from_files(self):
+        """ Merge the shards of every save in the folder, not only the ones processed by this node. """
+        self._saved_metrics = self.work_dir.read_shards(self._files_generator)
+        return super()._get_df_long_from_files()
+
+
+def _track(filepaths: Iterator[Path], claimed: set) -> Iterator[Path]:
+    for filepath in filepaths:
+        claimed.add(filepath)
+        yield filepath
+
+
+def merge_shards(work_dir: Path | str, wanted_tags: Optional[Iterable[str]] = None, metrics_fn: Optional[Sequence] = None) -> pd.DataFrame:
+    """
+    Merge the shards of a work folder into a long table like Orchestrator.metrics_df.
+    With wanted_tags and metrics_fn, only the shards made with them are merged.
+    """
+    fingerprint = None
+    if wanted_tags is not None and metrics_fn is not None:
+        fingerprint = run_fingerprint(wanted_tags, metrics_fn)
+    return to_long_df(WorkDir(work_dir, fingerprint=fingerprint).read_shards())
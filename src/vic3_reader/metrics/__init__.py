@@ -1,12 +1,20 @@
 from vic3_reader.metrics.administrative import get_adm
+from vic3_reader.metrics.buildings import get_buildings
 from vic3_reader.metrics.economy import get_economy
-from vic3_reader.metrics.tags_and_players import get_tag_data, TAGS
+from vic3_reader.metrics.markets import extract_market_metrics, get_market
+from vic3_reader.metrics.population import get_population
+from vic3_reader.metrics.tags_and_players import get_tag_data, TagIndex, TAGS
 from vic3_reader.metrics.metadata import get_game_date
 
 __all__ = [
+        "extract_market_metrics",
         "get_adm", 
+        "get_buildings",
         "get_economy",
         "get_game_date",
+        "get_market",
+        "get_population",
         "get_tag_data",
+        "TagIndex",
         "TAGS",
         ]
\ No newline at end of file
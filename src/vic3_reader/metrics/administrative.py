@@ -4,18 +4,22 @@ from typing import Callable, Dict, Sequence
 
 from vic3_reader.metrics.models import Country, TagIDStr, Vic3Save
 from vic3_reader.metrics.models.basic import warning_more_than_one_channel
+from vic3_reader.metrics.registry import group_function, metric
 
 
+@metric("adm", inputs=("country",), reads=("country_manager.database.prestige",), keys=("prestige",))
 def get_prestige(country: Country) -> Dict:
     warning_more_than_one_channel(country.prestige)
     return {"prestige": country.prestige.channels[0].values[-1]}
 
 
+@metric("adm", inputs=("country",), reads=("country_manager.database.literacy",), keys=("literacy",))
 def get_literacy(country: Country) -> Dict:
     warning_more_than_one_channel(country.literacy)
     return {"literacy": country.literacy.channels[0].values[-1]}
 
 
+@metric("adm", inputs=("country",), reads=("country_manager.database.infamy",), keys=("infamy",))
 def get_infamy(country: Country) -> Dict:
     return {'infamy': country.infamy}
 
@@ -27,6 +31,7 @@ ADM_FN = [
     ]
 
 
+@group_function("adm", members=ADM_FN)
 def get_adm(data: 'Vic3Save', 
             tag_id: TagIDStr,
             functions: Sequence[Callable] = ADM_FN
@@ -0,0 +1,121 @@
+"""Functions to extract Victoria 3 data in a save related to buildings and construction, aggregated per building type."""
+
+from typing import Callable, Dict, Sequence
+
+import pandas as pd
+
+from vic3_reader.metrics.models import TagIDStr, Vic3Save
+from vic3_reader.metrics.registry import group_function, metric
+
+
+def short_type(building_type: str) -> str:
+    """ 'building_iron_mine' -> 'iron_mine', to keep metric names under the 31 char limit of Excel sheets """
+    return building_type[len("building_"):] if building_type.startswith("building_") else building_type
+
+
+def aggregate_construction(data: 'Vic3Save') -> pd.DataFrame:
+    """
+    Construction queues of all countries aggregated per (country, building type).
+    Computed once per save with a vectorized group-by.
+
+    Returns:
+        pd.DataFrame indexed by (country, type) with columns 
+        'queued', 'construction_left', 'construction_speed', 'base_construction_speed'.
+    """
+    if data.construction is None:
+        raise ValueError("The save data has no construction queues to aggregate.")
+
+    cache = data.construction._cache
+    if "by_type" not in cache:
+        grouped = data.construction.frame.groupby(["country", "type"], observed=True)
+        cache["by_type"] = grouped.agg(
+            queued=("type", "size"),
+            construction_left=("construction_left", "sum"),
+            construction_speed=("construction_speed", "sum"),
+            base_construction_speed=("base_construction_speed", "sum"),
+        )
+    return cache["by_type"]
+
+
+def aggregate_building_levels(data: 'Vic3Save') -> pd.Series:
+    """
+    Existing building levels of all countries per (country, building type).
+    The owner of a building is the owner of its state.
+    """
+    if data.building_manager is None or data.states is None:
+        raise ValueError("The save data has no 'building_manager' or 'states' sections to aggregate.")
+
+    cache = data.building_manager._cache
+    if "levels" not in cache:
+        buildings = data.building_manager.frame
+        owners = buildings["state"].map(data.states.frame["country"]).astype("category")
+        cache["levels"] = buildings["levels"].groupby([owners.rename("country"), buildings["type"]], observed=True).sum()
+    return cache["levels"]
+
+
+@metric("buildings", reads=("construction",), prefixes=("queued_", "left_"))
+def get_construction_by_type(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    by_type = aggregate_construction(data)
+    if tag_id not in by_type.index.get_level_values("country"):
+        return {}
+
+    metrics = {}
+    for building_type, row in by_type.loc[tag_id].iterrows():
+        metrics[f"queued_{short_type(building_type)}"] = row["queued"]
+        metrics[f"left_{short_type(building_type)}"] = row["construction_left"]
+    return metrics
+
+
+@metric("buildings", reads=("construction",), keys=("construction_left", "construction_queued"))
+def get_remaining_construction(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    by_type = aggregate_construction(data)
+    if tag_id not in by_type.index.get_level_values("country"):
+        return {"construction_left": 0.0, "construction_queued": 0}
+
+    country = by_type.loc[tag_id]
+    return {
+        "construction_left": country["construction_left"].sum(),
+        "construction_queued": country["queued"].sum(),
+    }
+
+
+@metric("buildings", reads=("building_manager", "states"), prefixes=("levels_",))
+def get_building_levels(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    levels = aggregate_building_levels(data)
+    if tag_id not in levels.index.get_level_values("country"):
+        return {}
+    return {f"levels_{short_type(building_type)}": value for building_type, value in levels.loc[tag_id].items()}
+
+
+BUILDINGS_FN = [
+        get_construction_by_type,
+        get_remaining_construction,
+        get_building_levels,
+    ]
+
+
+@group_function("buildings", members=BUILDINGS_FN)
+def get_buildings(data: 'Vic3Save', 
+                  tag_id: TagIDStr,
+                  functions: Sequence[Callable] = BUILDINGS_FN
+                  ) -> Dict:
+    """
+    Extract the construction and building metrics of a country per building type.
+    Aggregations run once per save for all countries and each tag only looks up its rows.
+    
+    Args:
+        data: Vic3Save - Parsed Vic3 save information.
+        tag_id: TagIDStr - The tag ID for a country in the database.
+        functions (Opt): each function define how to extract one or semantically grouped metrics. 
+            The expected output is to be a Dict['metric name', 'value']
+        
+    Returns:
+        Dict ['metric name', 'value'] with all metrics collected in the module.
+
+    """
+    merged = {}  # Warning: same keys are overriden
+
+    for func in functions:
+        merged.update(func(data, tag_id))
+
+    return merged
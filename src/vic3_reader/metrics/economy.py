@@ -1,10 +1,13 @@
 """Functions to extract Victoria 3 data in a save related to economy."""
 
-from typing import Callable, Dict, Sequence
+from typing import Callable, Dict, Sequence, Tuple
+
+import pandas as pd
 
 from vic3_reader.metrics.models import Country, TagIDStr, Vic3Save
-from vic3_reader.metrics.models.country_database import ConstructionElement
 from vic3_reader.metrics.models.basic import warning_more_than_one_channel
+from vic3_reader.metrics.models.country_database import Budget, PopStats
+from vic3_reader.metrics.registry import group_function, metric
 
 # principal, credit, money
 # gpd
@@ -12,36 +15,43 @@ from vic3_reader.metrics.models.basic import warning_more_than_one_channel
 # construction
 # avgsol
 
+@metric("economy", inputs=("country",), reads=("country_manager.database.budget",), keys=tuple(Budget.model_fields))
 def get_budget(country: Country) -> Dict:
     return country.budget.model_dump()
 
 
+@metric("economy", inputs=("country",), reads=("country_manager.database.gdp",), keys=("gpd",))
 def get_gdp(country: Country) -> Dict:
     warning_more_than_one_channel(country.gdp)
     return {"gpd": country.gdp.channels[0].values[-1]}
 
 
+@metric("economy", inputs=("country",), reads=("country_manager.database.pop_statistics",), keys=tuple(PopStats.model_fields))
 def get_pop(country: Country) -> Dict:
     return country.pop_statistics.model_dump()
 
 
+@metric("economy", inputs=("country",), reads=("country_manager.database.avgsoltrend",), keys=("avgsoltrend",))
 def get_avgsol(country: Country) -> Dict:
     warning_more_than_one_channel(country.avgsoltrend)
     return {"avgsoltrend": country.avgsoltrend.channels[0].values[-1]}
 
 
-def get_construction(construction_queue: Sequence[ConstructionElement]) -> Dict:
+def get_construction(construction_queue: pd.DataFrame) -> Tuple[float, float]:
     # Construction is not a metric number, we need to check those buildings
     # currently being active in construction and sum the speed of all
-    total_base_speed = 0
-    total_speed = 0
-
-    for elem in construction_queue:
-        total_base_speed += elem.base_construction_speed
-        total_speed += elem.construction_speed
+    total_speed = float(construction_queue["construction_speed"].sum())
+    total_base_speed = float(construction_queue["base_construction_speed"].sum())
 
     return (total_speed, total_base_speed)
-        
+
+
+@metric(
+        "economy",
+        inputs=("country",),
+        reads=("country_manager.database.government_queue", "country_manager.database.private_queue"),
+        keys=("gov_base_construction", "gov_final_construction", "priv_base_construction", "priv_final_construction"),
+        )
 def get_total_construction(country: Country) -> Dict:
     # Construction can be split between government and private queues. 
     # The total base_contruction of both will be what the player see in the right top corner in the game
@@ -69,6 +79,7 @@ ECONOMY_FN = [
     ]
 
 
+@group_function("economy", members=ECONOMY_FN)
 def get_economy(data: 'Vic3Save', 
                 tag_id: TagIDStr,
                 functions: Sequence[Callable] = ECONOMY_FN
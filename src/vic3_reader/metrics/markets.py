@@ -0,0 +1,189 @@
+"""Functions to extract Victoria 3 data in a save related to markets and goods."""
+
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+from datetime import date
+from warnings import warn
+
+import pandas as pd
+
+from vic3_reader.metrics.models import TagIDStr, Vic3Save
+from vic3_reader.metrics.models.basic import ProcessingWarning
+from vic3_reader.metrics.models.markets import GOODS_COLUMNS, markets_to_frame
+from vic3_reader.metrics.metadata import get_game_date
+from vic3_reader.metrics.registry import group_function, metric
+from vic3_reader.metrics.tags_and_players import TagIndex, needs_tag_index
+
+missing_section_error = "{name} has no '{section}' section, its markets cannot be read."
+
+
+def goods_of_market(markets: pd.DataFrame, market_id: int) -> Dict:
+    """ Flatten the goods rows of a market as {'price_grain': ..., 'supply_grain': ..., ...} """
+    rows = markets[markets["market"] == market_id]
+    metrics = {}
+    for column in GOODS_COLUMNS:
+        metrics.update(zip(column + "_" + rows["goods"].astype(str), rows[column].tolist()))
+    return metrics
+
+
+@metric(
+        "market",
+        reads=("country_manager.database.market", "market_manager"),
+        prefixes=tuple(f"{column}_" for column in GOODS_COLUMNS),
+        )
+def get_market_goods(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    """ Price, supply and demand of every goods in the market the country belongs to. """
+    country = data.country_manager.database[tag_id]
+    if not country or data.market_manager is None:
+        return {}
+    return goods_of_market(data.market_manager.frame, country.market)
+
+
+MARKET_FN = [
+        get_market_goods,
+    ]
+
+
+@group_function("market", members=MARKET_FN)
+def get_market(data: 'Vic3Save', 
+               tag_id: TagIDStr,
+               functions: Sequence[Callable] = MARKET_FN
+               ) -> Dict:
+    """
+    Extract the market metrics of a country from the market_manager section of the save.
+    
+    Args:
+        data: Vic3Save - Parsed Vic3 save information.
+        tag_id: TagIDStr - The tag ID for a country in the database.
+        functions (Opt): each function define how to extract one or semantically grouped metrics. 
+            The expected output is to be a Dict['metric name', 'value']
+        
+    Returns:
+        Dict ['metric name', 'value'] with all metrics collected in the module.
+
+    """
+    merged = {}  # Warning: same keys are overriden
+
+    for func in functions:
+        merged.update(func(data, tag_id))
+
+    return merged
+
+
+# ─── Projection: markets without parsing the whole save ─────────────────────
+
+def read_market_section(
+        path: Path, 
+        wanted_tags: Set[TagIDStr], 
+        content: Optional[Tuple[str, str | bytes]] = None
+        ) -> Tuple[date, Dict[TagIDStr, int], pd.DataFrame]:
+    """
+    Read only the date, the market of each wanted country and the market_manager section of a save.
+    Plain-text saves are scanned and only the market database is parsed. JSON and binary saves only
+    decode these sections (and only the wanted countries of a JSON).
+    `content` is the (extension, text) of the save if it was already read with read(path).
+
+    Countries without a market are left out.
+    Raises ValueError if the save has no date or no country_manager database.
+
+    Returns:
+        (game date, {tag id: market id}, table with a row per market and goods)
+    """
+    from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read
+
+    extension, text = read(path) if content is None else content
+
+    if extension in ('.json', BINARY_SUFFIX):
+        sections = {'date', 'country_manager', 'market_manager'}
+        data = manage_parsing(extension, text, sections=sections, wanted_tags=set(wanted_tags))
+        del text
+        country_manager = data.get('country_manager')
+        database = country_manager.get('database') if isinstance(country_manager, dict) else None
+        if 'date' not in data:
+            raise ValueError(missing_section_error.format(name=path.name, section='date'))
+        if not isinstance(database, dict):
+            raise ValueError(missing_section_error.format(name=path.name, section='country_manager.database'))
+
+        country_markets = {
+            TagIDStr(tag_id): int(database[tag_id]['market'])
+            for tag_id in wanted_tags if isinstance(database.get(tag_id), dict) and 'market' in database[tag_id]
+        }
+        market_manager = data.get('market_manager')
+        markets = market_manager.get('database', {}) if isinstance(market_manager, dict) else {}
+        return (
+            get_game_date(data['date'])['game_date'], 
+            country_markets, 
+            markets_to_frame(markets if isinstance(markets, dict) else {}),
+            )
+
+    from vic3_reader.parser import scanner
+
+    span = scanner.find_key(text, 'date')
+    if span is None:
+        raise ValueError(missing_section_error.format(name=path.name, section='date'))
+    game_date = scanner.atom(text, span)
+
+    country_markets = {}
+    span = scanner.find_path(text, ('country_manager', 'database'))
+    if span is None:
+        raise ValueError(missing_section_error.format(name=path.name, section='country_manager.database'))
+    for tag_id, start, end in scanner.iter_pairs(text, *scanner.inner(span)):
+        if tag_id in wanted_tags and text[start] == '{':
+            market = scanner.find_key(text, 'market', *scanner.inner((start, end)))
+            if market:
+                country_markets[TagIDStr(tag_id)] = int(scanner.atom(text, market))
+
+    span = scanner.find_path(text, ('market_manager', 'database'))
+    database = scanner.parse_span(text, span) if span else {}
+    if not isinstance(database, dict):  # an empty block is parsed as a list
+        database = {}
+
+    return get_game_date(game_date)['game_date'], country_markets, markets_to_frame(database)
+
+
+def extract_market_metrics(paths: Iterable[Path], wanted_tags: Iterable[str]) -> pd.DataFrame:
+    """
+    Build a long table of market goods for the wanted countries over several saves,
+    reading only the needed sections of each save.
+
+    Wanted tags can be tag ids, 3 letter tags or player names, resolved in each save with a TagIndex
+    as the Orchestrator does. Tags not found in any save are skipped with a warning.
+
+    Returns:
+        MultiIndex (game_date, tag_id) dataframe with a column per goods metric, 
+        in the same format as Orchestrator.metrics_df so both can be joined.
+    """
+    from vic3_reader.orchestrator import to_long_df     # not at the top, the orchestrator imports the metrics
+    from vic3_reader.parser.reader import read
+
+    paths = [Path(path) for path in paths if Path(path).is_file()]
+    wanted_tags = [str(tag) for tag in wanted_tags]
+    # each save is scanned for tags from the text read for its markets, see TagIndex
+    tag_index = TagIndex(pending=paths) if needs_tag_index(wanted_tags) else None
+
+    saved_metrics = []      # a list, several saves can have the same game date
+    unresolved = set()
+
+    for path in paths:
+        content = read(path)
+        tag_ids = set(wanted_tags)
+        if tag_index is not None:
+            if path not in tag_index.saves:
+                tag_index.add_save(path, content)
+            resolved = tag_index.resolve_all(wanted_tags, path)
+            unresolved.update(wanted for wanted, tag_id in resolved.items() if tag_id is None)
+            tag_ids = {tag_id for tag_id in resolved.values() if tag_id is not None}
+
+        game_date, country_markets, markets = read_market_section(path, tag_ids, content)
+        del content
+        df = pd.DataFrame.from_dict(
+            {tag_id: goods_of_market(markets, market) for tag_id, market in country_markets.items()}, 
+            orient='index',
+            ).rename_axis("tag_id")
+        saved_metrics.append((game_date, df, path))
+
+    for wanted in sorted(unresolved):
+        warn(f"Tag or player '{wanted}' was not found in any save. Skipping it.", ProcessingWarning)
+
+    # to_long_df returns an empty (game_date, tag_id) table when there is nothing to read
+    return to_long_df(sorted(saved_metrics, key=lambda x: x[0]))
@@ -1,8 +1,13 @@
+from typing import ClassVar, Dict, Optional, Set
+
+from .buildings import BuildingTable, ConstructionTable
 from .country_database import Country, CountryManager
+from .markets import MarketTable
+from .population import PopTable, StateTable
 from pydantic import ValidationError
 from .basic import TagIDStr
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 class Vic3Save(BaseModel):
     """ 
@@ -17,10 +22,53 @@ class Vic3Save(BaseModel):
     in the database for country_manager object in vic3 saves.
 
     Do this before validating the model. It is a class var. Only need to do it once at runtime.
+
+    The 'pops', 'states', 'market_manager', 'building_manager' sections and the construction queues
+    of all countries are loaded as columnar tables (see population.py, markets.py, buildings.py) 
+    instead of a model per entry, as they hold hundreds of thousands of entries.
+    Each table is built the first time a metric reads it, so validating the whole save does not build them.
     
     """
     date: str
     country_manager: CountryManager
+    pops: Optional[PopTable] = None
+    states: Optional[StateTable] = None
+    market_manager: Optional[MarketTable] = None
+    building_manager: Optional[BuildingTable] = None
+    construction: Optional[ConstructionTable] = None
+
+    # fields built from other sections of the save instead of a section with their name
+    derived_fields: ClassVar[Dict[str, str]] = {"construction": "country_manager"}
+
+    @classmethod
+    def required_fields(cls) -> Set[str]:
+        return {name for name, field in cls.model_fields.items() if field.is_required()}
+
+    @classmethod
+    def sections_for(cls, fields: Set[str]) -> Set[str]:
+        """ Top-level sections of a save needed to validate the given fields and the required ones. """
+        return {cls.derived_fields.get(field, field) for field in fields | cls.required_fields()}
+
+    @classmethod
+    def project(cls, data: Dict, fields: Set[str]) -> Dict:
+        """ 
+        Keep only the sections of the save data needed for the given fields, 
+        so the other optional fields are left empty and not validated.
+        """
+        sections = cls.sections_for(fields)
+        projected = {key: value for key, value in data.items() if key in sections}
+        for field in cls.derived_fields:
+            if field not in fields:
+                projected[field] = None
+        return projected
+
+    @model_validator(mode='before')
+    @classmethod
+    def collect_construction(cls, data):
+        """ Read the construction queues of all countries before country_manager keeps only the wanted tags. """
+        if isinstance(data, dict) and "construction" not in data and isinstance(data.get("country_manager"), dict):
+            data = {**data, "construction": {"database": data["country_manager"].get("database", {})}}
+        return data
 
     @classmethod
     def pretty_missing_fields(cls, e: ValidationError) -> ValueError:
@@ -35,8 +83,13 @@ class Vic3Save(BaseModel):
         return ValueError("\n".join(messages) )
 
 __all__ = [
+        "BuildingTable",
+        "ConstructionTable",
         "Country", 
         "CountryManager",
+        "MarketTable",
+        "PopTable",
+        "StateTable",
         "TagIDStr",
         "TagModel",
         "ValidationError",
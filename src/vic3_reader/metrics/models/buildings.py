@@ -0,0 +1,60 @@
+"""
+Defines the buildings and construction queues of a Victoria 3 save as columnar tables.
+
+The construction table is read from the queues of every country in country_manager, 
+not only the wanted tags, so construction can be aggregated per building type for all countries.
+"""
+
+from typing import Any, ClassVar, Dict
+
+import pandas as pd
+
+from .country_database import append_construction_rows, construction_frame, new_construction_columns
+from .population import SectionTable
+
+# Columns of the buildings table: {column name: key in the save}
+BUILDING_COLUMNS = {
+    "type": "building",
+    "state": "state",
+    "levels": "levels",
+}
+
+CONSTRUCTION_QUEUES = ("government_queue", "private_queue")
+
+
+class BuildingTable(SectionTable):
+    """Table with a row per existing building, its type, state and levels"""
+    columns: ClassVar[Dict[str, str]] = BUILDING_COLUMNS
+
+    @classmethod
+    def build_frame(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        frame["type"] = frame["type"].astype("category")
+        frame["state"] = pd.to_numeric(frame["state"]).astype("Int64")
+        frame["levels"] = pd.to_numeric(frame["levels"]).fillna(0)
+        return frame
+
+
+class ConstructionTable(SectionTable):
+    """Table with a row per building in the construction queues of every country"""
+
+    @classmethod
+    def read_database(cls, database: Dict[Any, Any]) -> pd.DataFrame:
+        columns = new_construction_columns()
+        countries = []
+        queues = []
+
+        for tag_id, country in database.items():
+            if not isinstance(country, dict):
+                continue
+            for queue in CONSTRUCTION_QUEUES:
+                elements = country.get(queue, {})
+                if not isinstance(elements, dict):
+                    continue
+                rows = append_construction_rows(columns, elements.get("construction_elements", []))
+                countries += [str(tag_id)] * rows
+                queues += [queue] * rows
+
+        frame = construction_frame(columns)
+        frame["country"] = pd.Categorical(countries)
+        frame["queue"] = pd.Categorical(queues)
+        return frame
@@ -0,0 +1,50 @@
+"""
+Rebuild models from already validated data without running validators.
+
+Used for trusted caches: data that was validated once and dumped with model_dump() is rebuilt
+with model_construct(), recursing into nested models inside Optional, Dict and List fields.
+"""
+
+from types import UnionType
+from typing import Any, Dict, List, Type, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def construct_model(model: Type[M], data: Dict[str, Any]) -> M:
+    """ Recursive model_construct() of `model` from the output of model_dump(). """
+    values = {}
+    for name, field in model.model_fields.items():
+        if name in data:
+            values[name] = construct_value(field.annotation, data[name])
+    return model.model_construct(**values)
+
+
+def construct_value(annotation: Any, value: Any) -> Any:
+    if value is None:
+        return None
+
+    origin = get_origin(annotation)
+
+    if origin in (Union, UnionType):
+        models = [arg for arg in get_args(annotation) if _is_model(arg)]
+        return construct_value(models[0], value) if models and isinstance(value, dict) else value
+
+    if origin in (dict, Dict):
+        _, value_type = get_args(annotation)
+        return {key: construct_value(value_type, item) for key, item in value.items()}
+
+    if origin in (list, List):
+        (item_type,) = get_args(annotation)
+        return [construct_value(item_type, item) for item in value]
+
+    if _is_model(annotation) and isinstance(value, dict):
+        return construct_model(annotation, value)
+
+    return value
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
@@ -1,7 +1,10 @@
 """Defines the scheme that compose a country data in the country_manager database in a Victoria 3 save."""
 
 from typing import Any, ClassVar, Dict, List, Optional, Set
+
+import pandas as pd
 from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic_core import PydanticUndefined
 
 from.basic import TagIDStr, TrendObject
 
@@ -47,7 +50,11 @@ class PopStats(BaseModel):
 
 
 class ConstructionElement(BaseModel):
-    """Model for expected information about a building in the construction queue"""
+    """
+    Model for expected information about a building in the construction queue.
+
+    Queues are stored as tables (see ConstructionQueue), this model defines their columns.
+    """
     type: str
     state: int
     identity: Any
@@ -56,10 +63,72 @@ class ConstructionElement(BaseModel):
     base_construction_speed: Optional[float] = 0.0
 
 
+# Columns of the construction tables: a column per ConstructionElement field
+CONSTRUCTION_FIELDS = ConstructionElement.model_fields
+
+
+def new_construction_columns() -> Dict[str, List]:
+    return {name: [] for name in CONSTRUCTION_FIELDS}
+
+
+def append_construction_rows(columns: Dict[str, List], elements: Any) -> int:
+    """
+    Append the construction elements of a queue (list of dicts) to `columns`.
+    Returns the number of appended rows. Raises ValueError if an element misses a required field.
+    """
+    if not isinstance(elements, list):
+        return 0        # an empty block {} is parsed as a dict
+
+    for element in elements:
+        for name, field in CONSTRUCTION_FIELDS.items():
+            value = element.get(name, field.default)
+            if value is PydanticUndefined:
+                raise ValueError(f"construction_elements.{name}\n  Field required")
+            columns[name].append(value)
+
+    return len(elements)
+
+
+def construction_frame(columns: Dict[str, List]) -> pd.DataFrame:
+    frame = pd.DataFrame(columns)
+    frame["type"] = frame["type"].astype("category")
+    frame["state"] = frame["state"].astype("int64")
+    for name in ("construction_left", "construction_speed", "base_construction_speed"):
+        frame[name] = frame[name].astype("float64")
+    return frame
+
+
 class ConstructionQueue(BaseModel):
-    """Model holding a set of buildings in qeue for contruction."""
-    # If it is not present in tag, list initialises empty.
-    construction_elements: List[ConstructionElement] = Field(default_factory=list)
+    """
+    Model holding a set of buildings in queue for construction.
+    Elements are stored as a table with a column per ConstructionElement field, 
+    so totals are column sums instead of a loop over objects.
+
+    construction_elements used to be a List[ConstructionElement]. as_elements() gives the rows back
+    as those objects, identity included, for code written for the list.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # If it is not present in tag, table initialises empty.
+    construction_elements: pd.DataFrame = Field(
+        default_factory=lambda: construction_frame(new_construction_columns())
+        )
+
+    @field_validator('construction_elements', mode='before')
+    @classmethod
+    def elements_to_frame(cls, v):
+        if isinstance(v, pd.DataFrame):
+            return v
+        columns = new_construction_columns()
+        append_construction_rows(columns, v)
+        return construction_frame(columns)
+
+    def as_elements(self) -> List[ConstructionElement]:
+        """ The rows of the table as ConstructionElement objects. """
+        return [
+            ConstructionElement(**row)
+            for row in self.construction_elements.astype({"type": str}).to_dict('records')
+        ]
 
     
 class Country(BaseModel):
@@ -0,0 +1,53 @@
+"""
+Defines the market_manager section of a Victoria 3 save as a columnar table.
+
+Each market holds a block per goods with its price, supply and demand. The table has a row
+per (market, goods) so the goods of a country market can be selected with one filter.
+"""
+
+from typing import Any, Dict
+
+import pandas as pd
+
+from .population import SectionTable
+
+# Key of the goods block inside each market, and the columns read for each goods: {column name: key in the save}
+MARKET_GOODS_KEY = "goods"
+GOODS_COLUMNS = {
+    "price": "price",
+    "supply": "supply",
+    "demand": "demand",
+}
+
+
+def markets_to_frame(database: Dict[Any, Any]) -> pd.DataFrame:
+    """ Read the market database {market id: {goods: {goods: {...}}}} into a row per market and goods. """
+    markets = []
+    goods = []
+    values = {name: [] for name in GOODS_COLUMNS}
+
+    for market_id, market in database.items():
+        if not isinstance(market, dict) or not isinstance(market.get(MARKET_GOODS_KEY), dict):
+            continue
+        for goods_name, entry in market[MARKET_GOODS_KEY].items():
+            if not isinstance(entry, dict):
+                continue
+            markets.append(int(market_id))
+            goods.append(str(goods_name))
+            for name, key in GOODS_COLUMNS.items():
+                values[name].append(entry.get(key))
+
+    frame = pd.DataFrame({
+        "market": pd.array(markets, dtype="int32"),
+        "goods": pd.Categorical(goods),
+        **{name: pd.to_numeric(pd.Series(column, dtype=object)).astype("float32") for name, column in values.items()},
+    })
+    return frame
+
+
+class MarketTable(SectionTable):
+    """Table with a row per market and goods"""
+
+    @classmethod
+    def read_database(cls, database: Dict[Any, Any]) -> pd.DataFrame:
+        return markets_to_frame(database)
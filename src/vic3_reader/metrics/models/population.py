@@ -0,0 +1,149 @@
+"""
+Defines the pops and states sections of a Victoria 3 save as columnar tables.
+
+These sections hold hundreds of thousands of entries, so they are not validated entry by entry
+with Pydantic models. Each database is read once into one array per column (a pandas DataFrame),
+which allows vectorized group-by aggregations per country, state or strata.
+
+Tables are built the first time a metric reads them: a save validated with all its sections
+(i.e. for metrics that are not in the registry) does not pay for the tables no metric uses.
+"""
+
+from typing import Any, ClassVar, Dict, Optional
+
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_serializer, model_validator
+
+
+# Columns of the tables: {column name: key in the save}
+POP_COLUMNS = {
+    "type": "type",
+    "culture": "culture",
+    "religion": "religion",
+    "state": "location",
+    "workforce": "workforce",
+    "dependents": "dependents",
+    "wealth": "wealth",         # standard of living of the pop
+    "wages": "wage",            # weekly wage of the pop, empty for pops without a job that pays wages
+}
+
+STATE_COLUMNS = {
+    "country": "country",
+    "region": "region",
+}
+
+# Strata of the vanilla pop types. The save only records the pop type.
+POP_TYPE_STRATA = {
+    "aristocrats": "upper",
+    "capitalists": "upper",
+    "academics": "middle",
+    "bureaucrats": "middle",
+    "clergymen": "middle",
+    "clerks": "middle",
+    "engineers": "middle",
+    "farmers": "middle",
+    "officers": "middle",
+    "shopkeepers": "middle",
+    "laborers": "lower",
+    "machinists": "lower",
+    "peasants": "lower",
+    "servicemen": "lower",
+    "slaves": "lower",
+    "soldiers": "lower",
+}
+
+
+def database_to_frame(database: Dict[Any, Any], columns: Dict[str, str]) -> pd.DataFrame:
+    """
+    Read a save database {id: {key: value}} into a DataFrame with a column per wanted key.
+    Entries that are "none" (removed) are skipped and missing keys are left empty.
+    """
+    ids = []
+    values = {name: [] for name in columns}
+
+    for entry_id, entry in database.items():
+        if not isinstance(entry, dict):
+            continue
+        ids.append(int(entry_id))
+        for name, key in columns.items():
+            values[name].append(entry.get(key))
+
+    return pd.DataFrame(values, index=pd.Index(ids, name="id"))
+
+
+class SectionTable(BaseModel):
+    """
+    Base model for a save section stored as a table.
+    Accepts the raw section {"database": {...}} or an already built frame {"frame": DataFrame}.
+
+    The raw database is kept as parsed and read into the table the first time self.frame is used,
+    then released. Dumping the model (i.e. for a trusted cache) builds the table and dumps only the table.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    columns: ClassVar[Dict[str, str]] = {}
+
+    database: Any = Field(default=None, repr=False)     # Any, so the section is not copied by the validation
+    table: Optional[pd.DataFrame] = None
+
+    # aggregations computed for this save, shared by all tags
+    _cache: Dict = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode='before')
+    @classmethod
+    def section_to_frame(cls, v):
+        if isinstance(v, dict) and "frame" in v:
+            return {"table": v["frame"]}
+        if isinstance(v, dict) and "table" not in v:
+            database = v.get("database", {})
+            return {"database": database if isinstance(database, dict) else {}}
+        return v
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self.table is None:
+            self.table = self.read_database(self.database or {})
+            self.database = None
+        return self.table
+
+    @model_serializer(mode='wrap')
+    def dump_table(self, handler):
+        self.frame     # the table is dumped instead of the raw database
+        return handler(self)
+
+    @classmethod
+    def read_database(cls, database: Dict[Any, Any]) -> pd.DataFrame:
+        return cls.build_frame(database_to_frame(database, cls.columns))
+
+    @classmethod
+    def build_frame(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        return frame
+
+
+class StateTable(SectionTable):
+    """Table with a row per state and its owner country tag id"""
+    columns: ClassVar[Dict[str, str]] = STATE_COLUMNS
+
+    @classmethod
+    def build_frame(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        frame["country"] = frame["country"].map(lambda v: None if v is None else str(v)).astype("category")
+        return frame
+
+
+class PopTable(SectionTable):
+    """Table with a row per pop. Strata and size (workforce + dependents) are derived columns."""
+    columns: ClassVar[Dict[str, str]] = POP_COLUMNS
+
+    @classmethod
+    def build_frame(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        for col in ("workforce", "dependents", "wealth"):
+            frame[col] = pd.to_numeric(frame[col]).fillna(0)
+        frame["size"] = frame["workforce"] + frame["dependents"]
+        frame["wages"] = pd.to_numeric(frame["wages"]).astype("float64")     # missing wages stay empty, not 0
+
+        frame["state"] = pd.to_numeric(frame["state"]).astype("Int64")
+        frame["culture"] = frame["culture"].map(lambda v: None if v is None else str(v))
+        for col in ("type", "culture", "religion"):
+            frame[col] = frame[col].astype("category")
+        frame["strata"] = frame["type"].map(POP_TYPE_STRATA).astype("category")
+        return frame
@@ -0,0 +1,192 @@
+"""Functions to extract Victoria 3 data in a save related to pops and states, aggregated per country, state and strata."""
+
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from vic3_reader.metrics.models import TagIDStr, Vic3Save
+from vic3_reader.metrics.registry import group_function, metric
+
+
+def get_pops_frame(data: 'Vic3Save') -> pd.DataFrame:
+    """
+    Pops table with the owner country and the region of each pop, joined from the state where it lives.
+    Computed once per save and shared by every tag.
+    """
+    if data.pops is None or data.states is None:
+        raise ValueError("The save data has no 'pops' or 'states' sections to aggregate.")
+
+    cache = data.pops._cache
+    if "joined" not in cache:
+        pops = data.pops.frame
+        states = data.states.frame
+        cache["joined"] = pops.assign(
+            country=pops["state"].map(states["country"]).astype("category"),
+            region=pops["state"].map(states["region"]).astype("category"),
+            )
+
+    return cache["joined"]
+
+
+def aggregate(data: 'Vic3Save', 
+              by: Tuple[str, ...], 
+              value: str = "size", 
+              how: str = "sum",
+              weight: Optional[str] = None
+              ) -> pd.Series:
+    """
+    Vectorized group-by over all pops in the save, i.e. population by (country, state, strata).
+    Results are cached per save, so the group-by runs once for all tags.
+
+    Args:
+        data: Vic3Save - Parsed Vic3 save information.
+        by: columns of the pops table to group by, i.e. ("country", "region", "strata").
+        value: column to aggregate. Defaults to pop size.
+        how: pandas aggregation, i.e. "sum", "mean", "count".
+        weight (Opt): column to weight a mean of `value` with, i.e. wages weighted by workforce. 
+            `how` is not used then, and pops without `value` or weight are left out.
+
+    Returns:
+        pd.Series indexed by the group-by columns.
+    """
+    cache = data.pops._cache if data.pops is not None else {}
+    key = (tuple(by), value, how, weight)
+
+    if key not in cache:
+        pops = get_pops_frame(data)
+        if weight is None:
+            cache[key] = pops.groupby(list(by), observed=True)[value].agg(how)
+        else:
+            pops = pops[pops[value].notna() & (pops[weight] > 0)]
+            groups = [pops[column] for column in by]
+            totals = (pops[value] * pops[weight]).groupby(groups, observed=True).sum()
+            cache[key] = totals / pops[weight].groupby(groups, observed=True).sum()
+
+    return cache[key]
+
+
+def get_weighted_stats(data: 'Vic3Save',
+                       value: str = "wealth",
+                       weight: str = "size",
+                       quantiles: Sequence[float] = (0.25, 0.5, 0.75)
+                       ) -> pd.DataFrame:
+    """
+    Mean and quantiles of `value` per country weighted by `weight`, i.e. the SoL that half of the population is under.
+    Computed for all countries at once with a sort and a cumulative sum.
+
+    Returns:
+        pd.DataFrame indexed by country with columns 'mean' and 'q25', 'q50', ...
+    """
+    cache = data.pops._cache
+    key = ("weighted", value, weight, tuple(quantiles))
+
+    if key not in cache:
+        pops = get_pops_frame(data)[["country", value, weight]].dropna(subset=["country"])
+        pops = pops[pops[weight] > 0].sort_values(["country", value])
+
+        grouped = pops.groupby("country", observed=True)[weight]
+        totals = grouped.sum()
+        share = grouped.cumsum().to_numpy() / grouped.transform("sum").to_numpy()
+
+        result = {
+            "mean": (pops[value] * pops[weight]).groupby(pops["country"], observed=True).sum() / totals
+        }
+        for q in quantiles:
+            reached = pops[share >= q]
+            result[f"q{int(q * 100)}"] = reached.groupby("country", observed=True)[value].first()
+        cache[key] = pd.DataFrame(result)
+
+    return cache[key]
+
+
+def _lookup_group(series: pd.Series, tag_id: TagIDStr, prefix: str) -> Dict:
+    if tag_id not in series.index.get_level_values(0):
+        return {}
+    return {f"{prefix}_{key}": value for key, value in series.loc[tag_id].items()}
+
+
+@metric("population", reads=("pops", "states"), prefixes=("pops_strata_",))
+def get_pops_by_strata(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "strata")), tag_id, "pops_strata")
+
+
+@metric("population", reads=("pops", "states"), prefixes=("pops_type_",))
+def get_pops_by_type(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "type")), tag_id, "pops_type")
+
+
+@metric("population", reads=("pops", "states"), prefixes=("pops_culture_",))
+def get_pops_by_culture(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "culture")), tag_id, "pops_culture")
+
+
+@metric("population", reads=("pops", "states"), prefixes=("pops_religion_",))
+def get_pops_by_religion(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "religion")), tag_id, "pops_religion")
+
+
+@metric("population", reads=("pops", "states"), prefixes=("pops_state_",))
+def get_pops_by_state(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "region")), tag_id, "pops_state")
+
+
+@metric("population", reads=("pops", "states"), keys=("wage_mean",), prefixes=("wage_strata_",))
+def get_wages(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    """ Mean wage of the country and of each strata, weighted by the workforce of the pops. """
+    country = aggregate(data, ("country",), "wages", weight="workforce")
+    if tag_id not in country.index:
+        return {}
+    strata = aggregate(data, ("country", "strata"), "wages", weight="workforce")
+    return {"wage_mean": country.loc[tag_id], **_lookup_group(strata, tag_id, "wage_strata")}
+
+
+@metric("population", reads=("pops", "states"), prefixes=("wage_state_",))
+def get_wages_by_state(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    return _lookup_group(aggregate(data, ("country", "region"), "wages", weight="workforce"), tag_id, "wage_state")
+
+
+@metric("population", reads=("pops", "states"), prefixes=("sol_",))
+def get_sol_distribution(data: 'Vic3Save', tag_id: TagIDStr) -> Dict:
+    stats = get_weighted_stats(data, "wealth", "size")
+    if tag_id not in stats.index:
+        return {}
+    return {f"sol_{stat}": value for stat, value in stats.loc[tag_id].items()}
+
+
+POPULATION_FN = [
+        get_pops_by_strata,
+        get_pops_by_type,
+        get_pops_by_culture,
+        get_pops_by_religion,
+        get_pops_by_state,
+        get_wages,
+        get_wages_by_state,
+        get_sol_distribution,
+    ]
+
+
+@group_function("population", members=POPULATION_FN)
+def get_population(data: 'Vic3Save', 
+                   tag_id: TagIDStr,
+                   functions: Sequence[Callable] = POPULATION_FN
+                   ) -> Dict:
+    """
+    Aggregate the pops of a country from the pops and states sections of the save.
+    Group-bys run once per save for all countries and each tag only looks up its rows.
+    
+    Args:
+        data: Vic3Save - Parsed Vic3 save information.
+        tag_id: TagIDStr - The tag ID for a country in the database.
+        functions (Opt): each function define how to extract one or semantically grouped metrics. 
+            The expected output is to be a Dict['metric name', 'value']
+        
+    Returns:
+        Dict ['metric name', 'value'] with all metrics collected in the module.
+
+    """
+    merged = {}  # Warning: same keys are overriden
+
+    for func in functions:
+        merged.update(func(data, tag_id))
+
+    return merged
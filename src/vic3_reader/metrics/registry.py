@@ -0,0 +1,340 @@
+"""
+Registry of metrics and of the lookups they share, computed as a dependency graph for each save.
+
+Each metric declares its inputs by name instead of fetching them itself:
+    - built-in inputs: 'save' (the validated Vic3Save) and 'tag_id'.
+    - lookups: intermediate values shared by several metrics, i.e. 'country', the country_manager
+      entry of a tag, is fetched once per tag for all the economy, administrative and tag metrics.
+    - other metrics: their {metric name: value} dictionary.
+
+Inputs are computed once and cached: per save if they do not depend on 'tag_id', and per tag otherwise.
+Inputs must be registered before the metrics that use them, so the graph cannot have cycles.
+
+Each metric (or lookup) also declares:
+    - reads: the model paths of the save it reads, i.e. "country_manager.database.budget".
+      Only the top-level sections read by the selected metrics are parsed and validated.
+    - keys / prefixes: the metric names it returns, i.e. "gpd" or "pops_culture_" for a name per culture.
+      Two metrics returning the same key are rejected when they are registered, instead of one
+      silently overwriting the other when the table is built.
+
+The main function of each metrics module (i.e. get_economy) is registered as a group whose members are
+the list of functions of the module (i.e. ECONOMY_FN), so config.METRICS keeps working with the same
+functions and adding a metric to the list adds it to the group. Every function in the list must be
+registered with @metric, or resolving the group raises an error instead of silently leaving it out.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+SAVE = "save"
+TAG_ID = "tag_id"
+BUILTIN_INPUTS = (SAVE, TAG_ID)
+
+duplicated_node_error = "A metric or lookup named '{name}' is already registered."
+unknown_input_error = (
+    "'{name}' needs '{input}', which is not registered." \
+    " Register lookups and metrics before the metrics that use them."
+    )
+unknown_metric_error = "'{name}' is not a registered metric or group of metrics."
+unregistered_member_error = (
+    "'{name}' is in the functions of the group '{group}' but it is not a registered metric." \
+    " Decorate it with @metric(\"{group}\", inputs=..., reads=..., keys=...) from vic3_reader.metrics.registry" \
+    " (see documentation/how_to_add_more.md)."
+    )
+key_collision_error = "Metric '{name}' returns '{key}', also returned by metric '{other}' ('{other_key}')."
+undeclared_key_error = "Metric '{name}' returned '{key}', which is not in its declared keys or prefixes."
+
+
+class MetricNode():
+    """
+    A registered metric or lookup.
+
+    Parameters:
+    -   name: str. Unique name in the registry, the function name by default.
+
+    -   fn: Callable. Called with the values of the inputs, in order.
+
+    -   inputs: Sequence of str. Built-in inputs ('save', 'tag_id'), lookups or metrics.
+
+    -   reads: Sequence of model paths, optional. Sections of the save the function reads directly,
+                i.e. ("pops", "states"). None if unknown: the whole save is needed.
+
+    -   keys, prefixes: Sequence of str. Metric names returned by a metric, exact or by prefix.
+                Empty for lookups and for metrics not from the registry (not checked).
+
+    -   group: str, optional. Group of the metric, i.e. "economy". None for lookups.
+
+    -   is_metric: bool. Metrics return a Dict {metric name: value} that becomes a row of the table,
+                lookups return any value used by other nodes.
+    """
+    def __init__(
+            self,
+            name: str,
+            fn: Callable,
+            inputs: Sequence[str] = (SAVE, TAG_ID),
+            reads: Optional[Sequence[str]] = (),
+            keys: Sequence[str] = (),
+            prefixes: Sequence[str] = (),
+            group: Optional[str] = None,
+            is_metric: bool = True
+            ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.reads = None if reads is None else tuple(reads)
+        self.keys = tuple(keys)
+        self.prefixes = tuple(prefixes)
+        self.group = group
+        self.is_metric = is_metric
+        self.per_tag = TAG_ID in self.inputs     # completed with the inputs when registered
+
+    def __repr__(self) -> str:
+        kind = "metric" if self.is_metric else "lookup"
+        return f"<{kind} {self.name} inputs={self.inputs}>"
+
+    def declares(self, key: str) -> bool:
+        return key in self.keys or key.startswith(self.prefixes)
+
+
+class MetricRegistry():
+    """
+    Metrics and lookups by name, and the groups of metrics selected by the main functions of the modules.
+
+    Methods:
+    -   self.lookup(), self.metric(). Decorators to register a function as a lookup or a metric.
+
+    -   self.group_function(). Decorator to select a group of metrics with a function, i.e. get_economy,
+                    optionally with the list of its members, i.e. ECONOMY_FN.
+
+    -   self.plan(). Resolve a selection of metrics into a MetricPlan that computes them for a save.
+    """
+    def __init__(self):
+        self.nodes: Dict[str, MetricNode] = {}
+        self.groups: Dict[str, List[str]] = {}
+        self.group_functions: Dict[Callable, str] = {}
+        self.group_members: Dict[str, Sequence[Callable]] = {}
+        self.metric_functions: Dict[Callable, str] = {}
+
+    def add(self, node: MetricNode) -> MetricNode:
+        """ Register a node after checking its name, its inputs and the keys it returns. """
+        if node.name in self.nodes or node.name in BUILTIN_INPUTS:
+            raise ValueError(duplicated_node_error.format(name=node.name))
+
+        for input_name in node.inputs:
+            if input_name in BUILTIN_INPUTS:
+                continue
+            if input_name not in self.nodes:
+                raise ValueError(unknown_input_error.format(name=node.name, input=input_name))
+            node.per_tag |= self.nodes[input_name].per_tag
+
+        if node.is_metric:
+            self._check_collisions(node)
+
+        self.nodes[node.name] = node
+        if node.group is not None:
+            self.groups.setdefault(node.group, []).append(node.name)
+        if node.is_metric:
+            self.metric_functions[node.fn] = node.name
+        return node
+
+    def _check_collisions(self, node: MetricNode) -> None:
+        """ Raise if a key or prefix of the node can be returned by a registered metric too. """
+        for other in self.nodes.values():
+            if not other.is_metric:
+                continue
+            collisions = [(key, other_key) for key in node.keys for other_key in other.keys if key == other_key]
+            collisions += [(key, prefix) for key in node.keys for prefix in other.prefixes if key.startswith(prefix)]
+            collisions += [(prefix, key) for prefix in node.prefixes for key in other.keys if key.startswith(prefix)]
+            collisions += [
+                (prefix, other_prefix)
+                for prefix in node.prefixes for other_prefix in other.prefixes
+                if prefix.startswith(other_prefix) or other_prefix.startswith(prefix)
+            ]
+            if collisions:
+                key, other_key = collisions[0]
+                raise ValueError(key_collision_error.format(name=node.name, key=key, other=other.name, other_key=other_key))
+
+    def lookup(self, name: str, inputs: Sequence[str] = (SAVE, TAG_ID), reads: Optional[Sequence[str]] = ()) -> Callable:
+        """ Decorator: register the function as a lookup shared by the metrics that name it in their inputs. """
+        def register(fn: Callable) -> Callable:
+            self.add(MetricNode(name, fn, inputs, reads, is_metric=False))
+            return fn
+        return register
+
+    def metric(
+            self,
+            group: str,
+            inputs: Sequence[str] = (SAVE, TAG_ID),
+            reads: Optional[Sequence[str]] = (),
+            keys: Sequence[str] = (),
+            prefixes: Sequence[str] = (),
+            name: Optional[str] = None
+            ) -> Callable:
+        """ Decorator: register the function as a metric of a group. It is still a plain function after it. """
+        def register(fn: Callable) -> Callable:
+            self.add(MetricNode(name or fn.__name__, fn, inputs, reads, keys, prefixes, group))
+            return fn
+        return register
+
+    def group_function(self, group: str, members: Optional[Sequence[Callable]] = None) -> Callable:
+        """
+        Decorator: selecting the function (i.e. in config.METRICS) selects every metric of the group.
+        With members (i.e. ECONOMY_FN), the group is the metrics in that list when it is resolved,
+        so functions appended to or removed from the list are followed.
+        """
+        def register(fn: Callable) -> Callable:
+            self.group_functions[fn] = group
+            if members is not None:
+                self.group_members[group] = members
+            return fn
+        return register
+
+    def group_names(self, group: str) -> List[str]:
+        """ Names of the metrics of a group: its members list if it has one, else every metric registered in it. """
+        members = self.group_members.get(group)
+        if members is None:
+            return self.groups.get(group, [])
+
+        names = []
+        for fn in members:
+            if fn not in self.metric_functions:
+                name = getattr(fn, '__qualname__', repr(fn))
+                raise ValueError(unregistered_member_error.format(name=name, group=group))
+            names.append(self.metric_functions[fn])
+        return names
+
+    def resolve(self, selection: Iterable[str | Callable]) -> List[MetricNode]:
+        """
+        Metrics of a selection, in order and without repetitions.
+        Items can be names of metrics or groups, group functions (i.e. get_economy), registered metric
+        functions, or any other function (data, tag_id) -> Dict, which is called with the whole save.
+        """
+        metrics: Dict[str, MetricNode] = {}
+
+        for item in selection:
+            if isinstance(item, str):
+                if item in self.groups or item in self.group_members:
+                    names = self.group_names(item)
+                elif item in self.nodes:
+                    names = [item]
+                else:
+                    raise ValueError(unknown_metric_error.format(name=item))
+            elif item in self.group_functions:
+                names = self.group_names(self.group_functions[item])
+            elif item in self.metric_functions:
+                names = [self.metric_functions[item]]
+            else:
+                # not declared: needs the whole save and its keys are only checked when computed
+                name = f"{getattr(item, '__module__', '')}.{getattr(item, '__qualname__', repr(item))}"
+                metrics.setdefault(name, MetricNode(name, item, reads=None))
+                continue
+
+            for name in names:
+                metrics.setdefault(name, self.nodes[name])
+
+        return list(metrics.values())
+
+    def plan(self, selection: Iterable[str | Callable]) -> 'MetricPlan':
+        return MetricPlan(self, self.resolve(selection))
+
+
+class MetricPlan():
+    """
+    Selected metrics of a run with all the nodes they need.
+
+    Attributes:
+    -   self.metrics: List of MetricNode. Selected metrics, in the order of the table columns.
+
+    -   self.nodes: List of MetricNode. Metrics and all their inputs, each input before the nodes using it.
+
+    -   self.fields: Set of top-level fields of Vic3Save read by the nodes, None if some node needs the whole save.
+
+    Methods:
+    -   self.compute(save, tags). Dict {tag id: {metric name: value}}.
+    """
+    def __init__(self, registry: MetricRegistry, metrics: Sequence[MetricNode]):
+        self.registry = registry
+        self.metrics = list(metrics)
+        self.nodes = self._dependencies()
+        self.fields = self._fields()
+
+    def _dependencies(self) -> List[MetricNode]:
+        ordered: Dict[str, MetricNode] = {}
+
+        def visit(node: MetricNode) -> None:
+            for input_name in node.inputs:
+                if input_name not in BUILTIN_INPUTS:
+                    visit(self.registry.nodes[input_name])
+            ordered.setdefault(node.name, node)
+
+        for metric in self.metrics:
+            visit(metric)
+        return list(ordered.values())
+
+    def _fields(self) -> Optional[Set[str]]:
+        fields = set()
+        for node in self.nodes:
+            if node.reads is None:
+                return None
+            fields.update(path.split(".")[0] for path in node.reads)
+        return fields
+
+    def compute(self, save: Any, tags: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Compute the selected metrics of every tag.
+        Nodes that do not depend on the tag are computed once for all tags.
+        A node with a None input (i.e. a country that does not exist anymore) gives None,
+        and a metric giving None has no values for that tag.
+        """
+        per_save: Dict[str, Any] = {SAVE: save}
+        tags_metrics = {}
+
+        for tag in tags:
+            values = {SAVE: save, TAG_ID: tag}
+            row: Dict[str, Any] = {}
+            origin: Dict[str, str] = {}
+
+            for metric in self.metrics:
+                result = self._value(metric, values, per_save) or {}
+                for key, value in result.items():
+                    if metric.keys or metric.prefixes:
+                        if not metric.declares(key):
+                            raise ValueError(undeclared_key_error.format(name=metric.name, key=key))
+                    if key in origin:
+                        raise ValueError(key_collision_error.format(name=metric.name, key=key, other=origin[key], other_key=key))
+                    origin[key] = metric.name
+                    row[key] = value
+
+            tags_metrics[tag] = row
+
+        return tags_metrics
+
+    def _value(self, node: MetricNode, values: Dict[str, Any], per_save: Dict[str, Any]) -> Any:
+        cache = values if node.per_tag else per_save
+        if node.name in cache:
+            return cache[node.name]
+
+        args: List[Any] = []
+        for input_name in node.inputs:
+            if input_name in BUILTIN_INPUTS:
+                args.append(values[input_name])
+            else:
+                args.append(self._value(self.registry.nodes[input_name], values, per_save))
+
+        result = None if any(arg is None for arg in args) else node.fn(*args)
+        cache[node.name] = result
+        return result
+
+
+# ─── Default registry ───────────────────────────────────────────────────────
+
+REGISTRY = MetricRegistry()
+
+lookup = REGISTRY.lookup
+metric = REGISTRY.metric
+group_function = REGISTRY.group_function
+
+
+@lookup("country", inputs=(SAVE, TAG_ID), reads=("country_manager.database",))
+def get_country(data: Any, tag_id: str) -> Any:
+    """ Country of the tag in the database, None if it does not exist in the save. """
+    return data.country_manager.database.get(tag_id)
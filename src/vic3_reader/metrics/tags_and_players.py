@@ -1,8 +1,12 @@
-from typing import Callable, Dict, List, Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from datetime import date
+from pathlib import Path
 from pydantic import BaseModel
 
 from vic3_reader.metrics.models.country_database import Country
 from vic3_reader.metrics.models.basic import TagIDStr
+from vic3_reader.metrics.metadata import get_game_date
+from vic3_reader.metrics.registry import group_function, metric
 
 TAGS = [
     "1",      # GBR
@@ -20,6 +24,8 @@ TAGS = [
     "199",    # BRZ
 ]
 
+missing_section_error = "{name} has no '{section}' section, the tags of the save cannot be scanned."
+
 class PlayerItem(BaseModel):
     """Model for Player dicts relating tag ids and player names
     
@@ -39,11 +45,12 @@ def get_players(previous_played: PreviousPlayed) -> Dict:
     """
     Array of dicts that contain "idtype": int and "name": str
 
-    Returns: flattened version "idtype":"name"
+    Returns: flattened version "name":"idtype"
     """
-    return {item['name']: item['idtype'] for item in previous_played.items}
+    return {item.name: item.idtype for item in previous_played.items}
 
 
+@metric("tags", inputs=("country",), reads=("country_manager.database.definition",), keys=("TAG",))
 def get_tag_definition(country: Country) -> Dict:
     return {'TAG': country.definition}
 
@@ -53,6 +60,7 @@ TAG_FN = [
     ]
 
 
+@group_function("tags", members=TAG_FN)
 def get_tag_data(data: 'Vic3Save', 
                 tag_id: TagIDStr,
                 functions: Sequence[Callable] = TAG_FN
@@ -80,4 +88,184 @@ def get_tag_data(data: 'Vic3Save',
     for func in functions:
         merged.update(func(country))
 
-    return merged
\ No newline at end of file
+    return merged
+
+
+class SaveTags(BaseModel):
+    """Model for the tag information found in one save without validating the rest of it
+    
+    definitions: Dict[tag id] = 3 letter tag
+    players: Dict[player name] = tag id
+    """
+    game_date: date
+    definitions: Dict[TagIDStr, str]
+    players: Dict[str, TagIDStr]
+
+
+def scan_save_tags(path: Path, content: Optional[Tuple[str, str | bytes]] = None) -> SaveTags:
+    """
+    Collect the date, tag definitions and players of a save in one lightweight pass.
+
+    Plain-text saves are scanned block by block and only the 'definition' of each country
+    and the 'previous_played' section are read. Cached JSON and binary saves only decode these sections, not validated.
+    Countries without a definition (removed ones) are left out.
+
+    Args:
+        path: Path - The save, or its cached JSON.
+        content (Opt): (extension, text) of the save as returned by read(path), so a save already
+            read to be parsed is not read again.
+    """
+    from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read
+
+    extension, text = read(path) if content is None else content
+
+    if extension in ('.json', BINARY_SUFFIX):
+        data = manage_parsing(extension, text, sections={'date', 'country_manager', 'previous_played'})
+        country_manager = data.get('country_manager')
+        database = country_manager.get('database') if isinstance(country_manager, dict) else None
+        if not isinstance(database, dict) or 'date' not in data:
+            section = 'date' if 'date' not in data else 'country_manager.database'
+            raise ValueError(missing_section_error.format(name=path.name, section=section))
+        definitions = {
+            TagIDStr(tag_id): country['definition']
+            for tag_id, country in database.items() if isinstance(country, dict) and 'definition' in country
+        }
+        previous_played = data.get('previous_played', [])
+        game_date = data['date']
+    else:
+        from vic3_reader.parser import scanner
+
+        span = scanner.find_key(text, 'date')
+        if span is None:
+            raise ValueError(missing_section_error.format(name=path.name, section='date'))
+        game_date = scanner.atom(text, span)
+
+        definitions = {}
+        span = scanner.find_path(text, ('country_manager', 'database'))
+        if span is None:
+            raise ValueError(missing_section_error.format(name=path.name, section='country_manager.database'))
+        for tag_id, start, end in scanner.iter_pairs(text, *scanner.inner(span)):
+            if text[start] != '{':
+                continue    # "none" for countries that no longer exist
+            definition = scanner.find_key(text, 'definition', *scanner.inner((start, end)))
+            if definition:
+                definitions[TagIDStr(tag_id)] = scanner.atom(text, definition)
+
+        span = scanner.find_key(text, 'previous_played')
+        previous_played = scanner.parse_span(text, span) if span else []
+
+    if isinstance(previous_played, dict):    # a single player is parsed as a dict
+        previous_played = [previous_played]
+    players = get_players(
+        PreviousPlayed(items=[{'idtype': str(item['idtype']), 'name': item['name']} for item in previous_played])
+        )
+
+    return SaveTags(
+        game_date=get_game_date(game_date)['game_date'],
+        definitions=definitions,
+        players=players,
+        )
+
+
+class TagIndex():
+    """
+    Index relating numeric tag ids, 3 letter tags and player names for a set of saves.
+
+    Tag ids are stable for a country through its whole lifespan, while the 3 letter tag
+    can change when a country is formed (i.e. id 5: PRU -> NGF -> GER).
+    The index lets you ask for countries by 3 letter tag or player name and resolve them
+    to the tag id used in each save.
+
+    Parameters:
+    -   pending: Iterable of Path, optional. Saves that are only scanned when needed: a save is scanned
+                    when a tag is resolved in it, unless it was added before (i.e. with the text already read
+                    to parse it), and all of them are scanned the first time a tag is not found in a save,
+                    to look for it in the closest save in time. Saves that cannot be scanned are left out then.
+
+    Methods:
+    -   add_save(). Scan a save and add its tags to the index.
+
+    -   resolve(). Return the tag id for a tag id, 3 letter tag or player name in a given save.
+
+    -   history(). Return the 3 letter tags used by a tag id over time.
+    """
+    def __init__(self, pending: Iterable[Path] = ()):
+        self.saves: Dict[Path, SaveTags] = {}
+        self.pending: Set[Path] = {Path(path) for path in pending}
+
+    @classmethod
+    def from_files(cls, paths: Iterable[Path]) -> 'TagIndex':
+        index = cls()
+        for path in paths:
+            index.add_save(path)
+        return index
+
+    def add_save(self, path: Path, content: Optional[Tuple[str, str | bytes]] = None) -> SaveTags:
+        """ Scan a save, or its (extension, text) if already read (see scan_save_tags), and add its tags. """
+        path = Path(path)
+        save_tags = scan_save_tags(path, content)
+        self.saves[path] = save_tags
+        self.pending.discard(path)     # saves can be added from prefetch threads
+        return save_tags
+
+    def add_pending(self) -> None:
+        """ Scan the pending saves. Those that cannot be scanned are left out. """
+        for path in list(self.pending):
+            try:
+                self.add_save(path)
+            except Exception:
+                self.pending.discard(path)
+
+    def history(self, tag_id: TagIDStr) -> List[Tuple[date, str]]:
+        """ Returns (game_date, 3 letter tag) for every save where the tag id exists, sorted by date. """
+        return sorted(
+            (save.game_date, save.definitions[tag_id])
+            for save in self.saves.values() if tag_id in save.definitions
+        )
+
+    def resolve(self, wanted: str, path: Path) -> Optional[TagIDStr]:
+        """
+        Find the tag id for `wanted` in the save at `path`.
+
+        `wanted` can be a numeric tag id, a player name or a 3 letter tag. If the tag or player
+        is not present in that save (i.e. GER before it is formed) the id is taken from the
+        closest save in time where it is present. Returns None if it is not found in any save.
+        """
+        if wanted.isdigit():
+            return TagIDStr(wanted)
+
+        save = self.saves.get(Path(path)) or self.add_save(path)
+        tag_id = _lookup(save, wanted)
+        if tag_id is not None:
+            return tag_id
+
+        self.add_pending()
+
+        by_distance = sorted(
+            self.saves.values(), 
+            key=lambda other: abs((other.game_date - save.game_date).days)
+            )
+        for other in by_distance:
+            tag_id = _lookup(other, wanted)
+            if tag_id is not None:
+                return tag_id
+
+        return None
+
+    def resolve_all(self, wanted_tags: Iterable[str], path: Path) -> Dict[str, Optional[TagIDStr]]:
+        """ Resolve every wanted tag for the save at `path`. """
+        return {wanted: self.resolve(wanted, path) for wanted in wanted_tags}
+
+
+def _lookup(save: SaveTags, wanted: str) -> Optional[TagIDStr]:
+    if wanted in save.players:
+        return save.players[wanted]
+    for tag_id, definition in save.definitions.items():
+        if definition == wanted:
+            return tag_id
+    return None
+
+
+def needs_tag_index(wanted_tags: Iterable[str]) -> bool:
+    """ True when some wanted tags are not numeric ids and need to be resolved per save. """
+    return any(not tag.isdigit() for tag in wanted_tags)
@@ -1,18 +1,30 @@
-from typing import Callable, Dict, List, Sequence, Set, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from datetime import date
 from pathlib import Path
+from warnings import warn
+import threading
 
 import pandas as pd
 
+from vic3_reader.checkpoint import Checkpoint, SaveError, errors_to_frame, run_fingerprint
 from vic3_reader.metrics.models import Country, CountryManager, TagIDStr, ValidationError, Vic3Save
+from vic3_reader.metrics.models.basic import ProcessingWarning
 
-from vic3_reader.metrics import get_game_date, get_tag_data
+from vic3_reader.metrics import get_game_date, get_tag_data, TagIndex
+from vic3_reader.metrics.registry import REGISTRY, MetricPlan
+from vic3_reader.metrics.tags_and_players import needs_tag_index
 
-from vic3_reader.parser.reader import Vic3Reader
+from vic3_reader.parser.binary import use_token_table
+from vic3_reader.parser.cache_manager import CacheManager
+from vic3_reader.parser.dedup import deduplicate_saves
+from vic3_reader.parser.prefetch import file_size, prefetch_files
+from vic3_reader.parser.reader import manage_parsing, nominate_cached_json, read, save_as_json, select_source
+from vic3_reader.parser.trusted_cache import TRUSTED_SUFFIX, load_trusted, nominate_trusted_cache, save_trusted
+from vic3_reader.results_store import ResultsStore
 
 none_wanted_tag_error = ( 
-    "You must specify which tag IDs are you searching in the save." \
-    " These ids are the digit IDs in the save, not the 3 letter tags."
+    "You must specify which tags are you searching in the save." \
+    " These can be the digit IDs in the save, the 3 letter tags or player names."
     )
 empty_seq_metrics_fn_error = (
     "Empty list of metrics" \
@@ -31,24 +43,94 @@ class Orchestrator():
     -   wanted_tags: Tag IDs of countries whose metrics will be extracted.
 
         This ensures efficient computation, overlooking unwanted countries.
+        3 letter tags (i.e. "GER") and player names are also accepted. These are resolved 
+        to the tag id in each save with a TagIndex. Each save is scanned for tags from the text read
+        to parse it; the other saves are only scanned when a tag is not found in a save (i.e. GER before
+        it is formed), to take the tag id from the closest save in time.
 
     -   metrics_fn: Iterable sequence i.e. List, of functions designed to accept a Vic3save data model and return 
                     a dictionary with a set of metrics. This controls the metrics that will be extracted from the file.
+                    Names of metrics or groups in the metrics registry are also accepted (see metrics/registry.py).
+                    Only the sections of the save read by the selected metrics are parsed and validated.
 
     -   save_as_json: bool, default False. Set as True to save the parsed save data as a JSON in disk to make the reading faster next time.
                     WARNING! The resulting game JSON can be very heavy, around 500MB.
 
+    -   parse_workers: int, default 1. Number of processes used to parse each plain-text save. 
+                    The save is split between its top-level blocks and the pieces are parsed in parallel.
+                    The processes are started once per run and reused for every save.
+                    None uses all the CPUs.
+
+    -   prefetch_files: int, default 0. Number of files read in background while the current save is parsed.
+                    Useful when saves are in a slow or network disk.
+
+    -   prefetch_memory_mb: float, optional. Maximum MB of files read in advance. 
+                    At least one file is always read in advance when prefetch_files > 0.
+
+    -   trusted_cache: bool, default False. Set as True to store each save after validation for the wanted tags
+                    and rebuild it next time without parsing or validating it again (see parser/trusted_cache.py).
+                    The cache is ignored when the save, the wanted tags or the models change.
+
+    -   cache_budget_mb: float, optional. Maximum MB of caches (JSON and trusted) kept in the 'json_saves' folder.
+                    The least recently used caches are removed over it.
+
+    -   cache_max_age_days: float, optional. Caches not used for this number of days are removed.
+
+    -   cache_verify_hash: bool, default False. Set as True to also store a hash of each save with its caches.
+                    A cache is then kept when only the modification time of the save changes (i.e. copied saves),
+                    at the cost of reading the whole save to hash it.
+
+    -   tokens_file: Path or str, optional. Token table {token id: name} to read native binary saves
+                    (see parser/binary.py). Not needed for plain-text saves.
+
+    -   stop_on_error: bool, default False. By default a save that cannot be read, parsed, validated or measured
+                    is skipped with a warning and recorded in self.errors. Set as True to raise the error instead.
+
+    -   checkpoint_dir: Path or str, optional. Folder where the metrics of every save are stored as soon as
+                    they are extracted (see checkpoint.py). Restarting the run with the same folder, tags and
+                    metrics reuses them and only processes the new, changed or failed saves.
+
+    -   skip_duplicates: bool, default True. Skip saves with the same content or game date as another save
+                    of the folder (i.e. a manual save copying an autosave), found in a quick pre-pass (see parser/dedup.py).
+
+    -   same_date_policy: str, default "newest". Which save is kept when several have the same game date:
+                    "newest", "oldest", "largest", "all" (keep all of them) or "error" (raise an error).
+
+    -   results_db: Path or str, optional. SQLite database where the metrics of every save are stored as soon
+                    as they are extracted (see results_store.py). Saves already stored by a run with the same tags
+                    and metrics are not processed again. With DistributedOrchestrator, use a local file per node.
+
     Attributes:
     -   self.metrics_df: long-format table with metrics (columns) per year and Tag (row multi-index).
 
         Print in console the created instance to preview the resulting table.
 
+    -   self.peak_rss_mb: highest resident memory of the process in MB since it started (None if not supported by the OS).
+        It is cumulative, not the memory of this run: it includes anything the process did before.
+        self.peak_rss_mb_by_file keeps the value after each save, so it only grows. A save whose value
+        is above the one of the previous save raised the peak; the others used at most the memory already reached.
+
+    -   self.cache_stats: Dict with hits, misses, invalidated, evicted and pruned caches in the run. 
+        None if no cache is used.
+
+    -   self.tag_index: TagIndex used to resolve 3 letter tags and player names, None if all wanted tags are ids.
+
+    -   self.errors: List of SaveError with the saves that failed and why. See also self.errors_report().
+
+    -   self.resumed_files: List of saves whose metrics were taken from the checkpoint.
+
+    -   self.duplicates: Dict {skipped save: (kept save, reason)} with the duplicated saves that were not processed.
+
+    -   self.results_store: ResultsStore of results_db, None if not used. Query it with pivot() or long_df().
+
     Methods:
     -   self.save_long(). Use this method to save the self.metrics_df in a specific format supported by Pandas library.
                         The resulting table is a row per year and tag and columns per every metric.
 
     -   self.save_multiple_sheets(). Use this method to save self.metrics_df as a excel or .ods format 
                         where each page isfor a metric, a row per year and each column is a tag.
+
+    -   self.errors_report(). Table with a row per failed save: path, stage, error type and message.
     """
 
     def __init__(
@@ -56,7 +138,20 @@ class Orchestrator():
             folder_path: Path | str,
             wanted_tags: Set[TagIDStr],
             metrics_fn: Sequence[Callable[[Country], Dict]],
-            save_as_json: bool = False
+            save_as_json: bool = False,
+            parse_workers: Optional[int] = 1,
+            prefetch_files: int = 0,
+            prefetch_memory_mb: Optional[float] = None,
+            trusted_cache: bool = False,
+            cache_budget_mb: Optional[float] = None,
+            cache_max_age_days: Optional[float] = None,
+            cache_verify_hash: bool = False,
+            tokens_file: Optional[Path | str] = None,
+            stop_on_error: bool = False,
+            checkpoint_dir: Optional[Path | str] = None,
+            skip_duplicates: bool = True,
+            same_date_policy: str = "newest",
+            results_db: Optional[Path | str] = None
             ):
         
         if not wanted_tags:
@@ -65,14 +160,55 @@ class Orchestrator():
             raise ValueError(empty_seq_metrics_fn_error)
         
         CountryManager.wanted_tags = wanted_tags    # set varclass tags for runtime
+        if tokens_file is not None:
+            use_token_table(tokens_file)
         
         self.wanted_tags = wanted_tags
         self.metrics_fn = metrics_fn
+        self.plan = metric_plan(metrics_fn)
+        self.fields = self.plan.fields      # None if a metric needs the whole save
+        self.sections = None if self.fields is None else Vic3Save.sections_for(self.fields)
+        self._decode_all_countries = needs_all_countries(self.fields)
         self._cache_files_as_json = save_as_json
+        self.parse_workers = parse_workers
+        self.prefetch_files = prefetch_files
+        self.prefetch_memory_mb = prefetch_memory_mb
+        self.trusted_cache = trusted_cache
+        self.stop_on_error = stop_on_error
+        self.errors: List[SaveError] = []
+        self._errors_lock = threading.Lock()
+        self.resumed_files: List[Path] = []
+
+        self.run_fingerprint = run_fingerprint(wanted_tags, metrics_fn)
+        self.checkpoint = None
+        if checkpoint_dir is not None:
+            self.checkpoint = Checkpoint(checkpoint_dir, self.run_fingerprint)
+
+        self.results_store = None if results_db is None else ResultsStore(results_db)
 
         folder_path = Path(folder_path)
         self._files_generator = list(folder_path.iterdir())
 
+        self.duplicates: Dict[Path, Tuple[Path, str]] = {}
+        if skip_duplicates:
+            self._files_generator, self.duplicates = deduplicate_saves(self._files_generator, same_date_policy)
+            for skipped, (kept, reason) in self.duplicates.items():
+                warn(f"Skipping {skipped.name}, {reason} as {kept.name}.", ProcessingWarning)
+
+        self.cache = None
+        if save_as_json or trusted_cache:
+            self.cache = CacheManager(
+                nominate_cached_json(folder_path / "_").parent, 
+                max_mb=cache_budget_mb, 
+                max_age_days=cache_max_age_days,
+                verify_hash=cache_verify_hash,
+                )
+
+        self.tag_index = None
+        if needs_tag_index(wanted_tags):
+            # saves are scanned in the read stage (see _try_read_save), or before if another save needs them
+            self.tag_index = TagIndex(pending=[filepath for filepath in self._files_generator if filepath.is_file()])
+
         # initialisate runtime parsing
         self._parse_files()
         self.metrics_df = self._get_df_long_from_files()
@@ -84,31 +220,238 @@ class Orchestrator():
     def _parse_files(self):
         """ 
         Iterates all found files in the defined folder and returns 
-        the defined metrics in each file
+        the defined metrics in each file.
+
+        Each file goes through a pipeline of generators: read -> parse -> project -> metrics.
+        Every stage drops its reference to the data it yielded before pulling the next file,
+        so only one save is alive at a time and only the small metric tables are kept.
         """
         save_metrics = []
+        self.peak_rss_mb_by_file: Dict[Path, float] = {}
 
+        pending = []
         for filepath in self._files_generator:
-
-            if filepath.is_file():
-
-                vic3_reader = Vic3Reader(filepath, use_json=True)
-                data = vic3_reader.data
-                # Save as JSON in disk if flagged
-                if self._cache_files_as_json:
-                    vic3_reader.save_as_json(data, override=False)
-                
-                save_metrics.append(
-                    SaveMetrics(
-                            data, 
-                            self.wanted_tags, 
-                            self.metrics_fn
-                        ).to_dataframe() + (filepath,)
-                )  # add tuple from .to_dataframe and path of file for traceability
+            restored = self._restore(filepath)
+            if restored is None:
+                pending.append(filepath)
+            else:
+                save_metrics.append(restored)
+                self.resumed_files.append(filepath)
+
+        self._parse_pool = None
+        if self.parse_workers != 1:
+            from vic3_reader.parser.parallel import parse_pool
+            self._parse_pool = parse_pool(self.parse_workers)
+        try:
+            for game_date, df, filepath in self._run_pipeline(pending):
+                save_metrics.append((game_date, df, filepath))  # add path of file for traceability
+                self.peak_rss_mb_by_file[filepath] = peak_rss_mb()
+                if self.checkpoint is not None:
+                    self.checkpoint.store(game_date, df, filepath)
+                if self.results_store is not None:
+                    self.results_store.store(game_date, df, filepath, self.run_fingerprint)
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+
+        self.peak_rss_mb = peak_rss_mb()
+
+        self.cache_stats = None
+        if self.cache is not None:
+            self.cache.prune_missing()
+            self.cache.evict()
+            self.cache.save()
+            self.cache_stats = dict(self.cache.stats)
 
         # sort at the end by saved date
         self._saved_metrics: List[ Tuple[date, pd.DataFrame] ] = sorted(save_metrics, key=lambda x: x[0])
 
+    def _restore(self, filepath: Path) -> Optional[Tuple[date, pd.DataFrame, Path]]:
+        """ Metrics of a save kept by a previous run, from the results database or the checkpoint. None if there are none. """
+        if self.results_store is not None:
+            restored = self.results_store.load(filepath, self.run_fingerprint)
+            if restored is not None:
+                return restored
+
+        restored = self.checkpoint.load(filepath) if self.checkpoint is not None else None
+        if restored is not None and self.results_store is not None:
+            self.results_store.store(*restored, self.run_fingerprint)
+        return restored
+
+    def _run_pipeline(self, filepaths: Iterable[Path]) -> Iterator[Tuple[date, pd.DataFrame, Path]]:
+        """ Chain the stages for the given files. Yields (game date, metrics table, path of save). """
+        texts = self._read_stage(filepaths)
+        parsed = self._parse_stage(texts)
+        projected = self._project_stage(parsed)
+        return self._metrics_stage(projected)
+
+    def _read_stage(self, filepaths: Iterable[Path]) -> Iterator[Tuple[Path, str, str]]:
+        """ 
+        Yields (path of save, extension, text) reading the cached JSON when it exists.
+        With prefetch_files > 0, the next files are read in background threads.
+        """
+        filepaths = (filepath for filepath in filepaths if filepath.is_file())  # lazy, files can be claimed one by one
+
+        if not self.prefetch_files:
+            loaded = (self._try_read_save(filepath) for filepath in filepaths)
+        else:
+            loaded = prefetch_files(
+                filepaths,
+                self._try_read_save,
+                depth=self.prefetch_files,
+                memory_budget_mb=self.prefetch_memory_mb,
+                size=lambda filepath: file_size(select_source(filepath, use_json=True)),
+                )
+
+        for read_save in loaded:
+            if read_save is not None:   # None if the save could not be read
+                yield read_save
+            del read_save
+
+    def _try_read_save(self, filepath: Path) -> Optional[Tuple[Path, str, str | Vic3Save]]:
+        """ 
+        Returns self._read_save(filepath), or None if it fails and the error is recorded. 
+        With a tag index, the save is scanned for tags from the text just read.
+        """
+        try:
+            read_save = self._read_save(filepath)
+        except Exception as error:
+            self._record_error(filepath, "read", error)
+            return None
+
+        _, extension, text = read_save
+        if self.tag_index is not None and extension != TRUSTED_SUFFIX and filepath not in self.tag_index.saves:
+            try:
+                self.tag_index.add_save(filepath, (extension, text))
+            except Exception as error:
+                self._record_error(filepath, "tags", error)
+                return None
+
+        return read_save
+
+    def _read_save(self, filepath: Path) -> Tuple[Path, str, str | Vic3Save]:
+        """ 
+        Returns (path of save, extension, text). 
+        If a valid trusted cache exists, returns the already validated save instead of the text.
+        """
+        if self.trusted_cache and self.cache.lookup(filepath, nominate_trusted_cache(filepath)):
+            save = load_trusted(filepath, self._resolve_tags(filepath), self.fields)
+            if save is not None:
+                return (filepath, TRUSTED_SUFFIX, save)
+
+        return (filepath, *read(select_source(filepath, use_json=True, cache=self.cache)))
+
+    def _parse_stage(self, texts: Iterator[Tuple[Path, str, str]]) -> Iterator[Tuple[Path, Dict]]:
+        """ Yields (path of save, save data as a Dict). Caches the data as JSON if flagged. """
+        for filepath, extension, text in texts:
+            if extension == TRUSTED_SUFFIX:
+                yield filepath, text    # already a validated save
+                del text
+                continue
+
+            # the JSON cache keeps the whole save, so it can be used with any metrics later
+            sections = None if self._cache_files_as_json and extension != '.json' else self.sections
+            try:
+                # cached JSON only decode the wanted countries, unless a field is built from all of them
+                wanted_tags = None
+                if extension == '.json' and not self._decode_all_countries:
+                    wanted_tags = self._resolve_tags(filepath)
+                data = manage_parsing(extension, text, self.parse_workers, sections, wanted_tags, self._parse_pool)
+            except Exception as error:
+                self._record_error(filepath, "parse", error)
+                continue
+            finally:
+                del text
+
+            # Save as JSON in disk if flagged
+            if self._cache_files_as_json and extension != '.json':
+                try:
+                    save_as_json(filepath, data)
+                    self.cache.register(filepath, nominate_cached_json(filepath))
+                except OSError as error:    # i.e. disk full: the save is still measured, only the cache is lost
+                    warn(f"Could not cache {filepath.name} as JSON: {error}", ProcessingWarning)
+
+            yield filepath, data
+            del data
+
+    def _project_stage(self, parsed: Iterator[Tuple[Path, Dict]]) -> Iterator[Tuple[Path, Set[TagIDStr], Vic3Save]]:
+        """ 
+        Yields (path of save, wanted tag ids, save validated only for the wanted tags).
+        Saves from the trusted cache are not validated again. New ones are stored in it if flagged.
+        """
+        for filepath, data in parsed:
+            from_trusted_cache = isinstance(data, Vic3Save)
+            try:
+                wanted_tags = self._resolve_tags(filepath)
+                save = data if from_trusted_cache else validate_save(data, wanted_tags, self.fields)
+            except Exception as error:
+                self._record_error(filepath, "validate", error)
+                continue
+            finally:
+                del data
+
+            if self.trusted_cache and not from_trusted_cache:
+                try:
+                    save_trusted(filepath, save, wanted_tags, self.fields)
+                    self.cache.register(filepath, nominate_trusted_cache(filepath))
+                except OSError as error:
+                    warn(f"Could not store {filepath.name} in the trusted cache: {error}", ProcessingWarning)
+
+            yield filepath, wanted_tags, save
+            del save
+
+    def _metrics_stage(self, projected: Iterator[Tuple[Path, Set[TagIDStr], Vic3Save]]) -> Iterator[Tuple[date, pd.DataFrame, Path]]:
+        """ Yields (game date, metrics table, path of save). """
+        for filepath, wanted_tags, save in projected:
+            try:
+                game_date, df = SaveMetrics(save, wanted_tags, self.metrics_fn).to_dataframe()
+            except Exception as error:
+                self._record_error(filepath, "metrics", error)
+                continue
+            finally:
+                del save
+
+            yield game_date, df, filepath
+
+    def _record_error(self, filepath: Path, stage: str, error: Exception) -> None:
+        """ Record a save that failed in a stage and go on with the next one, or raise if stop_on_error. """
+        if self.stop_on_error:
+            raise error
+
+        with self._errors_lock:     # errors of the read stage are recorded in the prefetch threads
+            self.errors.append(SaveError.from_exception(filepath, stage, error))
+            if self.checkpoint is not None:
+                self.checkpoint.write_errors(self.errors)
+
+        first_line = next(iter(str(error).splitlines()), "")   # the full message is in the report
+        warn(
+            f"Skipping {filepath.name}, it failed in the {stage} stage: {type(error).__name__}: {first_line}",
+            ProcessingWarning,
+        )
+
+    def _resolve_tags(self, filepath: Path) -> Set[TagIDStr]:
+        """ 
+        Returns the tag ids to extract in a file.
+        3 letter tags and player names are resolved with the tag index for that save.
+        """
+        if self.tag_index is None:
+            return set(self.wanted_tags)
+
+        resolved = self.tag_index.resolve_all(self.wanted_tags, filepath)
+
+        for wanted, tag_id in resolved.items():
+            if tag_id is None:
+                warn(
+                    f"Tag or player '{wanted}' was not found in any save. Skipping it.",
+                    ProcessingWarning,
+                )
+
+        return {tag_id for tag_id in resolved.values() if tag_id is not None}
+
+    def errors_report(self) -> pd.DataFrame:
+        """ Table with a row per save that failed in this run: path, stage, error type and message. """
+        return errors_to_frame(self.errors)
 
     def _get_df_long_from_files(self):
         """
@@ -118,23 +461,7 @@ class Orchestrator():
         Result: MultiIndex (game_date, tag_id) dataframe with variables as columns.
         This dataframe is in long format.
         """
-        dfs = []
-
-        for game_date, df, filepath in self._saved_metrics:
-
-            index_name = "tag_id"
-            if df.index.name != index_name:
-                df = df.set_index(index_name, drop=True)
-
-            # Add date to index
-            df.index = pd.MultiIndex.from_product(
-                [[game_date], df.index],
-                names = ["game_date", index_name]
-            )
-            dfs.append(df)
-
-        merged_df = pd.concat(dfs)  # along rows
-        return merged_df
+        return to_long_df(self._saved_metrics)
 
     def save_long(self, filename: str, folder: str = None, **kwargs):
         """
@@ -142,27 +469,7 @@ class Orchestrator():
         The format is inferred from the file extension.
         Extra kwargs are passed to the corresponding pandas method.
         """
-        # Extract file extension without dot and convert to lowercase
-        ext = Path(filename).suffix[1:].lower()
-
-        if not ext:
-            raise ValueError("Filename must have an extension to infer the format.")
-        
-        if folder:
-            folder_path = Path(folder)
-            folder_path.mkdir(parents=True, exist_ok=True)
-            filepath = folder_path / filename
-
-        # Construct the method name
-        method_name = f"to_{ext}"
-
-        # Check if the dataframe has this method
-        if not hasattr(self.metrics_df, method_name):
-            raise ValueError(f"Unsupported file format: {ext}")
-
-        # Dynamically call the method
-        kwargs['index'] = True
-        getattr(self.metrics_df, method_name)(filepath, **kwargs)
+        save_long(self.metrics_df, filename, folder, **kwargs)
 
 
     def save_multiple_sheets(self, filename: str, folder: str = None, **kwargs ):
@@ -171,28 +478,7 @@ class Orchestrator():
         The format is inferred from the file extension.
         Extra kwargs are passed to the corresponding pandas method.
         """
-        # Extract file extension without dot and convert to lowercase
-        ext = Path(filename).suffix[1:].lower()
-
-        if not ext or ext not in ['xlsx', 'xls', 'ods']:
-            raise ValueError("Filename must have a valid extension to support sheets: xlsx, xlsx or ods.")
-        
-        if folder:
-            folder_path = Path(folder)
-            folder_path.mkdir(parents=True, exist_ok=True)
-            filepath = folder_path / filename
-
-        wide_tables: Dict[str, pd.DataFrame] = {}
-
-        for col in self.metrics_df.columns:
-            wide_tables[col] = self.metrics_df[col].unstack(level='tag_id')
-
-        kwargs['index'] = True
-
-        with pd.ExcelWriter(filepath, engine=kwargs.get('engine', None)) as writer:
-            for var, table in wide_tables.items():
-                table.columns = table.columns.map(str)  # avoid excel reinterpreting the IDs as floats
-                table.to_excel(writer, sheet_name=var, **kwargs)
+        save_multiple_sheets(self.metrics_df, filename, folder, **kwargs)
     
 
 class SaveMetrics():
@@ -210,6 +496,7 @@ class SaveMetrics():
 
     -   metrics_fn: Iterable sequence i.e. List, of functions designed to accept a Vic3save data model and return 
                     a dictionary with a set of metrics. This controls the metrics that will be extracted from the file.
+                    Names of metrics or groups in the metrics registry are also accepted (see metrics/registry.py).
 
     Methods:
     -   to_dataframe(). Use this method to parse all extracted metrics to a dataframe object. This returns a tuple with the
@@ -227,39 +514,21 @@ class SaveMetrics():
         if not metrics_fn:
             raise ValueError(empty_seq_metrics_fn_error)
         
+        self.plan = metric_plan(metrics_fn)   # also adds the TAG, always extracted
+
         if not isinstance(data, Vic3Save):
-            try:
-                data = Vic3Save(**data)
-            except ValidationError as e:
-               raise Vic3Save.pretty_missing_fields(e)
+            data = validate_save(data, wanted_tags, self.plan.fields)
         
         self.data = data
 
         self.tags = wanted_tags
         
-        self.metrics_fn: List[Callable[[Country], Dict]] = list(metrics_fn)
-        self.metrics_fn.append(get_tag_data) # ensure the TAG is always extracted
-
-    def _get_metrics_for_tag(self,
-                        tag: TagIDStr,
-                        ) -> Dict:
-
-        merged = {}     # Warning: make sure there are not repeated keys
-
-        for func in self.metrics_fn:
-            merged.update(func(self.data, tag))
-
-        return merged
+        self.metrics_fn: List[Callable[[Country], Dict] | str] = list(metrics_fn)
 
     def _iterate_tags(self,
                      ) -> Dict:
-        
-        tags_metrics = {}
-
-        for tag in self.tags:
-            tags_metrics[tag] = self._get_metrics_for_tag(tag)
-        
-        return tags_metrics
+        """ {tag id: metrics} computing each shared input once. Repeated metric names raise an error. """
+        return self.plan.compute(self.data, self.tags)
     
 
     def to_dataframe(self, 
@@ -286,4 +555,134 @@ class SaveMetrics():
             pd.DataFrame.from_dict(tags_metrics, orient='index').rename_axis("tag_id"),
         )
     
-        # The dataframe contructed here is in the format tag_id as row index and metrics as columns
\ No newline at end of file
+        # The dataframe contructed here is in the format tag_id as row index and metrics as columns
+
+
+def to_long_df(saved_metrics: Iterable[Tuple[date, pd.DataFrame, Path]]) -> pd.DataFrame:
+    """
+    Merge multiple (game_date, df, filepath) tuples into one long dataframe,
+    with MultiIndex (game_date, tag_id) and variables as columns.
+    """
+    dfs = []
+
+    for game_date, df, filepath in saved_metrics:
+
+        index_name = "tag_id"
+        if df.index.name != index_name:
+            df = df.set_index(index_name, drop=True)
+
+        # Add date to index
+        df.index = pd.MultiIndex.from_product(
+            [[game_date], df.index],
+            names = ["game_date", index_name]
+        )
+        dfs.append(df)
+
+    if not dfs:     # i.e. every save failed
+        return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=["game_date", "tag_id"]))
+
+    merged_df = pd.concat(dfs)  # along rows
+    return merged_df
+
+
+def save_long(metrics_df: pd.DataFrame, filename: str, folder: str = None, **kwargs):
+    """
+    Save a long table (i.e. Orchestrator.metrics_df) to disk in a format supported by pandas,
+    inferred from the file extension. Extra kwargs are passed to the corresponding pandas method.
+    """
+    # Extract file extension without dot and convert to lowercase
+    ext = Path(filename).suffix[1:].lower()
+
+    if not ext:
+        raise ValueError("Filename must have an extension to infer the format.")
+    
+    filepath = Path(filename)
+    if folder:
+        folder_path = Path(folder)
+        folder_path.mkdir(parents=True, exist_ok=True)
+        filepath = folder_path / filename
+
+    # Construct the method name
+    method_name = f"to_{ext}"
+
+    # Check if the dataframe has this method
+    if not hasattr(metrics_df, method_name):
+        raise ValueError(f"Unsupported file format: {ext}")
+
+    # Dynamically call the method
+    kwargs['index'] = True
+    getattr(metrics_df, method_name)(filepath, **kwargs)
+
+
+def save_multiple_sheets(metrics_df: pd.DataFrame, filename: str, folder: str = None, **kwargs):
+    """
+    Save a long table as a spreadsheet (xlsx, xls or ods) with a sheet per variable,
+    a row per game date and a column per tag. Extra kwargs are passed to the corresponding pandas method.
+    """
+    # Extract file extension without dot and convert to lowercase
+    ext = Path(filename).suffix[1:].lower()
+
+    if not ext or ext not in ['xlsx', 'xls', 'ods']:
+        raise ValueError("Filename must have a valid extension to support sheets: xlsx, xlsx or ods.")
+    
+    filepath = Path(filename)
+    if folder:
+        folder_path = Path(folder)
+        folder_path.mkdir(parents=True, exist_ok=True)
+        filepath = folder_path / filename
+
+    wide_tables: Dict[str, pd.DataFrame] = {}
+
+    for col in metrics_df.columns:
+        wide_tables[col] = metrics_df[col].unstack(level='tag_id')
+
+    kwargs['index'] = True
+
+    with pd.ExcelWriter(filepath, engine=kwargs.get('engine', None)) as writer:
+        for var, table in wide_tables.items():
+            table.columns = table.columns.map(str)  # avoid excel reinterpreting the IDs as floats
+            table.to_excel(writer, sheet_name=var, **kwargs)
+
+
+def metric_plan(metrics_fn: Sequence[Callable | str]) -> MetricPlan:
+    """ Resolve the selected metrics and the TAG, always extracted, in the metrics registry. """
+    return REGISTRY.plan([*metrics_fn, get_tag_data])
+
+
+def validate_save(data: Dict, wanted_tags: Set[TagIDStr], fields: Optional[Set[str]] = None) -> Vic3Save:
+    """ 
+    Validate the save data keeping only the wanted tags in the country database.
+    With fields, only these fields of Vic3Save (and the required ones) are validated.
+    """
+    CountryManager.wanted_tags = wanted_tags    # set varclass tags for runtime
+
+    if fields is not None:
+        data = Vic3Save.project(data, fields)
+
+    try:
+        return Vic3Save(**data)
+    except ValidationError as e:
+        raise Vic3Save.pretty_missing_fields(e)
+
+
+def needs_all_countries(fields: Optional[Set[str]]) -> bool:
+    """ True if the fields (None for all) include one built from every country, so a cached JSON is decoded whole. """
+    return fields is None or any(field in fields for field in Vic3Save.derived_fields)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Returns the peak resident memory of this process in MB since it started (ru_maxrss), 
+    or None if the OS does not support it. The value never decreases.
+    """
+    try:
+        import resource
+    except ImportError:     # i.e. Windows
+        return None
+
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / 1024**2   # bytes
+    return peak / 1024          # KB
@@ -1,7 +1,28 @@
-from lark import Lark
+"""
+The save parser is built lazily the first time it is used, not at import time.
 
-from vic3_reader.parser.lexicon import grammar, ToVic3
+Lark caches the compiled LALR tables on disk (keyed by the grammar, options and Lark version),
+so later processes and pool workers load them instead of analysing the grammar again.
+"""
 
-parser = Lark(grammar, parser="lalr", transformer=ToVic3(), lexer='contextual')
+from functools import lru_cache
 
-__all__ = ["parser",]
\ No newline at end of file
+
+@lru_cache(maxsize=None)
+def get_parser():
+    """ Returns the save parser, building it once per process from Lark's disk cache when possible. """
+    from lark import Lark
+
+    from vic3_reader.parser.lexicon import grammar, ToVic3
+
+    return Lark(grammar, parser="lalr", transformer=ToVic3(), lexer='contextual', cache=True)
+
+
+def __getattr__(name: str):
+    # keeps `from vic3_reader.parser import parser` working without building it at import
+    if name == "parser":
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["get_parser", "parser",]
@@ -0,0 +1,319 @@
+"""
+Read native (binary) Victoria 3 saves without converting them to plain text in the game.
+
+A save starts with a 24 bytes header: 'SAV', version, kind, a random id and the metadata size (hex digits).
+Odd kinds are binary, and most saves store the gamestate compressed in a zip appended to the header.
+
+The binary gamestate is a stream of 2 bytes little-endian tokens. A few tokens are operators
+('=', '{', '}') or announce a typed value (ints, floats, strings...). Any other token is a name
+(a key like 'country_manager' or a value like 'yes') whose text is not stored in the save: it must be
+looked up in a token table {token id: name} supplied by the user as a file (see load_token_table).
+
+The decoder builds the same structure as the plain-text parser (see lexicon.ToVic3): blocks with only
+`key=value` pairs are dicts (the last duplicated key wins), other blocks are lists, and `rgb {r g b}`
+is {'rgb': {'r': r, 'g': g, 'b': b}}.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+import re
+import struct
+
+BINARY_SUFFIX = ".bin"      # extension returned by reader.read() for binary gamestates
+HEADER_SIZE = 24
+BINARY_KINDS = (1, 3, 5)    # binary, binary in a zip, binary split from its metadata
+
+# ─── Tokens with a fixed meaning ────────────────────────────────────────────
+EQUALS = 0x0001
+OPEN = 0x0003
+CLOSE = 0x0004
+I32 = 0x000c
+F32 = 0x000d
+BOOL = 0x000e
+QUOTED = 0x000f
+U32 = 0x0014
+UNQUOTED = 0x0017
+F64 = 0x0167
+RGB = 0x0243
+U64 = 0x029c
+I64 = 0x0317
+
+F64_SCALE = 100_000     # f64 values are stored as fixed point integers
+
+_U16 = struct.Struct('<H')
+_I32 = struct.Struct('<i')
+_U32 = struct.Struct('<I')
+_F32 = struct.Struct('<f')
+_I64 = struct.Struct('<q')
+_U64 = struct.Struct('<Q')
+
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365)
+
+# Path of the token table used when none is given, see use_token_table()
+TOKENS_FILE: Optional[Path] = None
+
+missing_tokens_error = (
+    "Binary saves need a token table to decode names." \
+    " Set TOKENS_FILE in config.py or pass tokens_file to the Orchestrator."
+    )
+
+
+# ─── Token table ────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=4)
+def load_token_table(path: Path | str) -> Dict[int, str]:
+    """
+    Read a token table file with a token per line, as `<id> <name>` or `<name> <id>`.
+    Ids can be decimal or hexadecimal (0x...), and ';', ',' or '=' are accepted as separators.
+    Empty lines and lines starting with '#' are skipped.
+    """
+    tokens = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            parts = re.split(r'[\s;,=]+', line)
+            if len(parts) != 2:
+                raise ValueError(f"Line {line_number} of {path} is not a token id and a name: {line!r}")
+
+            first, second = parts
+            if _is_number(first):
+                tokens[int(first, 0)] = second
+            elif _is_number(second):
+                tokens[int(second, 0)] = first
+            else:
+                raise ValueError(f"Line {line_number} of {path} has no token id: {line!r}")
+
+    return tokens
+
+
+def _is_number(text: str) -> bool:
+    try:
+        int(text, 0)
+    except ValueError:
+        return False
+    return True
+
+
+def use_token_table(path: Optional[Path | str]) -> None:
+    """ Set the token table used to decode binary saves when no table is given explicitly. """
+    global TOKENS_FILE
+    TOKENS_FILE = None if path is None else Path(path)
+
+
+# ─── Save container ─────────────────────────────────────────────────────────
+
+def read_header(head: bytes) -> Optional[Tuple[int, int]]:
+    """ Returns (kind, metadata size) of a save header, or None if `head` is not a save header. """
+    if len(head) < HEADER_SIZE or not head.startswith(b"SAV") or head[HEADER_SIZE - 1:HEADER_SIZE] not in (b"\n", b"\r"):
+        return None
+    try:
+        return int(head[5:7], 16), int(head[15:23], 16)
+    except ValueError:
+        return None
+
+
+def read_packed_save(path: Path) -> Optional[Tuple[str, bytes | str]]:
+    """
+    Returns (extension, gamestate) of a binary or compressed save:
+    (BINARY_SUFFIX, bytes) for binary gamestates and (path.suffix, text) for compressed plain-text ones.
+    Returns None for uncompressed plain-text saves, which are read as usual.
+    """
+    import zipfile
+
+    with open(path, 'rb') as f:
+        header = read_header(f.read(HEADER_SIZE))
+        if header is None:
+            return None
+        kind, _ = header
+
+        if zipfile.is_zipfile(f):
+            with zipfile.ZipFile(f) as archive:
+                gamestate = archive.read("gamestate")
+        elif kind in BINARY_KINDS:
+            f.seek(HEADER_SIZE)
+            gamestate = f.read()
+        else:
+            return None
+
+    if kind in BINARY_KINDS:
+        return (BINARY_SUFFIX, gamestate)
+    return (path.suffix, gamestate.decode('utf-8'))
+
+
+# ─── Decoder ────────────────────────────────────────────────────────────────
+
+def binary_date(value: int) -> str:
+    """ Convert a date stored as hours since year -5000 (365 days years) to 'Y.M.D' or 'Y.M.D.H'. """
+    hour = value % 24
+    days = value // 24
+    year = days // 365 - 5000
+    day_of_year = days % 365
+
+    month = next(m for m in range(1, 13) if day_of_year < _DAYS_BEFORE_MONTH[m])
+    day = day_of_year - _DAYS_BEFORE_MONTH[month - 1] + 1
+
+    if hour:
+        return f"{year}.{month}.{day}.{hour}"
+    return f"{year}.{month}.{day}"
+
+
+def is_date_key(key: str) -> bool:
+    """ Dates are plain i32 in binary saves, they are only recognised by the key they belong to. """
+    return key == "date" or key.endswith("_date")
+
+
+def _container(items: List[Any]) -> Dict | List:
+    # same rule as ToVic3.set_handler
+    if all(isinstance(item, tuple) for item in items):
+        return dict(items)
+    return items
+
+
+def parse_binary(data: bytes, tokens: Optional[Dict[int, str]] = None, sections: Optional[Set[str]] = None) -> Dict:
+    """
+    Decode a binary gamestate to the same Python dictionary the plain-text parser returns.
+
+    Parameters:
+    -   data: bytes. Binary gamestate, without the save header (see read_packed_save).
+
+    -   tokens: Dict {token id: name}, optional. Defaults to the table set with use_token_table().
+                Tokens missing in the table are decoded as '__unknown_0x....'.
+
+    -   sections: Set of top-level keys, optional. Only these sections are decoded, the others are skipped.
+    """
+    if tokens is None:
+        if TOKENS_FILE is None:
+            raise ValueError(missing_tokens_error)
+        tokens = load_token_table(TOKENS_FILE)
+
+    view = memoryview(data)
+    end = len(data)
+    u16 = _U16.unpack_from
+
+    # frames of the open blocks: [items, key waiting for its value]
+    stack: List[List[Any]] = [[[], None]]
+    pos = 0
+
+    while pos < end:
+        token, = u16(view, pos)
+        pos += 2
+
+        if token == OPEN:
+            stack.append([[], None])
+            continue
+
+        if token == CLOSE:
+            if len(stack) == 1:
+                continue    # unbalanced '}' at the top level, as the game tolerates
+            items, _ = stack.pop()
+            value = _container(items)
+        elif token == RGB:
+            value, pos = _read_rgb(view, pos)
+        elif token == EQUALS:
+            raise ValueError(f"Unexpected '=' at byte {pos - 2}.")
+        else:
+            value, pos = _read_scalar(view, pos, token, tokens)
+
+            frame = stack[-1]
+            if frame[1] is None and pos + 2 <= end and u16(view, pos)[0] == EQUALS:
+                pos += 2
+                if sections is not None and len(stack) == 1 and str(value) not in sections:
+                    pos = _skip_value(view, pos, end)
+                    continue
+                frame[1] = str(value)   # it was a key
+                continue
+
+        frame = stack[-1]
+        key = frame[1]
+        if key is None:
+            frame[0].append(value)
+        else:
+            if isinstance(value, int) and not isinstance(value, bool) and is_date_key(key):
+                value = binary_date(value)
+            frame[0].append((key, value))
+            frame[1] = None
+
+    return dict(item for item in stack[0][0] if isinstance(item, tuple))
+
+
+def _read_scalar(view: memoryview, pos: int, token: int, tokens: Dict[int, str]) -> Tuple[Any, int]:
+    """ Returns (value, position after it) for a value token starting at `pos` (after the token id). """
+    if token == I32:
+        return _I32.unpack_from(view, pos)[0], pos + 4
+    if token == U32:
+        return _U32.unpack_from(view, pos)[0], pos + 4
+    if token == QUOTED or token == UNQUOTED:
+        length, = _U16.unpack_from(view, pos)
+        start = pos + 2
+        return bytes(view[start:start + length]).decode('utf-8', errors='replace'), start + length
+    if token == F32:
+        return _F32.unpack_from(view, pos)[0], pos + 4
+    if token == F64:
+        return round(_I64.unpack_from(view, pos)[0] / F64_SCALE, 5), pos + 8
+    if token == BOOL:
+        return ("yes" if view[pos] else "no"), pos + 1
+    if token == I64:
+        return _I64.unpack_from(view, pos)[0], pos + 8
+    if token == U64:
+        return _U64.unpack_from(view, pos)[0], pos + 8
+
+    name = tokens.get(token)
+    if name is None:
+        name = f"__unknown_0x{token:04x}"
+    return name, pos
+
+
+def _skip_value(view: memoryview, pos: int, end: int) -> int:
+    """ Position after the value starting at `pos`, walking over its tokens without decoding them. """
+    depth = 0
+    while pos < end:
+        token, = _U16.unpack_from(view, pos)
+        pos += 2
+        if token == OPEN:
+            depth += 1
+        elif token == CLOSE:
+            depth -= 1
+        elif token == EQUALS or token == RGB:
+            continue    # the value or the block comes next
+        else:
+            pos += _payload_size(view, pos, token)
+        if depth <= 0:
+            return pos
+    return pos
+
+
+def _payload_size(view: memoryview, pos: int, token: int) -> int:
+    if token in (I32, U32, F32):
+        return 4
+    if token in (F64, I64, U64):
+        return 8
+    if token == BOOL:
+        return 1
+    if token == QUOTED or token == UNQUOTED:
+        return 2 + _U16.unpack_from(view, pos)[0]
+    return 0    # names have no payload
+
+
+def _read_rgb(view: memoryview, pos: int) -> Tuple[Dict, int]:
+    """ rgb { r g b } -> {'rgb': {'r': r, 'g': g, 'b': b}} """
+    token, = _U16.unpack_from(view, pos)
+    if token != OPEN:
+        raise ValueError(f"Expected '{{' after rgb at byte {pos}.")
+    pos += 2
+
+    channels = []
+    for _ in range(3):
+        token, = _U16.unpack_from(view, pos)
+        value, pos = _read_scalar(view, pos + 2, token, {})
+        channels.append(int(value))
+
+    token, = _U16.unpack_from(view, pos)
+    if token != CLOSE:
+        raise ValueError(f"Expected '}}' after rgb values at byte {pos}.")
+
+    r, g, b = channels
+    return {'rgb': {'r': r, 'g': g, 'b': b}}, pos + 2
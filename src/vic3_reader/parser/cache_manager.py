@@ -0,0 +1,226 @@
+"""
+Manage the caches of parsed saves in the json_saves/ folder (JSON and trusted caches).
+
+A manifest in the folder records, for every cache file, the save it comes from (size, modification
+time and optionally a hash), its size and when it was last used. With it the manager:
+    - invalidates caches whose save changed,
+    - evicts caches older than a maximum age, then the least recently used ones over a disk budget,
+    - prunes caches of saves that no longer exist,
+    - counts hits and misses.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+MANIFEST_NAME = "cache_manifest.json"
+CACHE_SUFFIXES = (".json", ".trusted")
+
+
+def source_name(cache_name: str) -> str:
+    """ 'prussia_1844.v3.json' -> 'prussia_1844.v3' """
+    for suffix in CACHE_SUFFIXES:
+        if cache_name.endswith(suffix):
+            return cache_name[:-len(suffix)]
+    return cache_name
+
+
+def file_sha256(path: Path, chunk_size: int = 1024**2) -> str:
+    """ Hash a file reading it in chunks. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CacheManager():
+    """
+    Keep the cache folder of a save folder under a disk budget.
+
+    Parameters:
+    -   cache_dir: Path. Folder with the caches, i.e. 'saves/json_saves'.
+
+    -   max_mb: float, optional. Disk budget for all cache files. Least recently used caches are removed over it.
+
+    -   max_age_days: float, optional. Caches not used for longer than this are removed.
+
+    -   verify_hash: bool, default False. Also store a hash of the save. A cache is then kept valid when
+                    the save modification time changes but its content does not (i.e. copied saves),
+                    at the cost of reading the whole save to hash it.
+
+    Attributes:
+    -   self.stats: Dict with counts of hits, misses, invalidations, evictions and pruned caches.
+    """
+    def __init__(
+            self,
+            cache_dir: Path | str,
+            max_mb: Optional[float] = None,
+            max_age_days: Optional[float] = None,
+            verify_hash: bool = False
+            ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = None if max_mb is None else int(max_mb * 1024**2)
+        self.max_age_days = max_age_days
+        self.verify_hash = verify_hash
+
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0, "evicted": 0, "pruned": 0}
+        self._lock = threading.RLock()   # caches can be looked up from prefetch threads
+        self._manifest_path = self.cache_dir / MANIFEST_NAME
+        self.entries: Dict[str, Dict] = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self._manifest_path.is_file():
+            return {}
+        try:
+            return json.loads(self._manifest_path.read_text(encoding='utf-8'))
+        except ValueError:
+            return {}   # a broken manifest only loses the usage history
+
+    def save(self) -> None:
+        """
+        Write the manifest atomically. Each writer (host, process and thread) writes its own temporary file,
+        so managers of the same folder in other processes or nodes never replace a half-written manifest.
+        """
+        with self._lock:
+            data = json.dumps(self.entries, indent=1)
+        writer = f"{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}"
+        tmp_path = self._manifest_path.with_name(f"{self._manifest_path.name}.{writer}.tmp")
+        try:
+            tmp_path.write_text(data, encoding='utf-8')
+            os.replace(tmp_path, self._manifest_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _source_fingerprint(self, source: Path) -> Dict:
+        stat = source.stat()
+        return {"source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns}
+
+    def lookup(self, source: Path, cache_path: Path) -> bool:
+        """
+        Returns True if `cache_path` exists and was made from the current `source`.
+        Stale caches are deleted. Caches written before the manager was used are adopted
+        if they are newer than the save. Records a hit or a miss.
+        """
+        with self._lock:
+            return self._lookup(source, cache_path)
+
+    def _lookup(self, source: Path, cache_path: Path) -> bool:
+        entry = self.entries.get(cache_path.name)
+
+        if not cache_path.is_file():
+            self.stats["misses"] += 1
+            self.entries.pop(cache_path.name, None)
+            return False
+
+        if entry is None and source.is_file() and cache_path.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+            self._register(source, cache_path)
+            entry = self.entries[cache_path.name]
+
+        if entry is None or not self._is_fresh(source, entry):
+            self.stats["misses"] += 1
+            self.stats["invalidated"] += 1
+            self._remove(cache_path.name)
+            return False
+
+        entry["last_used"] = time.time()
+        self.stats["hits"] += 1
+        return True
+
+    def _is_fresh(self, source: Path, entry: Dict) -> bool:
+        if not source.is_file():
+            return False
+
+        current = self._source_fingerprint(source)
+        if current["source_size"] != entry["source_size"]:
+            return False
+        if current["source_mtime_ns"] == entry["source_mtime_ns"]:
+            return True
+
+        if self.verify_hash and entry.get("source_sha256") == file_sha256(source):
+            entry.update(current)   # same content, i.e. the save was copied
+            return True
+        return False
+
+    def register(self, source: Path, cache_path: Path) -> None:
+        """ Record a new cache file of `source` and evict others if the budget is exceeded. """
+        with self._lock:
+            self._register(source, cache_path)
+            self._evict(keep=cache_path.name)
+
+    def _register(self, source: Path, cache_path: Path) -> None:
+        entry = {
+            "source": source.name,
+            **self._source_fingerprint(source),
+            "size": cache_path.stat().st_size,
+            "created": time.time(),
+            "last_used": time.time(),
+        }
+        if self.verify_hash:
+            entry["source_sha256"] = file_sha256(source)
+
+        self.entries[cache_path.name] = entry
+
+    def invalidate(self, source: Path) -> None:
+        """ Remove every cache of `source`. """
+        with self._lock:
+            for name in [name for name, entry in self.entries.items() if entry["source"] == source.name]:
+                self._remove(name)
+                self.stats["invalidated"] += 1
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Remove caches older than max_age_days, then the least recently used ones until the
+        total size is under max_mb. The cache named `keep` is never removed.
+        """
+        with self._lock:
+            self._evict(keep)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        if self.max_age_days is not None:
+            oldest = time.time() - self.max_age_days * 86400
+            for name in [name for name, entry in self.entries.items() if entry["last_used"] < oldest]:
+                if name != keep:
+                    self._remove(name)
+                    self.stats["evicted"] += 1
+
+        if self.max_bytes is None:
+            return
+
+        total = sum(entry["size"] for entry in self.entries.values())
+        for name in sorted(self.entries, key=lambda name: self.entries[name]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self.entries[name]["size"]
+            self._remove(name)
+            self.stats["evicted"] += 1
+
+    def prune_missing(self, saves_dir: Optional[Path] = None) -> None:
+        """ Remove the caches, in the manifest or not, whose save no longer exists in `saves_dir`. """
+        saves_dir = self.cache_dir.parent if saves_dir is None else Path(saves_dir)
+
+        with self._lock:
+            for path in self.cache_dir.iterdir():
+                if path.name.endswith(CACHE_SUFFIXES) and path.name != MANIFEST_NAME \
+                        and not (saves_dir / source_name(path.name)).is_file():
+                    self._remove(path.name)
+                    self.stats["pruned"] += 1
+
+            for name in [name for name, entry in self.entries.items() if not (saves_dir / entry["source"]).is_file()]:
+                self._remove(name)
+                self.stats["pruned"] += 1
+
+    def total_mb(self) -> float:
+        return sum(entry["size"] for entry in self.entries.values()) / 1024**2
+
+    def _remove(self, name: str) -> None:
+        self.entries.pop(name, None)
+        (self.cache_dir / name).unlink(missing_ok=True)
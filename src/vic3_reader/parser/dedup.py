@@ -0,0 +1,199 @@
+"""
+Find duplicated saves in a folder before parsing them, i.e. a manual save that copies an autosave or a renamed file.
+
+The pre-pass is cheap: every save is fingerprinted with its size and the game date found in its first KBs,
+and only saves with the same size are hashed (files with different sizes cannot have the same content).
+
+Two kinds of duplicates are skipped:
+    - saves with the same content as another one: only one copy is kept.
+    - saves with the same game date as another one: they would give repeated (game_date, tag_id) rows,
+      one of them is kept according to a policy (see SAME_DATE_POLICIES).
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import struct
+
+from pydantic import BaseModel
+
+from vic3_reader.parser import binary
+from vic3_reader.parser.binary import BINARY_KINDS, EQUALS, HEADER_SIZE, I32, binary_date, load_token_table, read_header
+from vic3_reader.parser.cache_manager import file_sha256
+
+HEAD_SIZE = 64 * 1024   # bytes read from the start of a save to find its date
+
+# Which save is kept when several saves have the same game date
+SAME_DATE_POLICIES = (
+    "newest",   # the last modified one
+    "oldest",   # the first modified one
+    "largest",  # the biggest file, i.e. when the other is a partial copy
+    "all",      # keep all of them, the game date is not used to find duplicates
+    "error",    # raise an error listing the saves
+)
+
+same_date_error = (
+    "Several saves have the same game date, set a policy to keep one of them" \
+    " (same_date_policy / SAME_DATE_POLICY):"
+    )
+
+
+class SaveFingerprint(BaseModel):
+    """ Size, modification time, game date (None if not found in the head) and hash (only if needed) of a save. """
+    path: Path
+    size: int
+    mtime_ns: int
+    game_date: Optional[date] = None
+    sha256: Optional[str] = None
+
+
+def read_head(path: Path, size: int = HEAD_SIZE) -> Tuple[bool, bytes]:
+    """ Returns (is binary, first `size` bytes of the gamestate), uncompressing it if the save is a zip. """
+    import zipfile
+
+    with open(path, 'rb') as f:
+        header = read_header(f.read(HEADER_SIZE))
+        if header is None:
+            f.seek(0)
+            return False, f.read(size)
+
+        kind, _ = header
+        if zipfile.is_zipfile(f):
+            with zipfile.ZipFile(f) as archive, archive.open("gamestate") as gamestate:
+                return kind in BINARY_KINDS, gamestate.read(size)
+
+        f.seek(HEADER_SIZE)
+        return kind in BINARY_KINDS, f.read(size)
+
+
+def head_date(path: Path) -> Optional[date]:
+    """ Game date of a save read from its first KBs, or None if it is not there (or binary without token table). """
+    from vic3_reader.metrics.metadata import get_game_date
+
+    is_binary, head = read_head(path)
+    game_date = _binary_head_date(head) if is_binary else _text_head_date(head.decode('utf-8', errors='ignore'))
+
+    if game_date is None:
+        return None
+    try:
+        return get_game_date(game_date)['game_date']
+    except ValueError:
+        return None
+
+
+def _text_head_date(head: str) -> Optional[str]:
+    """ Top-level 'date', or 'game_date' of the meta_data block, found before the head is cut. """
+    from vic3_reader.parser import scanner
+
+    try:
+        for key, start, end in scanner.iter_pairs(head):
+            if key == 'date':
+                return scanner.atom(head, (start, end))
+            if key == 'meta_data' and head.startswith('{', start):
+                span = scanner.find_key(head, 'game_date', *scanner.inner((start, end)))
+                if span:
+                    return scanner.atom(head, span)
+    except ValueError:
+        pass    # reached a block cut by the end of the head
+    return None
+
+
+def _binary_head_date(head: bytes) -> Optional[str]:
+    """ First `date=<i32>` or `game_date=<i32>` in the head. Needs the token table to know the date tokens. """
+    if binary.TOKENS_FILE is None:     # set with use_token_table()
+        return None
+    tokens = load_token_table(binary.TOKENS_FILE)
+
+    found = []
+    for token_id, name in tokens.items():
+        if name in ('date', 'game_date'):
+            pos = head.find(struct.pack('<HHH', token_id, EQUALS, I32))
+            if pos >= 0 and pos + 10 <= len(head):
+                found.append((pos, struct.unpack_from('<i', head, pos + 6)[0]))
+
+    if not found:
+        return None
+    return binary_date(min(found)[1])
+
+
+def fingerprint_saves(paths: Iterable[Path]) -> List[SaveFingerprint]:
+    """ Fingerprint the files, hashing only those whose size is shared with another file. """
+    fingerprints = []
+    for path in paths:
+        if not path.is_file():
+            continue
+        stat = path.stat()
+        try:
+            game_date = head_date(path)
+        except (OSError, ValueError, KeyError):
+            game_date = None    # unreadable saves are left to fail (and be reported) when they are processed
+        fingerprints.append(SaveFingerprint(path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns, game_date=game_date))
+
+    by_size: Dict[int, List[SaveFingerprint]] = {}
+    for fingerprint in fingerprints:
+        by_size.setdefault(fingerprint.size, []).append(fingerprint)
+
+    for same_size in by_size.values():
+        if len(same_size) > 1:
+            for fingerprint in same_size:
+                fingerprint.sha256 = file_sha256(fingerprint.path)
+
+    return fingerprints
+
+
+def deduplicate_saves(paths: Iterable[Path], same_date_policy: str = "newest") -> Tuple[List[Path], Dict[Path, Tuple[Path, str]]]:
+    """
+    Returns (saves to process, {skipped save: (kept save, reason)}).
+    Paths that are not files (i.e. the 'json_saves' folder) are kept as they are.
+
+    Parameters:
+    -   paths: Iterable of Path. Files of the saves folder.
+
+    -   same_date_policy: str, default "newest". What to do with saves with the same game date, see SAME_DATE_POLICIES.
+    """
+    if same_date_policy not in SAME_DATE_POLICIES:
+        raise ValueError(f"Unknown same_date_policy '{same_date_policy}', use one of {SAME_DATE_POLICIES}.")
+
+    paths = list(paths)
+    fingerprints = sorted(fingerprint_saves(paths), key=lambda fingerprint: fingerprint.path.name)
+    skipped: Dict[Path, Tuple[Path, str]] = {}
+
+    # same content: keep the first one by name
+    by_hash: Dict[str, SaveFingerprint] = {}
+    for fingerprint in fingerprints:
+        if fingerprint.sha256 is None:
+            continue
+        kept = by_hash.setdefault(fingerprint.sha256, fingerprint)
+        if kept is not fingerprint:
+            skipped[fingerprint.path] = (kept.path, "same content")
+
+    # same game date: keep one by policy
+    if same_date_policy != "all":
+        by_date: Dict[date, List[SaveFingerprint]] = {}
+        for fingerprint in fingerprints:
+            if fingerprint.path not in skipped and fingerprint.game_date is not None:
+                by_date.setdefault(fingerprint.game_date, []).append(fingerprint)
+
+        conflicts = {game_date: same_date for game_date, same_date in by_date.items() if len(same_date) > 1}
+
+        if conflicts and same_date_policy == "error":
+            raise ValueError(same_date_error + "".join(
+                f"\n  {game_date}: {', '.join(fingerprint.path.name for fingerprint in same_date)}"
+                for game_date, same_date in sorted(conflicts.items())
+            ))
+
+        for game_date, same_date in conflicts.items():
+            kept = _keep_by_policy(same_date, same_date_policy)
+            for fingerprint in same_date:
+                if fingerprint is not kept:
+                    skipped[fingerprint.path] = (kept.path, f"same game date {game_date}")
+
+    return [path for path in paths if path not in skipped], skipped
+
+
+def _keep_by_policy(same_date: List[SaveFingerprint], policy: str) -> SaveFingerprint:
+    if policy == "newest":
+        return max(same_date, key=lambda fingerprint: fingerprint.mtime_ns)
+    if policy == "oldest":
+        return min(same_date, key=lambda fingerprint: fingerprint.mtime_ns)
+    return max(same_date, key=lambda fingerprint: fingerprint.size)     # largest
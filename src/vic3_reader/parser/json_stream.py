@@ -0,0 +1,184 @@
+"""
+Read the JSON caches of saves (json_saves/*.v3.json) decoding only the sections that are needed.
+
+json.loads() builds the Python objects of the whole save, most of which are never used when only a few
+countries are wanted. Here the cache is scanned as bytes (usually a memory map of the file, so it is not
+even copied in memory): objects are walked key by key and the values that are not needed are jumped over
+with regexes, without decoding them. Only the needed values are decoded with json.loads().
+
+With wanted tags, only their entries of country_manager.database are decoded, i.e. 13 countries
+instead of a thousand.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+import json
+import mmap
+import re
+
+COUNTRY_MANAGER = "country_manager"
+DATABASE = "database"
+
+_WS = re.compile(rb'[ \t\n\r]*+')
+_STRING = re.compile(rb'"(?:[^"\\]++|\\.)*+"')
+_SCALAR = re.compile(rb'[^,\]}\s]++')
+_BRACKET_OR_STRING = re.compile(rb'"(?:[^"\\]++|\\.)*+"|[\[\]{}]')
+
+NESTED_DEPTH = 6    # objects and arrays up to this depth are matched by a single regex
+
+_OPEN = frozenset(b'[{')
+_CLOSE = frozenset(b']}')
+
+
+def _nested_block(depth: int) -> re.Pattern:
+    """ Regex of an object or array with up to `depth` levels of nested blocks. Possessive quantifiers never backtrack. """
+    string = rb'"(?:[^"\\]++|\\.)*+"'
+    block = rb'[\[{](?:[^\[\]{}"]++|' + string + rb')*+[\]}]'
+    for _ in range(depth - 1):
+        block = rb'[\[{](?:[^\[\]{}"]++|' + string + rb'|' + block + rb')*+[\]}]'
+    return re.compile(block)
+
+
+_NESTED_BLOCK = _nested_block(NESTED_DEPTH)
+
+
+def open_json(path: Path) -> bytes | mmap.mmap:
+    """ Read-only memory map of a JSON file (its bytes if it is empty), asking the OS to read it ahead. """
+    with open(path, 'rb') as f:
+        if path.stat().st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    will_need = getattr(mmap, "MADV_WILLNEED", None)
+    if will_need is not None:
+        mapped.madvise(will_need)
+    return mapped
+
+
+# ─── Scanning ───────────────────────────────────────────────────────────────
+
+def match_bracket(data: bytes, start: int) -> int:
+    """
+    Return the index just after the ']' or '}' closing the block found at `start`.
+    Brackets inside strings are ignored. Deep blocks are walked bracket by bracket,
+    jumping over their not too deep sub-blocks, as scanner.match_brace() does.
+    """
+    m = _NESTED_BLOCK.match(data, start)
+    if m:
+        return m.end()
+
+    depth = 0
+    pos = start
+    while True:
+        m = _BRACKET_OR_STRING.search(data, pos)
+        if m is None:
+            raise ValueError(f"Unbalanced JSON block starting at byte {start}.")
+        token = data[m.start()]
+        if token in _OPEN:
+            if depth:
+                sub_block = _NESTED_BLOCK.match(data, m.start())
+                if sub_block:
+                    pos = sub_block.end()
+                    continue
+            depth += 1
+        elif token in _CLOSE:
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        pos = m.end()
+
+
+def skip_value(data: bytes, start: int) -> int:
+    """ Return the index just after the JSON value starting at `start`. """
+    first = data[start]
+    if first in _OPEN:
+        return match_bracket(data, start)
+    m = (_STRING if first == ord('"') else _SCALAR).match(data, start)
+    if not m:
+        raise ValueError(f"Unexpected byte {bytes([first])!r} at byte {start}.")
+    return m.end()
+
+
+def skip_ws(data: bytes, pos: int) -> int:
+    """ Index of the first byte that is not whitespace from `pos`. """
+    return _WS.match(data, pos).end()
+
+
+def iter_members(data: bytes, start: int) -> Iterator[Tuple[str, int, int]]:
+    """ Iterate the members of the object starting at `start`. Yields (key, value_start, value_end). """
+    if data[start] != ord('{'):
+        raise ValueError(f"Expected a JSON object at byte {start}.")
+
+    pos = skip_ws(data, start + 1)
+    if data[pos] == ord('}'):
+        return
+
+    while True:
+        m = _STRING.match(data, pos)
+        if not m:
+            raise ValueError(f"Expected a key at byte {pos}.")
+        raw_key = data[m.start() + 1:m.end() - 1]
+        key = json.loads(data[m.start():m.end()]) if b'\\' in raw_key else raw_key.decode('utf-8')
+
+        pos = skip_ws(data, m.end())
+        if data[pos] != ord(':'):
+            raise ValueError(f"Expected ':' at byte {pos}.")
+        value_start = skip_ws(data, pos + 1)
+        value_end = skip_value(data, value_start)
+        yield key, value_start, value_end
+
+        pos = skip_ws(data, value_end)
+        if data[pos] == ord('}'):
+            return
+        if data[pos] != ord(','):
+            raise ValueError(f"Expected ',' or '}}' at byte {pos}.")
+        pos = skip_ws(data, pos + 1)
+
+
+def _decode(data: bytes, start: int, end: int) -> Any:
+    return json.loads(data[start:end])
+
+
+# ─── Loading ────────────────────────────────────────────────────────────────
+
+def load_json(data: str | bytes, sections: Optional[Set[str]] = None, wanted_tags: Optional[Set[str]] = None) -> Dict:
+    """
+    Decode a JSON cache of a save keeping only some sections.
+
+    Parameters:
+    -   data: str, bytes or memory map. Content of the cache (see open_json).
+
+    -   sections: Set of top-level keys, optional. Only these sections are decoded. All of them if None.
+
+    -   wanted_tags: Set of tag ids, optional. Only these entries of country_manager.database are decoded,
+                    and the other keys of country_manager are skipped. The whole section if None.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if sections is None and wanted_tags is None:
+        return json.loads(data[:] if isinstance(data, mmap.mmap) else data)
+
+    wanted_tags = None if wanted_tags is None else {str(tag) for tag in wanted_tags}
+    result = {}
+
+    for key, value_start, value_end in iter_members(data, skip_ws(data, 0)):
+        if sections is not None and key not in sections:
+            continue
+        if key == COUNTRY_MANAGER and wanted_tags is not None and data[value_start] == ord('{'):
+            result[key] = _load_country_manager(data, value_start, wanted_tags)
+        else:
+            result[key] = _decode(data, value_start, value_end)
+
+    return result
+
+
+def _load_country_manager(data: bytes, start: int, wanted_tags: Set[str]) -> Dict:
+    """ country_manager with only the database entries of the wanted tags. """
+    for key, value_start, _ in iter_members(data, start):
+        if key == DATABASE and data[value_start] == ord('{'):
+            return {DATABASE: {
+                tag_id: _decode(data, country_start, country_end)
+                for tag_id, country_start, country_end in iter_members(data, value_start)
+                if tag_id in wanted_tags
+            }}
+    return {DATABASE: {}}
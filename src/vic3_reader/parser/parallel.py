@@ -0,0 +1,68 @@
+"""
+Parse one plain-text v3 save using several processes.
+
+The top level of a save is a sequence of independent `key=value` blocks, so the text is split 
+between blocks and each chunk is parsed in a process pool. The chunks are merged in order into 
+the same dictionary that a single parse returns.
+
+Starting the processes and loading the parser in each of them takes longer than parsing a small save,
+so a run over many saves creates the pool once with parse_pool() and passes it to every parse.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import os
+
+from vic3_reader.parser import get_parser
+from vic3_reader.parser.scanner import split_top_level
+
+CHUNKS_PER_WORKER = 4   # more chunks than workers to balance blocks of different sizes
+
+
+def parse_chunk(chunk: str) -> List[Tuple]:
+    """ Parse a piece of a save made of complete top-level pairs. """
+    return get_parser().parse(chunk)
+
+
+def parse_pool(workers: Optional[int] = None) -> 'ProcessPoolExecutor':
+    """
+    Process pool for parse_in_chunks(), to reuse for every save of a run. Shut it down when done
+    (or use it in a `with` block). Processes start on the first parse.
+
+    Args:
+        workers: int (Opt) - Number of processes. Defaults to the number of CPUs.
+    """
+    from concurrent.futures import ProcessPoolExecutor   # not at the top, it imports multiprocessing
+
+    # each worker loads the parser once when it starts, from the disk cache
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=get_parser)
+
+
+def parse_in_chunks(text: str, workers: Optional[int] = None, pool: Optional['ProcessPoolExecutor'] = None) -> Dict:
+    """
+    Parse a plain-text save in parallel and return it as a dictionary.
+
+    Args:
+        text: str - Content of a plain-text v3 save.
+        workers: int (Opt) - Number of processes. Defaults to the number of CPUs.
+        pool: ProcessPoolExecutor (Opt) - Pool made with parse_pool(workers), reused instead of starting a new one.
+
+    Returns:
+        Dict with the same content as parsing the whole text at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = split_top_level(text, workers * CHUNKS_PER_WORKER)
+
+    if workers == 1 or len(chunks) == 1:
+        return dict(parse_chunk(text))
+
+    if pool is None:
+        with parse_pool(min(workers, len(chunks))) as own_pool:
+            return _merge(own_pool.map(parse_chunk, chunks))
+    return _merge(pool.map(parse_chunk, chunks))
+
+
+def _merge(parsed_chunks) -> Dict:
+    merged = {}
+    for pairs in parsed_chunks:
+        merged.update(pairs)    # same as dict(): repeated keys keep the last value
+    return merged
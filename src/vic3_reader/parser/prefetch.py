@@ -0,0 +1,68 @@
+"""
+Read the next files in background threads while the current one is being parsed.
+
+Reading a 100-300MB save from a slow or network disk can take as long as parsing it.
+With a prefetch, the disk time of the next saves overlaps with the CPU time of the current one.
+"""
+
+from collections import deque
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def file_size(path: Path) -> int:
+    return Path(path).stat().st_size
+
+
+def prefetch_files(
+        paths: Iterable[Path],
+        load: Callable[[Path], T],
+        depth: int = 2,
+        memory_budget_mb: Optional[float] = None,
+        size: Callable[[Path], int] = file_size,
+        ) -> Iterator[T]:
+    """
+    Yield load(path) for every path, in order, loading up to `depth` files ahead in threads.
+
+    Args:
+        paths: Iterable of files to load.
+        load: function reading one file, i.e. vic3_reader.parser.reader.read.
+        depth: int - Maximum number of files loaded ahead of the one being used.
+        memory_budget_mb: float (Opt) - Maximum MB of files loaded ahead, estimated with `size`.
+            One file is always loaded even if it is bigger than the budget.
+        size: function returning the expected bytes in memory of a file. Defaults to its size in disk.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    budget = None if memory_budget_mb is None else memory_budget_mb * 1024**2
+    depth = max(1, depth)
+
+    upcoming = iter(paths)
+    next_path = next(upcoming, None)
+    pending = deque()   # (bytes, future) in the order of paths
+    in_flight = 0
+
+    with ThreadPoolExecutor(max_workers=depth) as pool:
+
+        def fill():
+            nonlocal next_path, in_flight
+            while next_path is not None and len(pending) < depth:
+                expected = size(next_path)
+                if pending and budget is not None and in_flight + expected > budget:
+                    return
+                pending.append((expected, pool.submit(load, next_path)))
+                in_flight += expected
+                next_path = next(upcoming, None)
+
+        fill()
+        while pending:
+            expected, future = pending.popleft()
+            in_flight -= expected
+            loaded = future.result()
+            del future
+
+            fill()  # start the next reads before handing this file over
+            yield loaded
+            del loaded
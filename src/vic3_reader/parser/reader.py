@@ -2,13 +2,17 @@
 Define the utils to manage files for plain-text objects with v3 saves information. 
 
 It automatically defines if we read a json file if save was already converted to json standard
-or we read the plain text. 
+or we read the plain text. Native binary and compressed saves are also read (see binary.py).
 """
 
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Optional, Set, Tuple
 import json
 
+from vic3_reader.parser.binary import BINARY_SUFFIX, parse_binary, read_packed_save
+from vic3_reader.parser.cache_manager import CacheManager
+from vic3_reader.parser.json_stream import load_json, open_json
+
 
 class Vic3Reader():
 	"""
@@ -20,20 +24,28 @@ class Vic3Reader():
 
 	- use_json: bool. If True, guess the expected JSON route from the provided path.
 
+	- workers: int, default 1. Number of processes to parse a plain-text save. None uses all CPUs.
+
+	- cache: CacheManager, optional. If given, the cached JSON is only used if it was made from the current
+	  save, and new JSON files are registered in it to keep the cache folder under its disk budget.
+
 	- Method save_as_json() to save a JSON version in the expected route of the project.
 	"""
 	def __init__(self, 
 			  path: Path,
-			  use_json: bool = True
+			  use_json: bool = True,
+			  workers: int = 1,
+			  cache: Optional[CacheManager] = None
 			  ):
 
+		self.source_path = path
 		self.nominated_json_path = nominate_cached_json(path)
+		self.cache = cache
 		
-		if use_json and self.nominated_json_path.is_file():
-			path = self.nominated_json_path
+		path = select_source(path, use_json, cache)
 
 		self.extension, text = read(path)
-		self.data = manage_parsing(self.extension, text)
+		self.data = manage_parsing(self.extension, text, workers)
 
 	def save_as_json(self, data: Dict, override: bool = False) -> None:
 		"""
@@ -53,26 +65,81 @@ class Vic3Reader():
 		with open(json_file, 'w', encoding='utf-8') as f:
 				json.dump(data, f, indent=4, ensure_ascii=False)
 
+		if self.cache is not None:
+			self.cache.register(self.source_path, json_file)
+
 		
 	
 
-def manage_parsing(extension: str, text: str) -> Dict:
-
+def manage_parsing(
+		extension: str, 
+		text: str | bytes, 
+		workers: int = 1, 
+		sections: Optional[Set[str]] = None, 
+		wanted_tags: Optional[Set[str]] = None,
+		pool: Optional['ProcessPoolExecutor'] = None
+		) -> Dict:
+	"""
+	Convert the text of a save or cached JSON to a Python dictionary.
+	With workers > 1, plain-text saves are split between top-level blocks and parsed in a process pool,
+	`pool` if given (see parallel.parse_pool) or a new one for this save.
+	Binary gamestates are decoded with the token table set with binary.use_token_table().
+	With sections, only these top-level sections are parsed.
+	With wanted_tags, cached JSON only decode these countries of country_manager.database (see json_stream.py).
+	"""
 	if extension == '.json':
-		return json.loads(text)
+		return load_json(text, sections, wanted_tags)
+
+	if extension == BINARY_SUFFIX:
+		return parse_binary(text, sections=sections)
+
+	if sections is not None:
+		from vic3_reader.parser.scanner import select_top_level
+		text = select_top_level(text, sections)
 	
-	from vic3_reader.parser import parser
+	if workers != 1:
+		from vic3_reader.parser.parallel import parse_in_chunks
+		return parse_in_chunks(text, workers, pool)
+
+	from vic3_reader.parser import get_parser
 	
-	parsed = parser.parse(text)
+	parsed = get_parser().parse(text)
 
 	return dict(parsed)
 
 
-def read(path: Path) -> Tuple[str, str]:
+def read(path: Path) -> Tuple[str, str | bytes]:
+	"""
+	Returns (extension, content) of a file. Compressed saves are uncompressed and
+	binary gamestates are returned as bytes with the extension BINARY_SUFFIX.
+	Cached JSON are returned as a memory map of the file, decoded later only where needed.
+	"""
+	if path.suffix == '.json':
+		return (path.suffix, open_json(path))
+
+	packed = read_packed_save(path)
+	if packed is not None:
+		return packed
+
 	with open(path, 'r', encoding='utf-8') as file:
 		return (path.suffix, file.read() )
 	
 
+def select_source(path: Path, use_json: bool = True, cache: Optional[CacheManager] = None) -> Path:
+	"""
+	Returns the file to read for a save: the cached JSON if it exists and use_json is True,
+	or the save itself otherwise. With a cache manager, stale JSON files are removed and not used.
+	"""
+	json_path = nominate_cached_json(path)
+	if not use_json:
+		return path
+	if cache is not None:
+		return json_path if cache.lookup(path, json_path) else path
+	if json_path.is_file():
+		return json_path
+	return path
+
+
 def nominate_cached_json(path: Path) -> Path:
 	parent_dir = path.parent
 	json_dir = parent_dir / 'json_saves'
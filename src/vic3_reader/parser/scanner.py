@@ -0,0 +1,234 @@
+"""
+Lightweight scanning of plain-text v3 saves without parsing the whole file.
+
+The scanner only understands what it needs to jump between blocks: braces, quoted strings
+and `key=value` pairs. Sections are located as (start, end) spans of the original text,
+which can later be parsed on their own with parse_span() when their content is needed.
+"""
+
+import re
+from typing import Any, Iterator, List, Optional, Sequence, Set, Tuple
+
+_BRACE_OR_STRING = re.compile(r'"(?:[^"\\]|\\.)*"|[{}]')
+_KEY_EQUALS = re.compile(r'(?:"((?:[^"\\]|\\.)*)"|([^\s{}="]+))\s*=\s*')
+_ATOM = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s{}="]+')
+_WS = re.compile(r'\s*')
+
+Span = Tuple[int, int]
+
+NESTED_DEPTH = 6    # blocks up to this depth are matched by a single regex
+
+
+def _nested_block(depth: int) -> re.Pattern:
+    """ Regex of a block with up to `depth` levels of nested blocks. Possessive quantifiers never backtrack. """
+    string = r'"(?:[^"\\]|\\.)*+"'
+    block = r'\{(?:[^{}"]++|' + string + r')*+\}'
+    for _ in range(depth - 1):
+        block = r'\{(?:[^{}"]++|' + string + '|' + block + r')*+\}'
+    return re.compile(block)
+
+
+_NESTED_BLOCK = _nested_block(NESTED_DEPTH)
+
+
+def match_brace(text: str, start: int) -> int:
+    """
+    Return the index just after the '}' closing the '{' found at `start`.
+    Braces inside quoted strings are ignored.
+
+    Blocks are matched with a regex when they are not too deep, which runs at C speed.
+    Deeper blocks are walked brace by brace, jumping over their not too deep sub-blocks.
+    """
+    m = _NESTED_BLOCK.match(text, start)
+    if m:
+        return m.end()
+
+    depth = 0
+    pos = start
+    while True:
+        m = _BRACE_OR_STRING.search(text, pos)
+        if m is None:
+            raise ValueError(f"Unbalanced block starting at position {start}.")
+        token = m.group()
+        if token == '{':
+            if depth:
+                sub_block = _NESTED_BLOCK.match(text, m.start())
+                if sub_block:
+                    pos = sub_block.end()
+                    continue
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0:
+                return m.end()
+        pos = m.end()
+
+
+def skip_value(text: str, start: int, end: Optional[int] = None) -> int:
+    """
+    Return the index just after the value starting at `start`:
+    a block, a quoted string, a primitive or a primitive call like `rgb { 1 2 3 }`.
+    """
+    end = len(text) if end is None else end
+
+    if text[start] == '{':
+        return match_brace(text, start)
+
+    m = _ATOM.match(text, start, end)
+    if not m:
+        raise ValueError(f"Unexpected character {text[start]!r} at position {start}.")
+
+    after = _WS.match(text, m.end(), end).end()
+    if not text.startswith('"', start) and after < end and text[after] == '{':
+        return match_brace(text, after)     # i.e. rgb { 1 2 3 }
+    return m.end()
+
+
+def iter_pairs(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+    """
+    Iterate the `key=value` pairs found at the first level of text[start:end].
+
+    Yields (key, value_start, value_end). Elements that are not pairs,
+    like the file code at the top of a save or items of a list, are skipped.
+    """
+    pos = start
+    end = len(text) if end is None else end
+
+    while True:
+        pos = _WS.match(text, pos, end).end()
+        if pos >= end:
+            return
+
+        m = _KEY_EQUALS.match(text, pos, end)
+        if not m:
+            pos = skip_value(text, pos, end)
+            continue
+
+        key = m.group(1) if m.group(1) is not None else m.group(2)
+        value_start = m.end()
+        value_end = skip_value(text, value_start, end)
+        yield key, value_start, value_end
+        pos = value_end
+
+
+def iter_items(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[Optional[str], int, int]]:
+    """
+    Iterate every element found at the first level of text[start:end].
+    Yields (key, value_start, value_end) for pairs and (None, start, end) for other elements.
+    """
+    pos = start
+    end = len(text) if end is None else end
+
+    while True:
+        pos = _WS.match(text, pos, end).end()
+        if pos >= end:
+            return
+
+        m = _KEY_EQUALS.match(text, pos, end)
+        if m:
+            key = m.group(1) if m.group(1) is not None else m.group(2)
+            value_start = m.end()
+        else:
+            key = None
+            value_start = pos
+        value_end = skip_value(text, value_start, end)
+        yield key, value_start, value_end
+        pos = value_end
+
+
+def iter_elements(text: str, start: int = 0, end: Optional[int] = None) -> Iterator[Span]:
+    """ Iterate the spans of every element found at the first level of text[start:end]. """
+    pos = start
+    end = len(text) if end is None else end
+
+    while True:
+        pos = _WS.match(text, pos, end).end()
+        if pos >= end:
+            return
+        m = _KEY_EQUALS.match(text, pos, end)
+        value_end = skip_value(text, m.end() if m else pos, end)
+        yield pos, value_end
+        pos = value_end
+
+
+def inner(span: Span) -> Span:
+    """ Return the span inside the braces of a block span. """
+    return span[0] + 1, span[1] - 1
+
+
+def find_key(text: str, key: str, start: int = 0, end: Optional[int] = None) -> Optional[Span]:
+    """ Return the value span of the first `key` found at the first level of text[start:end]. """
+    for found, value_start, value_end in iter_pairs(text, start, end):
+        if found == key:
+            return value_start, value_end
+    return None
+
+
+def find_path(text: str, path: Sequence[str], start: int = 0, end: Optional[int] = None) -> Optional[Span]:
+    """
+    Follow a sequence of keys from the top level of the save i.e. ("country_manager", "database")
+    and return the span of the final value, or None if any key is missing.
+    """
+    span = (start, len(text) if end is None else end)
+
+    for depth, key in enumerate(path):
+        if depth > 0:
+            if text[span[0]] != '{':
+                return None
+            span = inner(span)
+        span = find_key(text, key, *span)
+        if span is None:
+            return None
+
+    return span
+
+
+def atom(text: str, span: Span) -> str:
+    """ Return a primitive value as a string, removing the quotes of escaped strings. """
+    value = text[span[0]:span[1]]
+    if value.startswith('"') and value.endswith('"'):
+        return value[1:-1]
+    return value
+
+
+def parse_span(text: str, span: Span) -> Any:
+    """ Parse only the value in `span` with the save grammar and return it as Python objects. """
+    from vic3_reader.parser import get_parser
+
+    parsed = get_parser().parse("value=" + text[span[0]:span[1]])
+    return parsed[0][1]
+
+
+def select_top_level(text: str, keys: Set[str]) -> str:
+    """ 
+    Text with only the top-level `key=value` pairs of the given keys, in their order,
+    i.e. to parse the sections of a save that are needed and skip the rest.
+    """
+    return "\n".join(
+        f"{key}={text[value_start:value_end]}"
+        for key, value_start, value_end in iter_pairs(text) if key in keys
+        )
+
+
+def split_top_level(text: str, n_chunks: int) -> List[str]:
+    """
+    Split a save in up to `n_chunks` pieces of similar size, cutting only between top-level 
+    `key=value` pairs so that every piece can be parsed on its own.
+    A single block bigger than the target size is never split.
+    """
+    target = max(1, len(text) // max(1, n_chunks))
+
+    chunks = []
+    chunk_start = 0
+    for _, _, value_end in iter_pairs(text):
+        if value_end - chunk_start >= target:
+            chunks.append(text[chunk_start:value_end])
+            chunk_start = value_end
+
+    if text[chunk_start:].strip():
+        if chunks:
+            chunks[-1] += text[chunk_start:]
+        else:
+            chunks.append(text[chunk_start:])
+
+    return chunks
@@ -0,0 +1,106 @@
+"""
+Trusted cache of validated saves.
+
+The cached JSON of a save (json_saves/) still needs the full Vic3Save validation every time it is read.
+A trusted cache stores the data already validated and filtered for the wanted tags, and rebuilds the
+models with model_construct(), skipping validators.
+
+The cache is only used when it can be trusted:
+    - An HMAC signature, with a key kept outside of the cache folder, detects modified files.
+    - The size and modification time of the save, the wanted tags, the validated fields and a fingerprint
+      of the models source detect stale files. Any difference makes the cache be ignored.
+"""
+
+from pathlib import Path
+from typing import Optional, Set
+import hashlib
+import hmac
+import json
+import pickle
+import secrets
+
+from vic3_reader.metrics.models import TagIDStr, Vic3Save
+
+KEY_PATH = Path.home() / ".vic3_reader" / "trusted_cache.key"
+TRUSTED_SUFFIX = ".trusted"
+
+
+def nominate_trusted_cache(path: Path) -> Path:
+    """ i.e. Path('saves/json_saves/prussia_1844.v3.trusted') """
+    json_dir = path.parent / 'json_saves'
+    json_dir.mkdir(parents=True, exist_ok=True)
+    return json_dir / (path.name + TRUSTED_SUFFIX)
+
+
+def _signing_key() -> bytes:
+    if not KEY_PATH.is_file():
+        KEY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        KEY_PATH.write_bytes(secrets.token_bytes(32))
+    return KEY_PATH.read_bytes()
+
+
+def models_fingerprint() -> str:
+    """ Hash of the models source, so caches written with other models are not trusted. """
+    models_dir = Path(__file__).resolve().parent.parent / "metrics" / "models"
+    digest = hashlib.sha256()
+    for module in sorted(models_dir.glob("*.py")):
+        digest.update(module.read_bytes())
+    return digest.hexdigest()
+
+
+def _header(path: Path, wanted_tags: Set[TagIDStr], fields: Optional[Set[str]] = None) -> dict:
+    stat = path.stat()
+    return {
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "wanted_tags": sorted(wanted_tags),
+        "fields": None if fields is None else sorted(fields),
+        "models": models_fingerprint(),
+    }
+
+
+def save_trusted(path: Path, save: Vic3Save, wanted_tags: Set[TagIDStr], fields: Optional[Set[str]] = None) -> None:
+    """
+    Store a validated save for the file at `path`, validated only for `fields` if given (see Vic3Save.project).
+    The cache file has a JSON header line with the signature, followed by the data.
+    """
+    payload = pickle.dumps(save.model_dump(), protocol=pickle.HIGHEST_PROTOCOL)
+    header = _header(path, wanted_tags, fields)
+    header["signature"] = _sign(header, payload)
+
+    with open(nominate_trusted_cache(path), 'wb') as f:
+        f.write(json.dumps(header).encode('utf-8') + b"\n")
+        f.write(payload)
+
+
+def load_trusted(path: Path, wanted_tags: Set[TagIDStr], fields: Optional[Set[str]] = None) -> Optional[Vic3Save]:
+    """
+    Returns the cached save for the file at `path` rebuilt without validation,
+    or None if there is no cache or it is stale or modified.
+    """
+    from vic3_reader.metrics.models.construct import construct_model
+
+    cache_path = nominate_trusted_cache(path)
+    if not cache_path.is_file():
+        return None
+
+    with open(cache_path, 'rb') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return None
+        payload = f.read()
+
+    signature = header.pop("signature", "")
+    if header != _header(path, wanted_tags, fields):
+        return None     # stale: other save, tags, fields or models
+    if not hmac.compare_digest(signature, _sign(header, payload)):
+        return None     # modified after it was written
+
+    return construct_model(Vic3Save, pickle.loads(payload))
+
+
+def _sign(header: dict, payload: bytes) -> str:
+    mac = hmac.new(_signing_key(), json.dumps(header, sort_keys=True).encode('utf-8'), hashlib.sha256)
+    mac.update(payload)
+    return mac.hexdigest()
@@ -0,0 +1,355 @@
+"""
+Keep the metrics of every save in a SQLite database (standard library sqlite3), updated save by save.
+
+Unlike Orchestrator.save_long(), which writes the whole table again in every run, each save is stored
+as soon as its metrics are extracted, replacing only its own rows. A run with the same database only
+processes the saves that are new, changed or measured with other tags or metrics.
+
+Tables:
+    saves           a row per save: path, game date, size and modification time of the file, the
+                    run that measured it (tags and metrics, see checkpoint.run_fingerprint) and the
+                    layout of its metrics table (tags, metrics and their dtypes)
+    metrics         a row per metric name, so long names are not repeated in every value
+    metric_values   a row per (metric, game_date, tag_id, save), ordered by metric: the values of a
+                    metric are read without touching the other metrics
+
+Values are stored as SQLite numbers or text. Missing values (None or NaN) are not stored: the layout of
+the table is kept with the save, so columns or rows without any value and the dtypes (i.e. bool) come back.
+"""
+
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import json
+import math
+import sqlite3
+import time
+
+import pandas as pd
+
+from vic3_reader.checkpoint import save_fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS saves (
+    save_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    game_date TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    run TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    layout TEXT
+);
+CREATE INDEX IF NOT EXISTS saves_by_game_date ON saves (game_date);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    metric_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS metric_values (
+    metric_id INTEGER NOT NULL REFERENCES metrics (metric_id),
+    game_date TEXT NOT NULL,
+    tag_id TEXT NOT NULL,
+    save_id INTEGER NOT NULL REFERENCES saves (save_id) ON DELETE CASCADE,
+    value,
+    PRIMARY KEY (metric_id, game_date, tag_id, save_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS metric_values_by_save ON metric_values (save_id);
+"""
+
+INSERT_BATCH = 10_000   # rows sent to sqlite in each executemany() of a save
+
+unknown_metric_error = "'{name}' is not a metric in the results database. Stored metrics: {names}."
+
+
+class ResultsStore():
+    """
+    SQLite database with the metrics of the saves of one or several runs.
+
+    Parameters:
+    -   path: Path or str. Database file, created with its folder if it does not exist.
+
+    Methods:
+    -   self.store(). Replace the rows of a save with its metrics table, in one transaction.
+
+    -   self.load(). Stored (game date, metrics table, path of save) if the save and the run did not change.
+
+    -   self.pivot(). Table of a metric with a row per game date and a column per tag,
+                    the same table as a sheet of Orchestrator.save_multiple_sheets().
+
+    -   self.long_df(). Long table (game_date, tag_id) with a column per metric, like Orchestrator.metrics_df.
+
+    -   self.save_multiple_sheets(). Spreadsheet with a sheet per metric, built one metric at a time.
+    """
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # the orchestrator stores saves from the thread that consumes the pipeline
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")    # readers (i.e. a notebook) do not block the run
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        self._add_layout_column()
+
+    def _add_layout_column(self) -> None:
+        """ Databases created before the layout of the tables was stored. Their saves load as before. """
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(saves)")]
+        if "layout" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE saves ADD COLUMN layout TEXT")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'ResultsStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<ResultsStore {self.path}>"
+
+    # ─── Writing ────────────────────────────────────────────────────────────
+
+    def store(self, game_date: date, df: pd.DataFrame, filepath: Path, run: Optional[Dict] = None) -> None:
+        """
+        Upsert the metrics of a save: its previous rows are removed and the new ones inserted in the
+        same transaction, so readers never see a save half written.
+
+        Parameters:
+        -   game_date: date. Game date of the save.
+
+        -   df: pd.DataFrame. Metrics table of the save, a row per tag id and a column per metric.
+
+        -   filepath: Path. Save the metrics come from, the key of the save in the database.
+
+        -   run: Dict, optional. Fingerprint of the run (see checkpoint.run_fingerprint), checked by self.load().
+        """
+        filepath = Path(filepath)
+        fingerprint = save_fingerprint(filepath) if filepath.is_file() else {"size": -1, "mtime_ns": -1}
+        if df.index.name != "tag_id" and "tag_id" in df.columns:
+            df = df.set_index("tag_id", drop=True)
+
+        with self.connection:
+            row = self.connection.execute("SELECT save_id FROM saves WHERE path = ?", (_key(filepath),)).fetchone()
+            if row is not None:
+                self.connection.execute("DELETE FROM saves WHERE save_id = ?", row)   # cascades to its values
+
+            save_id = self.connection.execute(
+                "INSERT INTO saves (path, game_date, size, mtime_ns, run, stored_at, layout) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    _key(filepath), game_date.isoformat(), fingerprint["size"], fingerprint["mtime_ns"],
+                    _dump_run(run), time.time(), _dump_layout(df),
+                ),
+            ).lastrowid
+
+            metric_ids = self._metric_ids(df.columns)
+            rows = _value_rows(df, metric_ids, game_date.isoformat(), save_id)
+            while True:
+                batch = [row for _, row in zip(range(INSERT_BATCH), rows)]
+                if not batch:
+                    break
+                self.connection.executemany(
+                    "INSERT INTO metric_values (metric_id, game_date, tag_id, save_id, value) VALUES (?, ?, ?, ?, ?)",
+                    batch,
+                )
+
+    def _metric_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        names = [str(name) for name in names]
+        self.connection.executemany("INSERT OR IGNORE INTO metrics (name) VALUES (?)", [(name,) for name in names])
+        return dict(self.connection.execute(
+            f"SELECT name, metric_id FROM metrics WHERE name IN ({_placeholders(names)})", names
+        ).fetchall())
+
+    def remove(self, filepath: Path) -> bool:
+        """ Remove a save and its values. Returns False if it was not stored. """
+        with self.connection:
+            deleted = self.connection.execute("DELETE FROM saves WHERE path = ?", (_key(filepath),)).rowcount
+        return bool(deleted)
+
+    # ─── Reading ────────────────────────────────────────────────────────────
+
+    def saves(self) -> pd.DataFrame:
+        """ Table with a row per stored save: path, game date, size, modification time and run. """
+        return pd.read_sql_query(
+            "SELECT path, game_date, size, mtime_ns, run, stored_at FROM saves ORDER BY game_date, path",
+            self.connection,
+        )
+
+    def metrics(self) -> List[str]:
+        """ Names of the metrics with stored values, in the order they were first stored. """
+        return [name for (name,) in self.connection.execute(
+            "SELECT name FROM metrics WHERE EXISTS (SELECT 1 FROM metric_values WHERE metric_values.metric_id = metrics.metric_id)"
+            " ORDER BY metric_id"
+        )]
+
+    def load(self, filepath: Path, run: Optional[Dict] = None) -> Optional[Tuple[date, pd.DataFrame, Path]]:
+        """
+        Returns the stored (game date, metrics table, path of save) if the file did not change since it was
+        stored and it was measured by the same run. None otherwise.
+        """
+        filepath = Path(filepath)
+        row = self.connection.execute(
+            "SELECT save_id, game_date, size, mtime_ns, run, layout FROM saves WHERE path = ?", (_key(filepath),)
+        ).fetchone()
+        if row is None or not filepath.is_file():
+            return None
+
+        save_id, game_date, size, mtime_ns, stored_run, layout = row
+        if {"size": size, "mtime_ns": mtime_ns} != save_fingerprint(filepath) or stored_run != _dump_run(run):
+            return None
+
+        values = self.connection.execute(
+            "SELECT tag_id, name, value FROM metric_values JOIN metrics USING (metric_id)"
+            " WHERE save_id = ? ORDER BY metric_id",
+            (save_id,),
+        ).fetchall()
+        df = pd.DataFrame(values, columns=["tag_id", "metric", "value"])
+        df = df.pivot(index="tag_id", columns="metric", values="value").rename_axis(columns=None)
+        if layout is None:
+            columns = list(dict.fromkeys(name for _, name, _ in values))   # in the stored order
+            return date.fromisoformat(game_date), df.reindex(columns=columns).infer_objects(), filepath
+        return date.fromisoformat(game_date), _apply_layout(df, layout), filepath
+
+    def pivot(self, metric: str, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Table of a metric: a row per game date and a column per tag id, read with the index of the metric.
+        With several saves of the same game date (same_date_policy="all"), the last stored one is used.
+        """
+        metric_id = self._metric_id(metric)
+        query = "SELECT game_date, tag_id, value FROM metric_values WHERE metric_id = ?"
+        params: List[Any] = [metric_id]
+        if tags is not None:
+            tags = [str(tag) for tag in tags]
+            query += f" AND tag_id IN ({_placeholders(tags)})"
+            params += tags
+        query += " ORDER BY game_date, tag_id, save_id"     # the order of the primary key, no sorting
+
+        df = pd.DataFrame(self.connection.execute(query, params).fetchall(), columns=["game_date", "tag_id", "value"])
+        df = df.drop_duplicates(["game_date", "tag_id"], keep="last")
+        df["game_date"] = _to_dates(df["game_date"])
+
+        return df.pivot(index="game_date", columns="tag_id", values="value").infer_objects()
+
+    def long_df(self, metrics: Optional[Sequence[str]] = None, tags: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Long table (game_date, tag_id) with a column per metric, like Orchestrator.metrics_df.
+        Only the given metrics and tags are read (all if None).
+        """
+        metrics = self.metrics() if metrics is None else list(metrics)
+        metric_ids = [self._metric_id(metric) for metric in metrics]
+
+        query = f"SELECT game_date, tag_id, metric_id, value FROM metric_values WHERE metric_id IN ({_placeholders(metric_ids)})"
+        params: List[Any] = list(metric_ids)
+        if tags is not None:
+            tags = [str(tag) for tag in tags]
+            query += f" AND tag_id IN ({_placeholders(tags)})"
+            params += tags
+        query += " ORDER BY metric_id, game_date, tag_id, save_id"     # the order of the primary key, no sorting
+
+        df = pd.DataFrame(self.connection.execute(query, params).fetchall(), columns=["game_date", "tag_id", "metric", "value"])
+        df = df.drop_duplicates(["game_date", "tag_id", "metric"], keep="last")
+        df["game_date"] = _to_dates(df["game_date"])
+
+        table = df.pivot(index=["game_date", "tag_id"], columns="metric", values="value")
+        table = table.reindex(columns=metric_ids).set_axis(metrics, axis=1)
+        return table.infer_objects()
+
+    def _metric_id(self, metric: str) -> int:
+        row = self.connection.execute("SELECT metric_id FROM metrics WHERE name = ?", (metric,)).fetchone()
+        if row is None:
+            raise KeyError(unknown_metric_error.format(name=metric, names=", ".join(self.metrics())))
+        return row[0]
+
+    def save_multiple_sheets(self, filename: str, folder: Optional[str] = None, metrics: Optional[Sequence[str]] = None, **kwargs):
+        """
+        Save a spreadsheet (xlsx, xls or ods) with a sheet per metric, a row per game date and a column per tag.
+        Each sheet is read from the database when it is written, the long table is never built.
+        Extra kwargs are passed to pandas to_excel().
+        """
+        ext = Path(filename).suffix[1:].lower()
+        if ext not in ['xlsx', 'xls', 'ods']:
+            raise ValueError("Filename must have a valid extension to support sheets: xlsx, xlsx or ods.")
+
+        filepath = Path(filename)
+        if folder:
+            Path(folder).mkdir(parents=True, exist_ok=True)
+            filepath = Path(folder) / filename
+
+        with pd.ExcelWriter(filepath, engine=kwargs.pop('engine', None)) as writer:
+            for metric in (self.metrics() if metrics is None else metrics):
+                table = self.pivot(metric)
+                table.columns = table.columns.map(str)
+                table.to_excel(writer, sheet_name=metric, index=True, **kwargs)
+
+
+def _value_rows(df: pd.DataFrame, metric_ids: Dict[str, int], game_date: str, save_id: int) -> Iterator[Tuple]:
+    """ Rows of metric_values for a metrics table. Missing values are left out. """
+    tag_ids = [str(tag_id) for tag_id in df.index]
+    for column, values in df.to_dict('list').items():   # to_dict() gives Python scalars, not numpy ones
+        metric_id = metric_ids[str(column)]
+        for tag_id, value in zip(tag_ids, values):
+            value = _sql_value(value)
+            if value is not None:
+                yield metric_id, game_date, tag_id, save_id, value
+
+
+def _dump_layout(df: pd.DataFrame) -> str:
+    """ Tags, metrics and dtypes of a metrics table, to rebuild the columns and rows without stored values. """
+    return json.dumps({
+        "tags": [str(tag_id) for tag_id in df.index],
+        "columns": [[str(column), str(dtype)] for column, dtype in df.dtypes.items()],
+    })
+
+
+def _apply_layout(df: pd.DataFrame, layout: str) -> pd.DataFrame:
+    """ The stored table with the rows, columns and dtypes it had when it was stored. """
+    layout = json.loads(layout)
+    columns = [column for column, _ in layout["columns"]]
+    df = df.reindex(index=pd.Index(layout["tags"], name="tag_id"), columns=columns).infer_objects()
+    for column, dtype in layout["columns"]:
+        if dtype == "object":
+            df[column] = df[column].astype(object).where(df[column].notna(), None)     # missing values as stored, None
+            continue
+        if str(df[column].dtype) == dtype:
+            continue
+        try:
+            df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError):
+            pass    # a dtype pandas cannot build from its name, the column is left as read
+    return df
+
+
+def _sql_value(value: Any) -> Any:
+    """ Python number or text for sqlite3: numpy scalars are converted, NaN and None are missing. """
+    if value is None:
+        return None
+    if hasattr(value, "item"):      # numpy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+def _to_dates(column: pd.Series) -> pd.Series:
+    """ ISO dates to date objects, converting each distinct date once. """
+    return column.map({iso: date.fromisoformat(iso) for iso in column.unique()})
+
+
+def _key(filepath: Path) -> str:
+    """ Saves are stored by absolute path, the same save is found from any working directory. """
+    return str(Path(filepath).resolve())
+
+
+def _dump_run(run: Optional[Dict]) -> str:
+    return json.dumps(run, sort_keys=True)
+
+
+def _placeholders(values: Sequence) -> str:
+    return ", ".join("?" * len(values))
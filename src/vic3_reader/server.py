@@ -0,0 +1,543 @@
+"""
+Keep parsed saves in memory in a long-lived local process, so notebooks can query the same saves
+many times without parsing them again.
+
+The server listens on a Unix socket (a localhost port where Unix sockets are not available) and only
+answers clients that know the key kept in ~/.vic3_reader/server.key. Clients use SaveClient:
+
+    with SaveClient() as client:
+        client.metrics("saves/autosave.v3", {"1", "GER"}, ["economy"])
+        client.get("saves/autosave.v3", "country_manager.database.1.budget")
+
+Two kinds of entries are kept in memory:
+    - saves validated for some tags and fields, for metric queries. Aggregations computed by the
+      metrics (i.e. pops per culture) stay cached inside them.
+    - top-level sections of a save parsed on their own, for path queries.
+
+Entries are keyed by the path, size and modification time of the save, so a save overwritten by the game
+is read again. The least recently used entries are removed over the number of entries or the memory cap.
+The memory of an entry is not measured: it is estimated from the size of the part of the save that was parsed
+(see PARSED_SIZE_FACTOR), so the real memory of the server may be above or below the cap.
+
+Clients are answered in parallel. Queries over the same save wait for each other, queries over
+other saves do not.
+"""
+
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+import os
+import pickle
+import secrets
+import sys
+import threading
+import time
+
+KEY_PATH = Path.home() / ".vic3_reader" / "server.key"
+DEFAULT_SOCKET = Path.home() / ".vic3_reader" / "server.sock"
+DEFAULT_PORT = 50763
+# Estimated MB in memory per MB of parsed text, measured on plain-text saves. Binary gamestates are about half the size of the text.
+PARSED_SIZE_FACTOR = 8
+BINARY_SIZE_FACTOR = 16
+
+Address = str | Tuple[str, int]
+
+server_running_error = "A save server is already running at {address}."
+unreadable_request_error = (
+    "The server could not read the request ({error})." \
+    " Metric functions must be importable by the server, or use names of the metrics registry."
+    )
+
+
+def default_address() -> Address:
+    """ Unix socket in ~/.vic3_reader, or a localhost port on Windows. """
+    if sys.platform == 'win32':
+        return ("127.0.0.1", DEFAULT_PORT)
+    return str(DEFAULT_SOCKET)
+
+
+def parse_address(text: Optional[str]) -> Address:
+    """ 'host:port' for a TCP address, any other text is a Unix socket path. None for the default. """
+    if text is None:
+        return default_address()
+    host, _, port = text.rpartition(":")
+    if host and port.isdigit() and "/" not in text:
+        return (host, int(port))
+    return text
+
+
+def server_key() -> bytes:
+    """ Key shared by the server and its clients, created the first time. Only readable by the user. """
+    if not KEY_PATH.is_file():
+        KEY_PATH.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(KEY_PATH, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(secrets.token_bytes(32))
+    return KEY_PATH.read_bytes()
+
+
+# ─── Cache ──────────────────────────────────────────────────────────────────
+
+class SaveCache():
+    """
+    LRU of values in memory with their estimated size. Safe to use from several threads:
+    a key is loaded once even if several threads ask for it, and other keys load meanwhile.
+
+    Parameters:
+    -   max_entries: int, optional. Maximum number of entries.
+
+    -   estimated_memory_mb: float, optional. Maximum of the estimated MB of all entries (the sizes given by
+                    the loaders, not measured). The last loaded entry is always kept.
+    """
+    def __init__(self, max_entries: Optional[int] = None, estimated_memory_mb: Optional[float] = None):
+        self.max_entries = max_entries
+        self.estimated_memory_mb = estimated_memory_mb
+        self.entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+        self._lock = threading.Lock()   # only held to read or update the entries and stats, never while loading
+        self._loading: Dict[Hashable, threading.Lock] = {}
+
+    @property
+    def total_mb(self) -> float:
+        return sum(size for _, size in self.entries.values())
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Tuple[Any, float]]) -> Any:
+        """ 
+        Returns the cached value of the key, or loads it, stores it and removes the old entries over the limits.
+        `load` returns the value and its estimated MB.
+        """
+        with self._lock:
+            if key in self.entries:
+                return self._hit(key)
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self.entries:
+                    return self._hit(key)  # loaded by another thread meanwhile
+            try:
+                value, size = load()
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+            with self._lock:
+                self.stats["misses"] += 1
+                self.entries[key] = (value, size)
+                self._shrink()
+            return value
+
+    def _hit(self, key: Hashable) -> Any:
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return self.entries[key][0]
+
+    def snapshot(self) -> List[Tuple[Hashable, float]]:
+        """ (key, estimated MB) of the entries, from the least to the most recently used. """
+        with self._lock:
+            return [(key, size) for key, (_, size) in self.entries.items()]
+
+    def _shrink(self) -> None:
+        while len(self.entries) > 1 and (
+                (self.max_entries is not None and len(self.entries) > self.max_entries)
+                or (self.estimated_memory_mb is not None and self.total_mb > self.estimated_memory_mb)
+                ):
+            self.entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def evict(self, path: Optional[Path] = None) -> int:
+        """ Remove the entries of a save (all entries if None). Returns how many were removed. """
+        with self._lock:
+            keys = [key for key in self.entries if path is None or key[1] == path]
+            for key in keys:
+                del self.entries[key]
+            self.stats["evicted"] += len(keys)
+        return len(keys)
+
+
+# ─── Server ─────────────────────────────────────────────────────────────────
+
+class SaveServer():
+    """
+    Long-lived process answering metric and path queries over saves kept in memory.
+
+    Parameters:
+    -   address: str (Unix socket) or (host, port), optional. Defaults to default_address().
+
+    -   max_entries: int, optional. Maximum number of saves and sections in memory.
+
+    -   estimated_memory_mb: float, optional. Maximum MB of the saves and sections in memory, as estimated
+                    from the size of the parsed text (see PARSED_SIZE_FACTOR). The real memory is not measured.
+
+    -   tokens_file: Path or str, optional. Token table to read native binary saves (see parser/binary.py).
+
+    -   parse_workers: int, default 1. Number of processes used to parse each plain-text save.
+
+    Methods:
+    -   self.serve_forever(). Answer clients until one of them asks for a shutdown.
+
+    -   self.metrics(), self.get(), self.keys(), self.stats(), self.evict(). The queries, also usable in-process.
+    """
+    def __init__(
+            self,
+            address: Optional[Address] = None,
+            max_entries: Optional[int] = None,
+            estimated_memory_mb: Optional[float] = None,
+            tokens_file: Optional[Path | str] = None,
+            parse_workers: Optional[int] = 1
+            ):
+        from vic3_reader.parser.binary import use_token_table
+
+        self.address = default_address() if address is None else address
+        self.cache = SaveCache(max_entries, estimated_memory_mb)
+        self.parse_workers = parse_workers
+        self.started = time.time()
+        self._lock = threading.Lock()   # only held to get the lock of a save
+        self._save_locks: Dict[Path, threading.Lock] = {}
+        self._stopped = threading.Event()
+        self._listener: Optional[Listener] = None
+
+        if tokens_file is not None:
+            use_token_table(tokens_file)
+
+    # ─── Queries ─────────────────────────────────────────────────────────────
+
+    def metrics(self, paths: Path | str | Iterable[Path | str], wanted_tags: Iterable[str], metrics_fn: Sequence[Callable | str]):
+        """
+        Long table (game_date, tag_id) of the metrics of one or several saves, like Orchestrator.metrics_df.
+        Metrics can be names in the metrics registry or functions importable by the server.
+        """
+        from vic3_reader.orchestrator import SaveMetrics, metric_plan, to_long_df
+
+        plan = metric_plan(metrics_fn)
+        saved_metrics = []
+        for path in _as_paths(paths):
+            # the metrics build the tables of the save and cache aggregations inside it
+            with self._save_lock(path):
+                tags = self._resolve_tags(path, wanted_tags)
+                save = self._validated_save(path, tags, plan.fields)
+                game_date, df = SaveMetrics(save, tags, metrics_fn).to_dataframe()
+            saved_metrics.append((game_date, df, path))
+
+        return to_long_df(sorted(saved_metrics, key=lambda x: x[0]))
+
+    def get(self, path: Path | str, node_path: str | Sequence[str]) -> Any:
+        """ Value at a dotted path of the parsed save, i.e. 'country_manager.database.1.budget'. """
+        path = Path(path)
+        keys = _split_path(node_path)
+        value = self._section(path, keys[0])
+        for depth, key in enumerate(keys[1:], 1):
+            value = _child(value, key, keys[:depth + 1])
+        return value
+
+    def keys(self, path: Path | str, node_path: Optional[str | Sequence[str]] = None) -> List[str]:
+        """ Keys (or positions) of the children of a node. The top-level sections of the save if no path is given. """
+        path = Path(path)
+        if not node_path:
+            return list(self._top_level_keys(path))
+        value = self.get(path, node_path)
+        if isinstance(value, dict):
+            return [str(key) for key in value]
+        if isinstance(value, list):
+            return [str(idx) for idx in range(len(value))]
+        return []
+
+    def stats(self) -> Dict:
+        """ Entries in memory with their estimated MB, hits, misses and evictions. """
+        entries = self.cache.snapshot()
+        return {
+            **self.cache.stats,
+            "entries": [
+                {"kind": key[0], "path": str(key[1]), "detail": [_readable(part) for part in key[4:]], "mb": round(size, 1)}
+                for key, size in entries
+            ],
+            "estimated_memory_mb": round(sum(size for _, size in entries), 1),
+            "uptime_s": round(time.time() - self.started),
+        }
+
+    def evict(self, path: Optional[Path | str] = None) -> int:
+        """ Forget the saves and sections of a save (all if None). Returns the number of removed entries. """
+        return self.cache.evict(None if path is None else Path(path).resolve())
+
+    # ─── Loading ─────────────────────────────────────────────────────────────
+
+    def _save_lock(self, path: Path) -> threading.Lock:
+        with self._lock:
+            return self._save_locks.setdefault(path.resolve(), threading.Lock())
+
+    def _parse(self, path: Path, sections: Optional[Set[str]]) -> Tuple[Dict, float]:
+        """ Returns (save data with only the given sections, estimated MB in memory). """
+        from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read, select_source
+        from vic3_reader.parser.scanner import select_top_level
+
+        extension, text = read(select_source(path, use_json=True))
+
+        if sections is not None and extension not in ('.json', BINARY_SUFFIX):
+            text = select_top_level(text, sections)     # the same manage_parsing does, to know the parsed size
+            if not text:
+                return {}, 0.0      # none of the sections is in the save, and the parser fails on an empty text
+        factor = BINARY_SIZE_FACTOR if extension == BINARY_SUFFIX else PARSED_SIZE_FACTOR
+        estimated_mb = len(text) / 1024**2 * factor
+
+        return manage_parsing(extension, text, self.parse_workers, sections), estimated_mb
+
+    def _validated_save(self, path: Path, tags: Set[str], fields: Optional[Set[str]]):
+        from vic3_reader.metrics.models import Vic3Save
+        from vic3_reader.orchestrator import validate_save
+
+        sections = None if fields is None else Vic3Save.sections_for(fields)
+
+        def load():
+            data, estimated_mb = self._parse(path, sections)
+            return validate_save(data, tags, fields), estimated_mb
+
+        key = ("save", *_stamp(path), frozenset(tags), None if fields is None else frozenset(fields))
+        return self.cache.get_or_load(key, load)
+
+    def _section(self, path: Path, section: str) -> Any:
+        def load():
+            data, estimated_mb = self._parse(path, {section})
+            if section not in data:
+                raise KeyError(f"{path.name} has no section '{section}'.")
+            return data[section], estimated_mb
+
+        key = ("section", *_stamp(path), section)
+        return self.cache.get_or_load(key, load)
+
+    def _top_level_keys(self, path: Path) -> List[str]:
+        from vic3_reader.parser.json_stream import iter_members, skip_ws
+        from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read, select_source
+        from vic3_reader.parser.scanner import iter_pairs
+
+        def load():
+            extension, text = read(select_source(path, use_json=True))
+            if extension == '.json':
+                return list(dict.fromkeys(key for key, _, _ in iter_members(text, skip_ws(text, 0)))), 0.0
+            if extension == BINARY_SUFFIX:
+                return list(manage_parsing(extension, text)), 0.0
+            return list(dict.fromkeys(key for key, _, _ in iter_pairs(text))), 0.0
+
+        return self.cache.get_or_load(("keys", *_stamp(path)), load)
+
+    def _resolve_tags(self, path: Path, wanted_tags: Iterable[str]) -> Set[str]:
+        """ Tag ids of the wanted tags in the save. 3 letter tags and player names are resolved with a TagIndex. """
+        from vic3_reader.metrics.tags_and_players import TagIndex, needs_tag_index
+
+        wanted_tags = [str(tag) for tag in wanted_tags]
+        if not needs_tag_index(wanted_tags):
+            return set(wanted_tags)
+
+        def load():
+            index = TagIndex()
+            index.add_save(path)
+            return index, 0.0
+
+        index = self.cache.get_or_load(("tags", *_stamp(path)), load)
+        return {tag_id for tag_id in index.resolve_all(wanted_tags, path).values() if tag_id is not None}
+
+    # ─── Serving ─────────────────────────────────────────────────────────────
+
+    def serve_forever(self) -> None:
+        """ Answer clients, each in its own thread, until one of them asks for a shutdown. """
+        self._remove_stale_socket()
+        self._listener = Listener(self.address, authkey=server_key())
+        try:
+            while not self._stopped.is_set():
+                try:
+                    connection = self._listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    if self._stopped.is_set():
+                        break
+                    continue    # i.e. a client with a wrong key
+                if self._stopped.is_set():
+                    connection.close()  # the connection of shutdown() to wake accept()
+                    break
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+        finally:
+            self._listener.close()
+            if isinstance(self.address, str):
+                Path(self.address).unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """ Stop serve_forever(). Connects to the listener, as closing it does not wake a thread blocked in accept(). """
+        self._stopped.set()
+        if self._listener is None:
+            return
+        try:
+            Client(self.address, authkey=server_key()).close()
+        except (OSError, EOFError, AuthenticationError):
+            pass    # the listener is already closed
+
+    def _handle(self, connection) -> None:
+        """ Answer the requests of one client: (command, kwargs) -> (True, result) or (False, exception). """
+        queries = {
+            "metrics": self.metrics,
+            "get": self.get,
+            "keys": self.keys,
+            "stats": self.stats,
+            "evict": self.evict,
+        }
+        with connection:
+            while True:
+                try:
+                    request = connection.recv_bytes()
+                except (EOFError, OSError):
+                    return  # the client disconnected
+
+                try:
+                    command, kwargs = pickle.loads(request)
+                except Exception as error:     # i.e. a function defined in the notebook, unknown by the server
+                    connection.send((False, ValueError(unreadable_request_error.format(error=f"{type(error).__name__}: {error}"))))
+                    continue
+
+                if command == "shutdown":
+                    connection.send((True, None))
+                    self.shutdown()
+                    return
+
+                try:
+                    if command not in queries:
+                        raise ValueError(f"Unknown command '{command}', use one of {sorted(queries)} or 'shutdown'.")
+                    response = (True, queries[command](**kwargs))
+                except Exception as error:
+                    response = (False, _picklable_error(error))
+
+                try:
+                    connection.send(response)
+                except Exception as error:     # i.e. a result that cannot be pickled
+                    connection.send((False, RuntimeError(f"{type(error).__name__}: {error}")))
+
+    def _remove_stale_socket(self) -> None:
+        """ Remove the socket file left by a server that did not exit cleanly, or raise if it is still running. """
+        if not isinstance(self.address, str) or not Path(self.address).exists():
+            return
+        try:
+            Client(self.address, authkey=server_key()).close()
+        except OSError:
+            Path(self.address).unlink(missing_ok=True)
+            return
+        raise RuntimeError(server_running_error.format(address=self.address))
+
+
+# ─── Client ─────────────────────────────────────────────────────────────────
+
+class SaveClient():
+    """
+    Connection to a running SaveServer, i.e. from a notebook. Queries raise the error raised in the server.
+
+    Parameters:
+    -   address: str (Unix socket) or (host, port), optional. Defaults to default_address().
+
+    Methods:
+    -   self.metrics(paths, wanted_tags, metrics_fn). Long table of metrics of one or several saves.
+
+    -   self.get(path, node_path). Value at a dotted path of a save, i.e. 'country_manager.database.1.budget'.
+
+    -   self.keys(path, node_path). Children of a node, or the top-level sections of the save.
+
+    -   self.stats(), self.evict(path), self.shutdown(). Manage the server.
+    """
+    def __init__(self, address: Optional[Address] = None):
+        self.connection = Client(default_address() if address is None else address, authkey=server_key())
+
+    def _call(self, command: str, **kwargs) -> Any:
+        self.connection.send((command, kwargs))
+        ok, result = self.connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def metrics(self, paths: Path | str | Iterable[Path | str], wanted_tags: Iterable[str], metrics_fn: Sequence[Callable | str]):
+        # paths are resolved here, the server may run in another working directory
+        return self._call("metrics", paths=_as_paths(paths), wanted_tags=list(wanted_tags), metrics_fn=list(metrics_fn))
+
+    def get(self, path: Path | str, node_path: str | Sequence[str]) -> Any:
+        return self._call("get", path=Path(path).resolve(), node_path=node_path)
+
+    def keys(self, path: Path | str, node_path: Optional[str | Sequence[str]] = None) -> List[str]:
+        return self._call("keys", path=Path(path).resolve(), node_path=node_path)
+
+    def stats(self) -> Dict:
+        return self._call("stats")
+
+    def evict(self, path: Optional[Path | str] = None) -> int:
+        return self._call("evict", path=None if path is None else Path(path).resolve())
+
+    def shutdown(self) -> None:
+        self._call("shutdown")
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> 'SaveClient':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ─── Helpers ────────────────────────────────────────────────────────────────
+
+def _as_paths(paths: Path | str | Iterable[Path | str]) -> List[Path]:
+    """ A save, a folder of saves or a list of saves, as absolute paths. """
+    if isinstance(paths, (str, Path)):
+        path = Path(paths).resolve()
+        if path.is_dir():
+            return sorted(child for child in path.iterdir() if child.is_file())
+        return [path]
+    return [Path(path).resolve() for path in paths]
+
+
+def _stamp(path: Path) -> Tuple[Path, int, int]:
+    stat = path.stat()
+    return path.resolve(), stat.st_size, stat.st_mtime_ns
+
+
+def _readable(part: Any) -> Any:
+    return sorted(part) if isinstance(part, frozenset) else part
+
+
+def _picklable_error(error: Exception) -> Exception:
+    """
+    The error itself if the client can unpickle it, else the same type with only the message,
+    or a RuntimeError with the type and message (i.e. lark errors keep references to the parser).
+    """
+    if _round_trips(error):
+        return error
+    try:
+        simple = type(error)(str(error))
+    except Exception:
+        simple = None
+    if simple is not None and _round_trips(simple):
+        return simple
+    return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _round_trips(value: Any) -> bool:
+    try:
+        pickle.loads(pickle.dumps(value))
+    except Exception:
+        return False
+    return True
+
+
+def _split_path(node_path: str | Sequence[str]) -> List[str]:
+    keys = node_path.split(".") if isinstance(node_path, str) else [str(key) for key in node_path]
+    if not keys or not keys[0]:
+        raise ValueError("The path must start with a top-level section, i.e. 'country_manager'.")
+    return keys
+
+
+def _child(value: Any, key: str, path: Sequence[str]) -> Any:
+    """ Child of a parsed block by key, or by position in lists. """
+    if isinstance(value, dict):
+        if key in value:
+            return value[key]
+        if key.lstrip("-").isdigit() and int(key) in value:
+            return value[int(key)]
+    elif isinstance(value, list) and key.lstrip("-").isdigit() and -len(value) <= int(key) < len(value):
+        return value[int(key)]
+    raise KeyError(f"'{'.'.join(path)}' was not found in the save.")
@@ -1,6 +1,8 @@
 from vic3_reader.utils.gui import create_gui
+from vic3_reader.utils.diff import diff_saves
 
 
 __all__ = [
         "create_gui", 
+        "diff_saves",
            ]
\ No newline at end of file
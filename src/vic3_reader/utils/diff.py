@@ -0,0 +1,262 @@
+"""
+Compare two saves, i.e. consecutive autosaves, and list what changed between them.
+
+Plain-text saves are compared block by block on the original text with the scanner, without parsing them.
+Equal blocks are skipped as a whole, so only the changed subtrees are visited (usually a small part of the save).
+JSON and binary saves are compared on their parsed dictionaries, where equal subtrees are skipped the same way.
+
+Each change is a row with the dotted path of the value, its old and new values and,
+for numbers, the difference between them.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from vic3_reader.parser import scanner
+
+NodePath = Tuple[str, ...]
+COUNTRIES_PATH = ("country_manager", "database")
+DIFF_COLUMNS = ["path", "change", "old", "new", "delta"]
+SUMMARY_LENGTH = 80     # characters of a block shown when it is added or removed
+IGNORED_KEYS = {"file coding"}  # header of plain-text saves, missing in binary ones
+
+
+class SaveDiff():
+    """
+    Collect the changes between two saves.
+
+    Parameters:
+    -   wanted_tags: Set of tag ids, optional. Only these countries of country_manager.database are compared.
+
+    -   sections: Sequence of top-level keys, optional. Only these sections are compared (i.e. ["country_manager"]).
+
+    -   max_changes: int, optional. Stop after this number of changes.
+    """
+    def __init__(
+            self,
+            wanted_tags: Optional[Set[str]] = None,
+            sections: Optional[Sequence[str]] = None,
+            max_changes: Optional[int] = None
+            ):
+        self.wanted_tags = None if wanted_tags is None else {str(tag) for tag in wanted_tags}
+        self.sections = None if sections is None else set(sections)
+        self.max_changes = max_changes
+        self.rows: List[Dict[str, Any]] = []
+
+    def is_full(self) -> bool:
+        return self.max_changes is not None and len(self.rows) >= self.max_changes
+
+    def is_wanted(self, path: NodePath) -> bool:
+        if len(path) == 1:
+            return path[0] not in IGNORED_KEYS and (self.sections is None or path[0] in self.sections)
+        if len(path) == len(COUNTRIES_PATH) + 1 and path[:-1] == COUNTRIES_PATH and self.wanted_tags is not None:
+            return path[-1] in self.wanted_tags
+        return True
+
+    def add(self, path: NodePath, old: Any, new: Any) -> None:
+        if self.is_full():
+            return
+        if old is None:
+            change = "added"
+        elif new is None:
+            change = "removed"
+        else:
+            change = "changed"
+
+        delta = None
+        if _is_number(old) and _is_number(new):
+            delta = new - old
+
+        self.rows.append({"path": ".".join(path), "change": change, "old": old, "new": new, "delta": delta})
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.rows, columns=DIFF_COLUMNS)
+
+    # ─── Plain text ──────────────────────────────────────────────────────────
+
+    def compare_text(self, old: str, new: str, path: NodePath = (),
+                     old_span: Optional[scanner.Span] = None, new_span: Optional[scanner.Span] = None) -> None:
+        """ Compare two blocks of plain-text saves. The whole texts if no span is given. """
+        if self.is_full():
+            return
+        top_level = old_span is None
+        old_span = (0, len(old)) if old_span is None else old_span
+        new_span = (0, len(new)) if new_span is None else new_span
+
+        # equal text is an equal subtree: skip it without looking inside
+        if not top_level and old[old_span[0]:old_span[1]] == new[new_span[0]:new_span[1]]:
+            return
+
+        old_is_block = top_level or old.startswith('{', old_span[0])
+        new_is_block = top_level or new.startswith('{', new_span[0])
+        if not (old_is_block and new_is_block):
+            self.add(path, _text_value(old, old_span), _text_value(new, new_span))
+            return
+
+        if not top_level:
+            old_span, new_span = scanner.inner(old_span), scanner.inner(new_span)
+        old_children = _text_children(old, old_span, pairs_only=top_level)
+        new_children = _text_children(new, new_span, pairs_only=top_level)
+
+        for label in _union(old_children, new_children):
+            child_path = path + (label,)
+            if not self.is_wanted(child_path):
+                continue
+            if label not in new_children:
+                self.add(child_path, _text_value(old, old_children[label]), None)
+            elif label not in old_children:
+                self.add(child_path, None, _text_value(new, new_children[label]))
+            else:
+                self.compare_text(old, new, child_path, old_children[label], new_children[label])
+
+    # ─── Parsed data ─────────────────────────────────────────────────────────
+
+    def compare_data(self, old: Any, new: Any, path: NodePath = ()) -> None:
+        """ Compare two parsed values, i.e. from cached JSON or binary saves. """
+        if self.is_full() or old == new:
+            return
+
+        old_children = _data_children(old)
+        new_children = _data_children(new)
+        if old_children is None or new_children is None:
+            self.add(path, _data_value(old), _data_value(new))
+            return
+
+        for label in _union(old_children, new_children):
+            child_path = path + (label,)
+            if not self.is_wanted(child_path):
+                continue
+            if label not in new_children:
+                self.add(child_path, _data_value(old_children[label]), None)
+            elif label not in old_children:
+                self.add(child_path, None, _data_value(new_children[label]))
+            else:
+                self.compare_data(old_children[label], new_children[label], child_path)
+
+
+def diff_saves(
+        old_path: Path | str,
+        new_path: Path | str,
+        wanted_tags: Optional[Iterable[str]] = None,
+        sections: Optional[Sequence[str]] = None,
+        max_changes: Optional[int] = None
+        ) -> pd.DataFrame:
+    """
+    Compare two saves and return a table with a row per changed value:
+    dotted path, change ('changed', 'added' or 'removed'), old value, new value and delta for numbers.
+
+    Parameters:
+    -   old_path, new_path: Path or str. Saves to compare, plain text, cached JSON or binary.
+
+    -   wanted_tags: Iterable of str, optional. Countries to compare in country_manager.database.
+                    Tag ids, 3 letter tags and player names are accepted. Other sections are always compared.
+
+    -   sections: Sequence of top-level keys, optional. Only compare these sections.
+
+    -   max_changes: int, optional. Stop after this number of changes.
+    """
+    from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read
+
+    old_path, new_path = Path(old_path), Path(new_path)
+
+    if wanted_tags is not None:
+        wanted_tags = resolve_wanted_tags(wanted_tags, (old_path, new_path))
+
+    diff = SaveDiff(wanted_tags, sections, max_changes)
+
+    old_extension, old = read(old_path)
+    new_extension, new = read(new_path)
+
+    parsed = ('.json', BINARY_SUFFIX)
+    if old_extension in parsed or new_extension in parsed:
+        diff.compare_data(manage_parsing(old_extension, old), manage_parsing(new_extension, new))
+    else:
+        diff.compare_text(old, new)
+
+    return diff.to_dataframe()
+
+
+def resolve_wanted_tags(wanted_tags: Iterable[str], paths: Sequence[Path]) -> Set[str]:
+    """ Tag ids of the wanted tags in any of the saves. 3 letter tags and player names are resolved per save. """
+    from vic3_reader.metrics.tags_and_players import TagIndex, needs_tag_index
+
+    wanted_tags = [str(tag) for tag in wanted_tags]
+    if not needs_tag_index(wanted_tags):
+        return set(wanted_tags)
+
+    index = TagIndex.from_files(paths)
+    return {
+        tag_id
+        for path in paths
+        for tag_id in index.resolve_all(wanted_tags, path).values() if tag_id is not None
+    }
+
+
+# ─── Helpers ────────────────────────────────────────────────────────────────
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _union(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """ Labels of both sides, in the order of the old side then the new labels. """
+    return list(old) + [label for label in new if label not in old]
+
+
+def _text_children(text: str, span: scanner.Span, pairs_only: bool = False) -> Dict[str, scanner.Span]:
+    """
+    {label: value span} of the elements of a block. Pairs are labelled by their key (repeated keys as 'key[n]')
+    and other elements by their position. With pairs_only, elements that are not pairs are skipped
+    (i.e. the file code at the top of a save).
+    """
+    return _labelled(
+        (key, (value_start, value_end))
+        for key, value_start, value_end in scanner.iter_items(text, *span)
+        if key is not None or not pairs_only
+        )
+
+
+def _labelled(items: Iterable[Tuple[Optional[str], Any]]) -> Dict[str, Any]:
+    children = {}
+    seen: Dict[str, int] = {}
+    for idx, (key, value) in enumerate(items):
+        if key is None:
+            children[str(idx)] = value
+            continue
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        children[key if count == 0 else f"{key}[{count}]"] = value
+    return children
+
+
+def _text_value(text: str, span: scanner.Span) -> Any:
+    """ Number or string of a primitive, or the start of the text of a block. """
+    if text.startswith('{', span[0]) or span[1] - span[0] > SUMMARY_LENGTH:
+        summary = " ".join(text[span[0]:min(span[1], span[0] + SUMMARY_LENGTH)].split())
+        return summary if span[1] - span[0] <= SUMMARY_LENGTH else summary + " …"
+
+    value = scanner.atom(text, span)
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _data_children(value: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(value, dict):
+        return {str(key): child for key, child in value.items()}
+    if isinstance(value, list):
+        # lists mixing pairs and values keep the pairs as (key, value) tuples
+        return _labelled((child[0], child[1]) if isinstance(child, tuple) else (None, child) for child in value)
+    return None
+
+
+def _data_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        text = str(value)
+        return text if len(text) <= SUMMARY_LENGTH else text[:SUMMARY_LENGTH] + " …"
+    return value
@@ -1,82 +1,235 @@
-from tkinter import Tk, ttk
-
-# Inserting items to the treeview 
-# def add_node(treeview: ttk.Treeview, parent_key: str | int, parent_value: dict | str, count: int) -> None:
-#     for key, value in parent_value.items():
-#         treeview.insert(parent_key, count, count, text=key)
-#         count += 1
-#         if isinstance(value, dict):
-#             count = add_node(treeview, count-1, value, count)
-#         else:
-#             treeview.insert(count-1, count, count, text=value)
-#             count += 1
-#     return count
-
-def add_node(treeview: ttk.Treeview, parent: str, node, count: int) -> int:
+from itertools import islice
+from tkinter import END, Listbox, StringVar, Tk, ttk
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+PAGE_SIZE = 500         # max children inserted at once, bigger nodes are split in ranges
+INDEX_DEPTH = 4         # how deep keys are indexed for the search box
+INDEX_MAX_PATHS = 200   # paths kept per key in the search index
+PLACEHOLDER = "…"       # hidden child so a not yet expanded node shows the expand arrow
+
+NodePath = Tuple[Hashable, ...]
+
+
+def describe(key: Hashable, value: Any) -> str:
+    """ Label of a node. Containers show their size, leaves show their value. """
+    if isinstance(value, dict):
+        return f"{key}  {{{len(value)} keys}}"
+    if isinstance(value, list):
+        return f"{key}  [list, {len(value)} items]"
+    return f"{key} = {value}"
+
+
+def children(value: Any, start: int, stop: int) -> List[Tuple[Hashable, Any]]:
+    """ (key, child) pairs from position start to stop of a dict or list. """
+    if isinstance(value, dict):
+        return list(islice(value.items(), start, stop))
+    return list(enumerate(value[start:stop], start))
+
+
+def resolve_path(data: Any, text: str) -> NodePath:
     """
-    Inserts `node` under `parent`.  `node` may be a dict, a list, or a primitive.
-    Returns the updated count.
+    Convert a dotted path i.e. 'country_manager.database.5.budget' to the keys in `data`.
+    Raises KeyError if the path does not exist.
     """
-    # --- DICTIONARY: recurse on its items ---
-    if isinstance(node, dict):
-        for key, value in node.items():
-            # insert the dict key
-            treeview.insert(parent, 'end', iid=str(count), text=str(key))
-            count += 1
-            # recurse into the value
-            count = add_node(treeview, str(count - 1), value, count)
-
-    # --- LIST: recurse on each element ---
-    elif isinstance(node, list):
-        # optional: label the list node itself
-        list_iid = str(count)
-        treeview.insert(parent, 'end', iid=list_iid, text=f"[list, {len(node)} items]")
-        count += 1
-
-        for idx, item in enumerate(node):
-            # give each item a sub‑label "[0]", "[1]", etc.
-            item_iid = str(count)
-            treeview.insert(list_iid, 'end', iid=item_iid, text=f"[{idx}]")
-            count += 1
-            # recurse into the item
-            count = add_node(treeview, item_iid, item, count)
-
-    # --- LEAF: just insert the value as a string ---
-    else:
-        treeview.insert(parent, 'end', iid=str(count), text=str(node))
-        count += 1
-
-    return count
+    path = []
+    node = data
+    for part in filter(None, text.strip().split(".")):
+        if isinstance(node, list) and part.lstrip("[").rstrip("]").isdigit():
+            key = int(part.lstrip("[").rstrip("]"))
+            if key >= len(node):
+                raise KeyError(text)
+        elif isinstance(node, dict) and part in node:
+            key = part
+        else:
+            raise KeyError(text)
+        path.append(key)
+        node = node[key]
+    return tuple(path)
 
-def create_gui(hierarchy: dict) -> None:
-    app = Tk()  
-    app.title("GUI Visualization of nested dictionaries") 
 
-    ttk.Label(app, text ="Treeview(hierarchical)").pack()
+def build_index(data: Any, max_depth: int = INDEX_DEPTH) -> Dict[str, List[NodePath]]:
+    """
+    Index the paths where every dict key is found, up to `max_depth` levels.
+    Numeric keys (ids in databases) are not indexed, but their content is.
+    """
+    index: Dict[str, List[NodePath]] = {}
+    stack: List[Tuple[NodePath, Any]] = [((), data)]
 
-    frame = ttk.Frame(app)
-    frame.pack(expand=True, fill='both')
+    while stack:
+        path, node = stack.pop()
+        if len(path) >= max_depth:
+            continue
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if not str(key).isdigit():
+                    paths = index.setdefault(str(key), [])
+                    if len(paths) < INDEX_MAX_PATHS:
+                        paths.append(path + (key,))
+                if isinstance(value, (dict, list)):
+                    stack.append((path + (key,), value))
+        elif isinstance(node, list):
+            for idx, value in enumerate(node):
+                if isinstance(value, (dict, list)):
+                    stack.append((path + (idx,), value))
 
-    treeview = ttk.Treeview(frame)
-    treeview.pack(side='left', expand=True, fill='both')  
+    return index
 
-    v_scrollbar = ttk.Scrollbar(frame, orient="vertical", command=treeview.yview)
-    v_scrollbar.pack(side='right', fill='y')
 
-    h_scrollbar = ttk.Scrollbar(app, orient="horizontal", command=treeview.xview)
-    h_scrollbar.pack(side='bottom', fill='x')
+class SaveExplorer():
+    """
+    Tk window to navigate a parsed save.
 
-    treeview.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+    Nodes are only inserted in the tree when their parent is expanded, and containers with many
+    children are split in ranges of PAGE_SIZE, so a full save opens in seconds.
+    The search box jumps to a dotted path (i.e. 'country_manager.database.5')
+    or lists the paths of the keys that contain the text.
+    """
+    def __init__(self, hierarchy: dict, title: str = "GUI Visualization of nested dictionaries"):
+        self.data = hierarchy
+        self._index: Optional[Dict[str, List[NodePath]]] = None
 
-    count = 0
-    for key, value in hierarchy.items():
-        treeview.insert("", count, count, text=key)
-        count += 1
-        if isinstance(value, dict):
-            count = add_node(treeview, count-1, value, count) # count needs to be returned to keep the count updated
-        else:
-            treeview.insert(count-1, count, count, text=value)
-            count += 1
+        self._lazy: Dict[str, Tuple[NodePath, Any, int, int]] = {}  # iid -> not yet expanded node
+        self._ranges: Dict[str, Tuple[int, int]] = {}               # iid -> positions of a range node
+        self._iid_by_path: Dict[NodePath, str] = {}
+        self._results: List[NodePath] = []
+
+        self.app = Tk()
+        self.app.title(title)
+
+        search_frame = ttk.Frame(self.app)
+        search_frame.pack(fill='x')
+        ttk.Label(search_frame, text="Path or key:").pack(side='left')
+        self.query = StringVar()
+        entry = ttk.Entry(search_frame, textvariable=self.query)
+        entry.pack(side='left', expand=True, fill='x')
+        entry.bind('<Return>', lambda event: self.search())
+        ttk.Button(search_frame, text="Go", command=self.search).pack(side='left')
+
+        self.results = Listbox(self.app, height=6)
+        self.results.pack(fill='x')
+        self.results.bind('<Double-Button-1>', lambda event: self._jump_to_result())
+
+        frame = ttk.Frame(self.app)
+        frame.pack(expand=True, fill='both')
+
+        self.treeview = ttk.Treeview(frame)
+        self.treeview.pack(side='left', expand=True, fill='both')
+
+        v_scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.treeview.yview)
+        v_scrollbar.pack(side='right', fill='y')
+
+        h_scrollbar = ttk.Scrollbar(self.app, orient="horizontal", command=self.treeview.xview)
+        h_scrollbar.pack(side='bottom', fill='x')
+
+        self.treeview.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.treeview.bind('<<TreeviewOpen>>', lambda event: self.expand(self.treeview.focus()))
 
-    treeview.pack(expand=True, fill='both')
-    app.mainloop()
\ No newline at end of file
+        self._insert_children("", (), self.data, 0, len(self.data))
+
+    def mainloop(self) -> None:
+        self.app.mainloop()
+
+    # ─── Lazy tree ───────────────────────────────────────────────────────────
+
+    def _insert_lazy(self, parent: str, text: str, node: Tuple[NodePath, Any, int, int]) -> str:
+        iid = self.treeview.insert(parent, 'end', text=text)
+        self._lazy[iid] = node
+        self.treeview.insert(iid, 'end', text=PLACEHOLDER)
+        return iid
+
+    def _insert_children(self, parent: str, path: NodePath, value: Any, start: int, stop: int) -> None:
+        size = stop - start
+
+        if size > PAGE_SIZE:
+            step = PAGE_SIZE
+            while size > step * PAGE_SIZE:
+                step *= PAGE_SIZE
+            for range_start in range(start, stop, step):
+                range_stop = min(range_start + step, stop)
+                iid = self._insert_lazy(
+                    parent, f"[{range_start} … {range_stop - 1}]", (path, value, range_start, range_stop)
+                    )
+                self._ranges[iid] = (range_start, range_stop)
+            return
+
+        for key, child in children(value, start, stop):
+            label = describe(f"[{key}]" if isinstance(value, list) else key, child)
+            if isinstance(child, (dict, list)) and child:
+                iid = self._insert_lazy(parent, label, (path + (key,), child, 0, len(child)))
+            else:
+                iid = self.treeview.insert(parent, 'end', text=label)
+            self._iid_by_path[path + (key,)] = iid
+
+    def expand(self, iid: str) -> None:
+        """ Insert the children of a node the first time it is opened. """
+        if iid not in self._lazy:
+            return
+        path, value, start, stop = self._lazy.pop(iid)
+        self.treeview.delete(*self.treeview.get_children(iid))
+        self._insert_children(iid, path, value, start, stop)
+
+    def reveal(self, path: NodePath) -> Optional[str]:
+        """ Insert every node down to `path`, select it and scroll to it. """
+        iid = ""
+        node = self.data
+
+        for depth in range(1, len(path) + 1):
+            self.expand(iid)
+            key = path[depth - 1]
+            position = key if isinstance(node, list) else list(node).index(key)
+
+            while path[:depth] not in self._iid_by_path:
+                ranges = [
+                    child for child in self.treeview.get_children(iid)
+                    if child in self._ranges
+                    and self._ranges[child][0] <= position < self._ranges[child][1]
+                ]
+                if not ranges:
+                    return None
+                iid = ranges[0]
+                self.expand(iid)
+
+            iid = self._iid_by_path[path[:depth]]
+            node = node[key]
+
+        if iid:
+            self.treeview.see(iid)
+            self.treeview.selection_set(iid)
+            self.treeview.focus(iid)
+        return iid
+
+    # ─── Search ──────────────────────────────────────────────────────────────
+
+    def search(self) -> None:
+        """ Jump to the typed path if it exists, otherwise list the paths of matching keys. """
+        text = self.query.get().strip()
+        if not text:
+            return
+
+        try:
+            self.reveal(resolve_path(self.data, text))
+            return
+        except KeyError:
+            pass
+
+        if self._index is None:
+            self._index = build_index(self.data)
+
+        self._results = [
+            path
+            for key in sorted(self._index) if text.lower() in key.lower()
+            for path in self._index[key]
+        ][:INDEX_MAX_PATHS]
+
+        self.results.delete(0, END)
+        for path in self._results:
+            self.results.insert(END, ".".join(str(key) for key in path))
+
+    def _jump_to_result(self) -> None:
+        selection = self.results.curselection()
+        if selection:
+            self.reveal(self._results[selection[0]])
+
+
+def create_gui(hierarchy: dict) -> None:
+    SaveExplorer(hierarchy).mainloop()
@@ -0,0 +1,114 @@
+"""
+Fixtures of the tests, a tiny save in every format the reader supports:
+
+    tiny.v3             plain-text save
+    tiny_binary.v3      the same gamestate as a native binary save (uncompressed, kind 01)
+    tiny_tokens.txt     token table of tiny_binary.v3, with both line formats of load_token_table()
+    tiny.json           the same gamestate as a JSON cache
+
+and small generated plain-text saves with every section the metrics read (see write_save).
+"""
+
+from pathlib import Path
+import random
+
+import pytest
+
+from vic3_reader.parser import binary
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+# tag id: definition of the countries of the generated saves. Tag 5 is formed as GER in 1850
+COUNTRIES = {"1": "GBR", "3": "RUS", "4": "FRA", "5": "PRU", "9": "USA"}
+POP_TYPES = ["laborers", "peasants", "aristocrats", "clerks", "farmers"]
+BUILDINGS = ["building_iron_mine", "building_farm", "building_barracks"]
+
+
+def _trend(value: float) -> str:
+    return f"{{ sample_rate=28 count=3 channels={{ 0={{ date=1836.1.1 index=2 values={{ {value} {value + 1} {value + 2.5} }} }} }} }}"
+
+
+def _country(tag_id: int, definition: str, year: int) -> str:
+    return f"""{tag_id}={{
+ definition="{definition}" infamy={tag_id * 0.5}
+ market_capital={tag_id * 10} market={tag_id % 3}
+ budget={{ credit=1000.5 money={tag_id * 100.0 + year} principal=5.0 }}
+ gdp={_trend(tag_id * 1000 + year)} prestige={_trend(tag_id)} literacy={_trend(0.5)} avgsoltrend={_trend(10)}
+ pop_statistics={{ population_lower_strata=100 population_middle_strata=20 population_upper_strata=3 population_radicals=4 population_loyalists=5 population_political_participants=6 population_salaried_workforce=7 population_subsisting_workforce=8 population_unemployed_workforce=9 population_government_workforce=10 population_military_workforce=11 population_laborer_workforce=12 primary_cultures_population=13 }}
+ government_queue={{ construction_elements={{ {{ type=building_farm state=1 identity=1 construction_left=3 }} {{ type=building_barracks state={tag_id} identity={{ a=1 }} construction_left=100.5 construction_speed=5.0 base_construction_speed=4.0 }} }} }}
+ flag="weird {{ brace"
+}}"""
+
+
+def _pop(pop_id: int, rng: random.Random) -> str:
+    pop_type = rng.choice(POP_TYPES)
+    wage = "" if pop_type == "peasants" else f" wage={rng.randint(1, 50)}.5"     # peasants have no wages
+    return (
+        f' {pop_id}={{ type="{pop_type}" culture={rng.randint(1, 4)} religion="{rng.choice(["catholic", "protestant"])}"'
+        f' location={rng.randint(0, 9)} workforce={rng.randint(1, 1000)} dependents={rng.randint(0, 2000)} wealth={rng.randint(1, 30)}{wage} }}'
+    )
+
+
+def save_text(year: int, countries: dict = COUNTRIES, players: dict = None, n_pops: int = 40) -> str:
+    """ Plain-text save of a year with the given countries {tag id: definition} and players {tag id: name}. """
+    players = {"5": "alice", "9": "bob"} if players is None else players
+    rng = random.Random(year)
+    lines = [
+        "SAV0103abcd",
+        f"date={year}.1.1",
+        'meta_data={ name="test" version="1.5" }',
+        "previous_played={ " + " ".join(f'{{ idtype={tag_id} name="{name}" }}' for tag_id, name in players.items()) + " }",
+        "country_manager={ database={",
+        *(_country(int(tag_id), definition, year) for tag_id, definition in countries.items()),
+        "2=none",
+        "} }",
+        "states={ database={",
+        *(f' {state}={{ country={list(countries)[state % len(countries)]} region="STATE_{state}" }}' for state in range(10)),
+        " 99=none } }",
+        "pops={ database={",
+        *(_pop(pop, rng) for pop in range(n_pops)),
+        "} }",
+        "market_manager={ database={",
+        *(
+            f' {market}={{ name="m{market}" goods={{ grain={{ price={10 + market + year % 7}.5 supply=100 demand=120 }}'
+            f' iron={{ price=40.0 supply=10 demand=5 }} }} }}'
+            for market in range(3)
+        ),
+        "} }",
+        "building_manager={ database={",
+        *(
+            f' {building}={{ building="{rng.choice(BUILDINGS)}" state={rng.randint(0, 9)} levels={rng.randint(1, 5)} }}'
+            for building in range(12)
+        ),
+        " 99=none } }",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def write_save(path: Path, year: int, **kwargs) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(save_text(year, **kwargs), encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def fixtures() -> Path:
+    return FIXTURES
+
+
+@pytest.fixture
+def token_table(monkeypatch) -> Path:
+    """ Token table of tiny_binary.v3, set as the default table only during the test. """
+    path = FIXTURES / "tiny_tokens.txt"
+    monkeypatch.setattr(binary, "TOKENS_FILE", path)
+    return path
+
+
+@pytest.fixture
+def saves_folder(tmp_path) -> Path:
+    """ Folder with three generated saves, 1836, 1840 and 1850. Tag 5 is PRU, then GER in 1850. """
+    folder = tmp_path / "saves"
+    write_save(folder / "a_1836.v3", 1836)
+    write_save(folder / "b_1840.v3", 1840)
+    write_save(folder / "c_1850.v3", 1850, countries={**COUNTRIES, "5": "GER"})
+    return folder
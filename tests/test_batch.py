@@ -0,0 +1,89 @@
+"""
+A batch measures the saves of several campaigns in one pool, biggest saves first, and gives each
+campaign the same table and outputs an Orchestrator would give for its folder.
+"""
+
+from pathlib import Path
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import COUNTRIES, write_save
+from vic3_reader.batch import BatchOrchestrator, Campaign
+from vic3_reader.metrics import get_adm, get_economy, get_population
+from vic3_reader.orchestrator import Orchestrator
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def campaigns(tmp_path, saves_folder):
+    """ The generated saves, and a second campaign with bigger saves and named tags. """
+    other = tmp_path / "other"
+    write_save(other / "x_1836.v3", 1836, n_pops=400)
+    write_save(other / "y_1850.v3", 1850, countries={**COUNTRIES, "5": "GER"}, n_pops=200)
+    return [
+        {"FOLDER_SAVES": saves_folder, "TAGS": ["1", "3"], "METRICS": [get_adm, get_population]},
+        {"FOLDER_SAVES": other, "TAGS": ["GER", "bob"], "METRICS": [get_economy], "NAME": "named"},
+    ]
+
+
+def sorted_df(df):
+    return df.sort_index()
+
+
+def orchestrator_df(config):
+    return Orchestrator(config["FOLDER_SAVES"], set(config["TAGS"]), config["METRICS"]).metrics_df
+
+
+def test_campaigns_equal_the_orchestrator(campaigns):
+    batch = BatchOrchestrator(campaigns, workers=2)
+
+    for config, campaign in zip(campaigns, batch.campaigns):
+        assert campaign.errors == []
+        pd.testing.assert_frame_equal(sorted_df(campaign.metrics_df), sorted_df(orchestrator_df(config)))
+    assert [campaign.name for campaign in batch.campaigns] == ["saves", "named"]
+
+
+def test_biggest_saves_first(campaigns):
+    batch = BatchOrchestrator(campaigns, workers=1)
+
+    sizes = [path.stat().st_size for _, path in batch.order]
+    assert sizes == sorted(sizes, reverse=True)
+    assert [name for name, _ in batch.order][:2] == ["named", "named"]
+
+
+def test_errors_stay_in_their_campaign(campaigns, tmp_path):
+    (campaigns[0]["FOLDER_SAVES"] / "broken.v3").write_text("date=1860.1.1\ncountry_manager={ database={ 1={", encoding='utf-8')
+    campaigns[0].update(FOLDER_RESULTS=tmp_path / "results", FILE_RESULTS="saves.csv", FILE_ERRORS="errors.csv")
+
+    batch = BatchOrchestrator(campaigns, workers=2)
+
+    assert [(Path(error.path).name, error.stage) for error in batch["saves"].errors] == [("broken.v3", "parse")]
+    assert batch["named"].errors == []
+    assert len(pd.read_csv(tmp_path / "results" / "saves.csv")) == len(batch["saves"].metrics_df) == 6
+    assert len(pd.read_csv(tmp_path / "results" / "errors.csv")) == 1
+
+
+def test_restart_resumes_from_the_checkpoint(campaigns, tmp_path):
+    campaigns[0]["FOLDER_CHECKPOINT"] = tmp_path / "checkpoint"
+    first = BatchOrchestrator(campaigns, workers=2)
+
+    second = BatchOrchestrator(campaigns, workers=2)
+
+    assert len(second["saves"].resumed_files) == 3
+    assert [name for name, _ in second.order] == ["named", "named"]
+    pd.testing.assert_frame_equal(sorted_df(second["saves"].metrics_df), sorted_df(first["saves"].metrics_df))
+
+
+def test_config_errors(campaigns):
+    with pytest.raises(ValueError, match="no FOLDER_SAVES"):
+        Campaign({"TAGS": ["1"], "METRICS": [get_adm]}, name="empty")
+    with pytest.raises(ValueError, match="Several campaigns are named 'saves'"):
+        BatchOrchestrator([campaigns[0], dict(campaigns[0])])
+    with pytest.raises(ValueError, match="cannot be sent to the worker processes"):
+        BatchOrchestrator([{**campaigns[0], "METRICS": [lambda data, tag_id: {}]}])
@@ -0,0 +1,117 @@
+"""
+CacheManager keeps the caches of a save folder valid and under a disk budget,
+and its manifest stays readable when several writers save it at once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import os
+import shutil
+import time
+import warnings
+
+import pytest
+
+from conftest import write_save
+from vic3_reader.metrics import get_adm
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser.cache_manager import MANIFEST_NAME, CacheManager
+
+
+def make_cache(manager, source, size=1000, used=None):
+    cache_path = manager.cache_dir / f"{source.name}.json"
+    cache_path.write_bytes(b"x" * size)
+    manager.register(source, cache_path)
+    if used is not None:
+        manager.entries[cache_path.name]["last_used"] = used
+    return cache_path
+
+
+@pytest.fixture
+def sources(tmp_path):
+    return [write_save(tmp_path / f"save_{year}.v3", year, n_pops=2) for year in (1836, 1840, 1844)]
+
+
+def test_least_recently_used_are_evicted(tmp_path, sources):
+    manager = CacheManager(tmp_path / "json_saves", max_mb=2500 / 1024**2)
+    caches = [make_cache(manager, source, used=time.time() - 100 + idx) for idx, source in enumerate(sources)]
+
+    assert [cache.is_file() for cache in caches] == [False, True, True]
+    assert manager.stats["evicted"] == 1
+
+    assert manager.lookup(sources[1], caches[1])     # now the most recently used
+    make_cache(manager, sources[0])
+    assert [cache.is_file() for cache in caches] == [True, True, False]
+
+
+def test_old_caches_are_evicted(tmp_path, sources):
+    manager = CacheManager(tmp_path / "json_saves", max_age_days=1)
+    old = make_cache(manager, sources[0], used=time.time() - 2 * 86400)
+    new = make_cache(manager, sources[1])
+
+    assert not old.is_file() and new.is_file()
+
+
+def test_changed_and_missing_saves(tmp_path, sources):
+    manager = CacheManager(tmp_path / "json_saves")
+    caches = [make_cache(manager, source) for source in sources]
+
+    write_save(sources[0], 1836, n_pops=5)
+    assert not manager.lookup(sources[0], caches[0])
+    assert not caches[0].is_file() and manager.stats["invalidated"] == 1
+
+    sources[1].unlink()
+    manager.prune_missing(tmp_path)
+    assert not caches[1].is_file() and caches[2].is_file()
+    assert manager.stats == {"hits": 0, "misses": 1, "invalidated": 1, "evicted": 0, "pruned": 1}
+
+
+@pytest.mark.parametrize("verify_hash", [False, True])
+def test_copied_save_keeps_its_cache_with_hashes(tmp_path, sources, verify_hash):
+    manager = CacheManager(tmp_path / "json_saves", verify_hash=verify_hash)
+    cache = make_cache(manager, sources[0])
+
+    stat = sources[0].stat()
+    os.utime(sources[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))     # same content, new time
+
+    assert manager.lookup(sources[0], cache) == verify_hash
+
+
+def test_manifest_is_reloaded(tmp_path, sources):
+    manager = CacheManager(tmp_path / "json_saves")
+    cache = make_cache(manager, sources[0])
+    manager.save()
+
+    assert CacheManager(tmp_path / "json_saves").lookup(sources[0], cache)
+
+
+def save_many(cache_dir, writer, times=30):
+    manager = CacheManager(cache_dir)
+    manager.entries = {f"{writer}.json": {"source": writer, "size": 1, "last_used": 0}}
+    for _ in range(times):
+        manager.save()
+        json.loads((manager.cache_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    return True
+
+
+@pytest.mark.parametrize("executor", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_writers_do_not_share_a_temporary_manifest(tmp_path, executor):
+    cache_dir = tmp_path / "json_saves"
+    with executor(max_workers=4) as pool:
+        assert all(pool.map(save_many, [cache_dir] * 4, [f"writer{idx}" for idx in range(4)]))
+
+    assert [path.name for path in cache_dir.iterdir()] == [MANIFEST_NAME]
+
+
+def test_orchestrator_verify_hash(saves_folder):
+    warnings.simplefilter("ignore")
+    Orchestrator(saves_folder, {"1"}, [get_adm], save_as_json=True, cache_verify_hash=True)
+
+    # copy the saves over themselves: new modification times, same content
+    for save in saves_folder.glob("*.v3"):
+        shutil.copy(save, save.with_suffix(".tmp"))
+        time.sleep(0.01)
+        os.replace(save.with_suffix(".tmp"), save)
+
+    orchestrator = Orchestrator(saves_folder, {"1"}, [get_adm], save_as_json=True, cache_verify_hash=True)
+    assert orchestrator.cache_stats["hits"] == 3
@@ -0,0 +1,119 @@
+"""
+A save that fails in any stage is skipped and reported without stopping the run,
+and a run restarted with the same checkpoint only processes the saves that are not done.
+"""
+
+import json
+from pathlib import Path
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader import orchestrator
+from vic3_reader.checkpoint import ERRORS_NAME, ERROR_COLUMNS
+from vic3_reader.metrics import get_adm
+from vic3_reader.orchestrator import Orchestrator
+
+TAGS = {"1", "3"}
+
+
+def failing_in_1840(data, tag_id):
+    """ Metric not in the registry, failing for one save. """
+    if data.date.startswith("1840"):
+        raise RuntimeError("no metric for 1840")
+    return {"dummy": 1}
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def broken_folder(saves_folder):
+    """ The generated saves plus a save failing in each stage before the metrics. """
+    (saves_folder / "read.v3").write_bytes(b"date=1860.1.1\n\xff\xfe broken encoding {")
+    (saves_folder / "parse.v3").write_text("date=1861.1.1\ncountry_manager={ database={ 1={ definition=", encoding='utf-8')
+    (saves_folder / "validate.v3").write_text("date=1862.1.1\ncountry_manager={ database={ 1={ infamy=1 } } }\n", encoding='utf-8')
+    return saves_folder
+
+
+def stages(run):
+    return sorted((Path(error.path).name, error.stage) for error in run.errors)
+
+
+def years(run):
+    return sorted({game_date.year for game_date in run.metrics_df.index.get_level_values("game_date")})
+
+
+def count_parses(monkeypatch):
+    parsed = []
+    manage_parsing = orchestrator.manage_parsing
+
+    def counted(extension, text, *args, **kwargs):
+        parsed.append(extension)
+        return manage_parsing(extension, text, *args, **kwargs)
+
+    monkeypatch.setattr(orchestrator, "manage_parsing", counted)
+    return parsed
+
+
+def test_failures_are_isolated(broken_folder, tmp_path):
+    run = Orchestrator(broken_folder, TAGS, [get_adm, failing_in_1840], checkpoint_dir=tmp_path / "checkpoint")
+
+    assert stages(run) == [
+        ("b_1840.v3", "metrics"), ("parse.v3", "parse"), ("read.v3", "read"), ("validate.v3", "validate"),
+    ]
+    assert years(run) == [1836, 1850]
+
+    report = run.errors_report()
+    assert list(report.columns) == ERROR_COLUMNS and len(report) == 4
+    stored = json.loads((tmp_path / "checkpoint" / ERRORS_NAME).read_text(encoding='utf-8'))
+    assert sorted((Path(error["path"]).name, error["stage"]) for error in stored) == stages(run)
+    assert all("Traceback" in error["traceback"] for error in stored)
+
+
+def test_stop_on_error_raises(broken_folder):
+    (broken_folder / "parse.v3").unlink()
+    (broken_folder / "validate.v3").unlink()
+
+    with pytest.raises(UnicodeDecodeError):
+        Orchestrator(broken_folder, TAGS, [get_adm], stop_on_error=True)
+
+
+def test_restart_resumes_from_the_checkpoint(broken_folder, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint"
+    first = Orchestrator(broken_folder, TAGS, [get_adm], checkpoint_dir=checkpoint)
+    parsed = count_parses(monkeypatch)
+
+    second = Orchestrator(broken_folder, TAGS, [get_adm], checkpoint_dir=checkpoint)
+
+    assert len(parsed) == 2     # only the saves that failed in parse or validate are processed again
+    assert sorted(path.name for path in second.resumed_files) == ["a_1836.v3", "b_1840.v3", "c_1850.v3"]
+    assert stages(second) == stages(first)
+    pd.testing.assert_frame_equal(second.metrics_df, first.metrics_df)
+
+
+def test_changed_save_is_processed_again(saves_folder, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint"
+    Orchestrator(saves_folder, TAGS, [get_adm], checkpoint_dir=checkpoint)
+    write_save(saves_folder / "b_1840.v3", 1841)
+    parsed = count_parses(monkeypatch)
+
+    run = Orchestrator(saves_folder, TAGS, [get_adm], checkpoint_dir=checkpoint)
+
+    assert len(parsed) == 1
+    assert years(run) == [1836, 1841, 1850]
+
+
+def test_other_run_or_broken_checkpoint_is_not_resumed(saves_folder, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint"
+    Orchestrator(saves_folder, TAGS, [get_adm], checkpoint_dir=checkpoint)
+    (checkpoint / "results" / "a_1836.v3.pkl").write_bytes(b"killed mid-write")
+    parsed = count_parses(monkeypatch)
+
+    assert len(Orchestrator(saves_folder, TAGS, [get_adm], checkpoint_dir=checkpoint).resumed_files) == 2
+    assert len(Orchestrator(saves_folder, {"1"}, [get_adm], checkpoint_dir=checkpoint).resumed_files) == 0
+    assert len(parsed) == 1 + 3
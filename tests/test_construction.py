@@ -0,0 +1,47 @@
+"""
+Construction queues are stored as tables. as_elements() must give back the elements
+the queue was read from, as ConstructionElement objects.
+"""
+
+import pytest
+
+from vic3_reader.metrics.models import Vic3Save
+from vic3_reader.metrics.models.country_database import ConstructionElement, ConstructionQueue
+from vic3_reader.parser.reader import manage_parsing, read
+
+ELEMENTS = [
+    {"type": "building_farm", "state": 1, "identity": 1, "construction_left": 3},
+    {"type": "building_barracks", "state": 4, "identity": {"a": 1}, "construction_left": 100.5,
+     "construction_speed": 5.0, "base_construction_speed": 4.0},
+]
+
+
+def test_as_elements_round_trips():
+    queue = ConstructionQueue(construction_elements=ELEMENTS)
+
+    assert queue.as_elements() == [ConstructionElement(**element) for element in ELEMENTS]
+    assert ConstructionQueue(construction_elements=[e.model_dump() for e in queue.as_elements()]) \
+        .as_elements() == queue.as_elements()
+
+
+def test_empty_queue():
+    for queue in (ConstructionQueue(), ConstructionQueue(construction_elements={})):
+        assert queue.as_elements() == []
+        assert queue.construction_elements["construction_left"].sum() == 0
+
+
+def test_missing_field_raises():
+    with pytest.raises(ValueError, match="construction_left"):
+        ConstructionQueue(construction_elements=[{"type": "building_farm", "state": 1, "identity": 1}])
+
+
+def test_queues_of_a_save(saves_folder):
+    data = manage_parsing(*read(saves_folder / "a_1836.v3"))
+    save = Vic3Save(**data)
+
+    for tag_id, country in save.country_manager.database.items():
+        raw = data["country_manager"]["database"][tag_id]["government_queue"]["construction_elements"]
+        assert country.government_queue.as_elements() == [ConstructionElement(**element) for element in raw]
+
+    table = save.construction.frame
+    assert table["identity"].tolist()[:2] == [1, {"a": 1}]
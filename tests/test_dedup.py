@@ -0,0 +1,113 @@
+"""
+deduplicate_saves skips the saves with the same content, and keeps one of the saves with the same
+game date according to its policy, from the date found in the first KBs of every save.
+"""
+
+from datetime import date
+import os
+import shutil
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader.metrics import get_adm
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser import dedup
+from vic3_reader.parser.dedup import deduplicate_saves, fingerprint_saves, head_date
+
+
+@pytest.fixture
+def same_date(saves_folder):
+    """ The generated saves plus a bigger, older save of 1840 (i.e. a manual save next to an autosave). """
+    other = write_save(saves_folder / "manual_1840.v3", 1840, n_pops=60)
+    mtime_ns = (saves_folder / "b_1840.v3").stat().st_mtime_ns
+    os.utime(other, ns=(mtime_ns - 10**9, mtime_ns - 10**9))
+    return saves_folder
+
+
+def names(paths):
+    return sorted(path.name for path in paths)
+
+
+def reasons(skipped):
+    return {skipped_path.name: (kept.name, reason) for skipped_path, (kept, reason) in skipped.items()}
+
+
+def test_head_date(fixtures, token_table, tmp_path, monkeypatch):
+    assert head_date(fixtures / "tiny.v3") == date(1836, 1, 1)
+    assert head_date(fixtures / "tiny_binary.v3") == date(1836, 1, 1)
+
+    meta_data = tmp_path / "meta_data.v3"
+    meta_data.write_text('SAV0103abcd\nmeta_data={ name="x" game_date=1837.2.3 }\n', encoding='utf-8')
+    assert head_date(meta_data) == date(1837, 2, 3)
+
+    monkeypatch.setattr(dedup.binary, "TOKENS_FILE", None)
+    assert head_date(fixtures / "tiny_binary.v3") is None
+
+
+def test_only_saves_with_the_same_size_are_hashed(saves_folder):
+    shutil.copy(saves_folder / "a_1836.v3", saves_folder / "copy.v3")
+
+    hashed = {fingerprint.path.name for fingerprint in fingerprint_saves(saves_folder.iterdir()) if fingerprint.sha256}
+
+    assert hashed == {"a_1836.v3", "copy.v3"}
+
+
+def test_same_content_is_skipped(saves_folder):
+    shutil.copy(saves_folder / "b_1840.v3", saves_folder / "z_copy.v3")
+
+    kept, skipped = deduplicate_saves(saves_folder.iterdir())
+
+    assert names(kept) == ["a_1836.v3", "b_1840.v3", "c_1850.v3"]
+    assert reasons(skipped) == {"z_copy.v3": ("b_1840.v3", "same content")}
+
+
+@pytest.mark.parametrize("policy, kept_name", [
+    ("newest", "b_1840.v3"),
+    ("oldest", "manual_1840.v3"),
+    ("largest", "manual_1840.v3"),
+])
+def test_same_date_policy(same_date, policy, kept_name):
+    kept, skipped = deduplicate_saves(same_date.iterdir(), policy)
+
+    skipped_name = ({"b_1840.v3", "manual_1840.v3"} - {kept_name}).pop()
+    assert names(kept) == sorted(["a_1836.v3", kept_name, "c_1850.v3"])
+    assert reasons(skipped) == {skipped_name: (kept_name, "same game date 1840-01-01")}
+
+
+def test_policy_all_keeps_same_dates(same_date):
+    shutil.copy(same_date / "a_1836.v3", same_date / "z_copy.v3")
+
+    kept, skipped = deduplicate_saves(same_date.iterdir(), "all")
+
+    assert "manual_1840.v3" in names(kept)
+    assert reasons(skipped) == {"z_copy.v3": ("a_1836.v3", "same content")}     # same content is still skipped
+
+
+def test_policy_error_lists_the_saves(same_date):
+    with pytest.raises(ValueError, match="1840-01-01: b_1840.v3, manual_1840.v3"):
+        deduplicate_saves(same_date.iterdir(), "error")
+
+    with pytest.raises(ValueError, match="Unknown same_date_policy"):
+        deduplicate_saves(same_date.iterdir(), "first")
+
+
+def test_unreadable_and_folders_are_kept(saves_folder):
+    (saves_folder / "broken.v3").write_bytes(b"\xff\xfe no date")
+    (saves_folder / "json_saves").mkdir()
+
+    kept, skipped = deduplicate_saves(saves_folder.iterdir())
+
+    assert names(kept) == ["a_1836.v3", "b_1840.v3", "broken.v3", "c_1850.v3", "json_saves"]
+    assert skipped == {}
+
+
+def test_orchestrator_skips_duplicates(same_date):
+    warnings.simplefilter("ignore")
+    run = Orchestrator(same_date, {"1", "3"}, [get_adm])
+    (same_date / "manual_1840.v3").unlink()
+
+    assert reasons(run.duplicates) == {"manual_1840.v3": ("b_1840.v3", "same game date 1840-01-01")}
+    pd.testing.assert_frame_equal(run.metrics_df, Orchestrator(same_date, {"1", "3"}, [get_adm]).metrics_df)
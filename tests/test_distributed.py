@@ -0,0 +1,118 @@
+"""
+Several nodes (processes here) sharing a work folder must process every save exactly once
+and merge the same table a single Orchestrator builds.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader.distributed import DistributedOrchestrator, WorkDir, merge_shards
+from vic3_reader.metrics import get_adm
+from vic3_reader.orchestrator import Orchestrator
+
+TAGS = {"1", "3"}
+
+
+@pytest.fixture
+def many_saves(tmp_path):
+    folder = tmp_path / "saves"
+    for year in range(1836, 1848, 2):
+        write_save(folder / f"save_{year}.v3", year)
+    return folder
+
+
+def run_node(folder, work_dir, node_id, **kwargs):
+    warnings.simplefilter("ignore")
+    node = DistributedOrchestrator(folder, TAGS, [get_adm], work_dir, node_id=node_id, poll_seconds=0.05, **kwargs)
+    return [filepath.name for filepath in node.processed_files], node.metrics_df
+
+
+def claim_at(work_dir, filepath, node_id, start):
+    """ Claim a save at the same time as other processes. """
+    while time.time() < start:
+        pass
+    return WorkDir(work_dir, lock_timeout=1).claim(filepath, node_id)
+
+
+def sorted_df(df):
+    return df.sort_index()
+
+
+def test_nodes_process_every_save_once(many_saves, tmp_path):
+    work_dir = tmp_path / "work"
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(run_node, many_saves, work_dir, f"node{idx}") for idx in range(3)]
+        results = [future.result() for future in futures]
+
+    processed = [name for names, _ in results for name in names]
+    assert sorted(processed) == sorted(filepath.name for filepath in many_saves.glob("*.v3"))
+
+    warnings.simplefilter("ignore")
+    expected = Orchestrator(many_saves, TAGS, [get_adm]).metrics_df
+    for _, metrics_df in results:
+        pd.testing.assert_frame_equal(sorted_df(metrics_df), sorted_df(expected))
+    pd.testing.assert_frame_equal(sorted_df(merge_shards(work_dir, TAGS, [get_adm])), sorted_df(expected))
+
+
+def test_abandoned_lock_is_claimed_by_one_node(many_saves, tmp_path):
+    work_dir = tmp_path / "work"
+    filepath = sorted(many_saves.glob("*.v3"))[0]
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        for attempt in range(3):
+            lock = WorkDir(work_dir).lock_path(filepath)
+            lock.write_text("dead-node\n")
+            os.utime(lock, (time.time() - 60, time.time() - 60))
+
+            start = time.time() + 0.5
+            futures = [pool.submit(claim_at, work_dir, filepath, f"node{idx}", start) for idx in range(4)]
+            assert sum(future.result() for future in futures) == 1
+            lock.unlink()
+
+    assert sorted(path.name for path in (work_dir / "locks").iterdir()) == []   # no steal locks left
+
+
+def test_refreshed_lock_is_not_claimed(many_saves, tmp_path):
+    work_dir = WorkDir(tmp_path / "work", lock_timeout=1)
+    filepath = sorted(many_saves.glob("*.v3"))[0]
+
+    assert work_dir.claim(filepath, "node0")
+    time.sleep(0.6)
+    work_dir.refresh(filepath)
+    time.sleep(0.6)
+    assert not work_dir.claim(filepath, "node1")
+    time.sleep(1.1)
+    assert work_dir.claim(filepath, "node1")
+
+
+def test_changed_save_is_processed_again(many_saves, tmp_path):
+    work_dir = tmp_path / "work"
+    names, _ = run_node(many_saves, work_dir, "node0")
+    assert len(names) == 6
+    assert run_node(many_saves, work_dir, "node0")[0] == []
+
+    changed = sorted(many_saves.glob("*.v3"))[0]
+    write_save(changed, 1836, players={})
+    assert run_node(many_saves, work_dir, "node0")[0] == [changed.name]
+
+    # other tags or metrics are another run: every save is processed again
+    node = DistributedOrchestrator(many_saves, {"1"}, [get_adm], work_dir, node_id="node0", poll_seconds=0.05)
+    assert len(node.processed_files) == 6
+
+
+def test_restored_saves_are_merged(many_saves, tmp_path):
+    checkpoint = tmp_path / "checkpoint"
+    run_node(many_saves, tmp_path / "work_a", "node0", checkpoint_dir=checkpoint)
+
+    names, metrics_df = run_node(many_saves, tmp_path / "work_b", "node0", checkpoint_dir=checkpoint)
+
+    assert names == []
+    warnings.simplefilter("ignore")
+    expected = Orchestrator(many_saves, TAGS, [get_adm]).metrics_df
+    pd.testing.assert_frame_equal(sorted_df(metrics_df), sorted_df(expected))
@@ -0,0 +1,112 @@
+"""
+The JSON stream walks a cache as bytes and jumps over the values that are not needed,
+so it must find the same members as json.loads() whatever the strings and blocks contain.
+"""
+
+import json
+import mmap
+import warnings
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_adm, get_economy, get_population
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser.json_stream import NESTED_DEPTH, iter_members, load_json, match_bracket, open_json, skip_ws
+
+TRICKY = {
+    "quote \" key": 1,
+    "brackets": "} ] { [ \\\" still a string",
+    "uniécode": ["☃", {"a": "\\"}],
+    "deep": {"d": 1},
+    "empty": {},
+    "values": [True, False, None, -1.5e3, 0],
+    "country_manager": {
+        "other": {"database": {"1": "not this one"}},
+        "database": {"1": {"definition": "GBR"}, "3": {"definition": "RUS", "flag": "{"}, "10": None},
+    },
+}
+
+
+def deep(depth):
+    value = "end"
+    for level in range(depth):
+        value = {f"level {level}": [value, "]"]}
+    return value
+
+
+@pytest.fixture
+def tricky():
+    data = dict(TRICKY, deep=deep(3 * NESTED_DEPTH))
+    return data, json.dumps(data, indent=1).encode('utf-8')
+
+
+def test_members_are_found(tricky):
+    data, text = tricky
+
+    members = {key: json.loads(text[start:end]) for key, start, end in iter_members(text, skip_ws(text, 0))}
+
+    assert members == data
+    assert list(members) == list(data)
+
+
+def test_compact_and_escaped_json(tricky):
+    data, _ = tricky
+    for text in (json.dumps(data, separators=(",", ":")), json.dumps(data, ensure_ascii=False)):
+        assert load_json(text, {"uniécode", "quote \" key", "deep"}) == {
+            key: data[key] for key in ("quote \" key", "uniécode", "deep")
+        }
+
+
+def test_wanted_tags(tricky):
+    data, text = tricky
+
+    assert load_json(text, {"country_manager"}, wanted_tags={3, "10"}) == {
+        "country_manager": {"database": {"3": data["country_manager"]["database"]["3"], "10": None}}
+    }
+    assert load_json(b'{"country_manager": {"other": 1}}', wanted_tags={"1"}) == {"country_manager": {"database": {}}}
+
+
+@pytest.mark.parametrize("text, error", [
+    (b'[1, 2]', "Expected a JSON object"),
+    (b'{"a" 1}', "Expected ':'"),
+    (b'{"a": 1 "b": 2}', "Expected ','"),
+    (b'{a: 1}', "Expected a key"),
+])
+def test_malformed_objects(text, error):
+    with pytest.raises(ValueError, match=error):
+        list(iter_members(text, 0))
+
+
+def test_unbalanced_block():
+    text = json.dumps(deep(2 * NESTED_DEPTH)).encode('utf-8')
+
+    assert match_bracket(text, 0) == len(text)
+    with pytest.raises(ValueError, match="Unbalanced"):
+        match_bracket(text[:-1], 0)
+
+
+def test_open_json(tmp_path):
+    path = tmp_path / "save.v3.json"
+    path.write_text(json.dumps(TRICKY), encoding='utf-8')
+    (tmp_path / "empty.json").write_bytes(b"")
+
+    mapped = open_json(path)
+
+    assert isinstance(mapped, mmap.mmap)
+    assert load_json(mapped) == TRICKY
+    assert load_json(mapped, {"empty"}) == {"empty": {}}
+    assert open_json(tmp_path / "empty.json") == b""
+
+
+def test_orchestrator_from_json_caches(saves_folder):
+    warnings.simplefilter("ignore")
+    metrics_fn = [get_adm, get_economy, get_population]
+
+    from_text = Orchestrator(saves_folder, {"1", "3"}, metrics_fn, save_as_json=True)
+    caches = sorted((saves_folder / "json_saves").glob("*.v3.json"))
+    from_json = Orchestrator(saves_folder, {"1", "3"}, metrics_fn, save_as_json=True)
+
+    assert len(caches) == 3
+    assert from_json.cache_stats["hits"] == 3
+    pd.testing.assert_frame_equal(from_json.metrics_df, from_text.metrics_df)
@@ -0,0 +1,88 @@
+"""
+extract_market_metrics reads only the market sections of the saves and must give the same
+table as the market metrics of a full Orchestrator run.
+"""
+
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_market
+from vic3_reader.metrics.markets import extract_market_metrics, read_market_section
+from vic3_reader.metrics.models.basic import ProcessingWarning
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser.reader import manage_parsing, read
+
+
+def test_same_table_as_orchestrator(saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    expected = Orchestrator(saves_folder, {"1", "3"}, [get_market]).metrics_df.drop(columns="TAG")
+
+    pd.testing.assert_frame_equal(
+        extract_market_metrics(saves, {"1", "3"}).sort_index(), expected.sort_index(), check_like=True
+        )
+
+
+def test_saves_with_the_same_date_are_kept(saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    copy = shutil.copy(saves[0], saves_folder / "copy.v3")
+
+    df = extract_market_metrics([*saves, copy], {"1"})
+
+    assert df.index.get_level_values("game_date").value_counts().max() == 2
+    assert len(df) == len(saves) + 1
+
+
+def test_nothing_to_read_gives_an_empty_table(saves_folder):
+    for paths in ([], [saves_folder / "missing.v3"]):
+        df = extract_market_metrics(paths, {"1"})
+        assert df.empty
+        assert df.index.names == ["game_date", "tag_id"]
+
+
+def test_tags_and_players_are_resolved(saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    by_id = extract_market_metrics(saves, {"5"})
+
+    # tag 5 is PRU until GER is formed in the last save, alice plays it
+    for wanted in ("GER", "PRU", "alice"):
+        pd.testing.assert_frame_equal(extract_market_metrics(saves, {wanted}), by_id)
+
+    with pytest.warns(ProcessingWarning, match="XXX"):
+        assert extract_market_metrics(saves, {"XXX"}).empty
+
+
+def test_json_cache_reads_like_text(saves_folder, tmp_path):
+    save = sorted(saves_folder.glob("*.v3"))[0]
+    data = manage_parsing(*read(save))
+    data.pop("file coding")
+    cache = tmp_path / "save.json"
+    cache.write_text(json.dumps(data), encoding='utf-8')
+
+    text_date, text_markets, text_frame = read_market_section(save, {"1", "3"})
+    json_date, json_markets, json_frame = read_market_section(cache, {"1", "3"})
+
+    assert (json_date, json_markets) == (text_date, text_markets)
+    pd.testing.assert_frame_equal(json_frame, text_frame)
+
+    # a country without market is left out
+    del data["country_manager"]["database"]["3"]["market"]
+    cache.write_text(json.dumps(data), encoding='utf-8')
+    assert set(read_market_section(cache, {"1", "3"})[1]) == {"1"}
+
+
+@pytest.mark.parametrize("text, section", [
+    ("country_manager={ database={ } }\n", "date"),
+    ("date=1836.1.1\nmarket_manager={ database={ } }\n", "country_manager.database"),
+])
+def test_missing_sections_raise(tmp_path, text, section):
+    save = tmp_path / "broken.v3"
+    save.write_text(text, encoding='utf-8')
+    cache = tmp_path / "broken.json"
+    cache.write_text(json.dumps(dict(manage_parsing(".v3", text))), encoding='utf-8')
+
+    for path in (save, cache):
+        with pytest.raises(ValueError, match=section):
+            read_market_section(path, {"1"})
@@ -0,0 +1,146 @@
+"""
+The binary decoder, the chunked parse and the JSON stream must give the same dictionary as the
+plain-text parser, so the metrics do not depend on the format of the save.
+"""
+
+import concurrent.futures
+import json
+import warnings
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_adm, get_population
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser import get_parser
+from vic3_reader.parser.binary import load_token_table, parse_binary, read_packed_save
+from vic3_reader.parser.json_stream import load_json
+from vic3_reader.parser.parallel import parse_chunk, parse_in_chunks, parse_pool
+from vic3_reader.parser.reader import BINARY_SUFFIX, manage_parsing, read
+from vic3_reader.parser.scanner import split_top_level
+
+SECTIONS = {"date", "country_manager", "previous_played"}
+
+
+def text_save(fixtures):
+    _, text = read(fixtures / "tiny.v3")
+    return text
+
+
+def parse_text(text):
+    data = dict(get_parser().parse(text))
+    data.pop("file coding", None)   # the header of plain-text saves, not part of the gamestate
+    return data
+
+
+# ─── Binary saves ───────────────────────────────────────────────────────────
+
+def test_binary_save_decodes_like_text(fixtures, token_table):
+    extension, gamestate = read(fixtures / "tiny_binary.v3")
+
+    assert extension == BINARY_SUFFIX
+    assert manage_parsing(extension, gamestate) == parse_text(text_save(fixtures))
+
+
+def test_binary_sections_decode_like_text(fixtures, token_table):
+    extension, gamestate = read(fixtures / "tiny_binary.v3")
+    expected = manage_parsing('.v3', text_save(fixtures), sections=SECTIONS)
+
+    assert manage_parsing(extension, gamestate, sections=SECTIONS) == expected
+
+
+def test_binary_values(fixtures):
+    _, gamestate = read_packed_save(fixtures / "tiny_binary.v3")
+    data = parse_binary(gamestate, load_token_table(fixtures / "tiny_tokens.txt"))
+    country = data["country_manager"]["database"]["1"]
+
+    assert data["date"] == "1836.1.1.6"
+    assert country["gdp"]["channels"]["0"]["date"] == "1836.1.1"
+    assert country["budget"] == {"credit": 1000.5, "money": -100.25}
+    assert country["is_ai"] == "no"
+    assert data["country_manager"]["database"]["5"]["color"] == {"rgb": {"r": 12, "g": 34, "b": 56}}
+    assert data["empty_block"] == {}
+
+
+def test_binary_needs_a_token_table(fixtures, monkeypatch):
+    from vic3_reader.parser import binary
+
+    monkeypatch.setattr(binary, "TOKENS_FILE", None)
+    _, gamestate = read_packed_save(fixtures / "tiny_binary.v3")
+    with pytest.raises(ValueError):
+        parse_binary(gamestate)
+
+
+# ─── Chunked parse ──────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("n_chunks", [1, 2, 3, 5, 100])
+def test_split_top_level_parses_like_one_text(fixtures, n_chunks):
+    text = text_save(fixtures)
+    chunks = split_top_level(text, n_chunks)
+
+    assert "".join(chunks).rstrip() == text.rstrip()    # the trailing whitespace may be dropped
+    merged = {}
+    for chunk in chunks:
+        merged.update(parse_chunk(chunk))
+    assert merged == dict(get_parser().parse(text))
+
+
+def test_parse_in_chunks_equals_single_parse(fixtures):
+    text = text_save(fixtures)
+
+    assert parse_in_chunks(text, workers=2) == dict(get_parser().parse(text))
+
+
+def test_pool_is_reused_between_saves(saves_folder):
+    texts = [read(path)[1] for path in sorted(saves_folder.glob("*.v3"))]
+
+    with parse_pool(2) as pool:
+        for text in texts:
+            assert parse_in_chunks(text, workers=2, pool=pool) == dict(get_parser().parse(text))
+
+
+def test_orchestrator_starts_one_pool_per_run(saves_folder, monkeypatch):
+    pools, shut_down = [], []
+
+    class CountedPool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+        def shutdown(self, *args, **kwargs):
+            shut_down.append(self)
+            super().shutdown(*args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", CountedPool)
+    warnings.simplefilter("ignore")
+
+    in_pool = Orchestrator(saves_folder, {"1", "3"}, [get_adm, get_population], parse_workers=2).metrics_df
+    single = Orchestrator(saves_folder, {"1", "3"}, [get_adm, get_population], parse_workers=1).metrics_df
+
+    assert len(pools) == 1
+    assert shut_down == pools   # at the end of the run
+    pd.testing.assert_frame_equal(in_pool.sort_index(), single.sort_index())
+
+
+# ─── JSON caches ────────────────────────────────────────────────────────────
+
+def test_load_json_equals_json_loads(fixtures):
+    data = (fixtures / "tiny.json").read_bytes()
+
+    assert load_json(data) == json.loads(data)
+    assert load_json(data.decode("utf-8")) == json.loads(data)
+
+
+def test_load_json_sections_and_tags(fixtures):
+    data = (fixtures / "tiny.json").read_bytes()
+    expected = {key: value for key, value in json.loads(data).items() if key in SECTIONS}
+
+    assert load_json(data, SECTIONS) == expected
+
+    database = expected["country_manager"]["database"]
+    expected["country_manager"] = {"database": {"1": database["1"]}}
+    assert load_json(data, SECTIONS, wanted_tags={"1"}) == expected
+
+
+def test_json_cache_equals_text_save(fixtures):
+    assert load_json((fixtures / "tiny.json").read_bytes()) == parse_text(text_save(fixtures))
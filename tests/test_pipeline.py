@@ -0,0 +1,65 @@
+"""
+The Orchestrator pipeline (read -> parse -> project -> metrics) keeps only one save alive at a time,
+and reports the peak resident memory of the process.
+"""
+
+import gc
+import sys
+import warnings
+import weakref
+
+import pytest
+
+from conftest import write_save
+from vic3_reader import orchestrator
+from vic3_reader.metrics import get_adm, get_population
+from vic3_reader.orchestrator import Orchestrator, peak_rss_mb
+
+
+@pytest.fixture
+def many_saves(tmp_path):
+    folder = tmp_path / "saves"
+    for year in range(1836, 1846, 2):
+        write_save(folder / f"save_{year}.v3", year)
+    return folder
+
+
+def test_one_save_alive_at_a_time(many_saves, monkeypatch):
+    warnings.simplefilter("ignore")
+    validated = []
+    alive_when_measured = []
+    validate_save = orchestrator.validate_save
+
+    def tracked_validate(*args, **kwargs):
+        save = validate_save(*args, **kwargs)
+        validated.append(weakref.ref(save))
+        return save
+
+    class TrackedMetrics(orchestrator.SaveMetrics):
+        def to_dataframe(self):
+            gc.collect()
+            alive_when_measured.append(sum(ref() is not None for ref in validated))
+            return super().to_dataframe()
+
+    monkeypatch.setattr(orchestrator, "validate_save", tracked_validate)
+    monkeypatch.setattr(orchestrator, "SaveMetrics", TrackedMetrics)
+
+    run = Orchestrator(many_saves, {"1", "3"}, [get_adm, get_population], skip_duplicates=False)
+
+    assert alive_when_measured == [1] * 5      # the previous saves were released
+    gc.collect()
+    assert all(ref() is None for ref in validated)  # only the metric tables are kept by the run
+    assert len(run.metrics_df) == 10
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="ru_maxrss is not available on Windows")
+def test_peak_rss_is_cumulative(many_saves):
+    warnings.simplefilter("ignore")
+    before = peak_rss_mb()
+
+    run = Orchestrator(many_saves, {"1"}, [get_adm])
+
+    by_file = list(run.peak_rss_mb_by_file.values())
+    assert sorted(run.peak_rss_mb_by_file) == sorted(many_saves.glob("*.v3"))
+    assert by_file == sorted(by_file)       # it never decreases
+    assert before <= by_file[0] and by_file[-1] <= run.peak_rss_mb
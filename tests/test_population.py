@@ -0,0 +1,109 @@
+"""
+Population metrics aggregate the pops table per country, state (region) and strata.
+The tables of a save are built only when a metric reads them.
+"""
+
+import warnings
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_population
+from vic3_reader.metrics.models import Vic3Save
+from vic3_reader.metrics.population import get_pops_by_state, get_wages, get_wages_by_state
+from vic3_reader.metrics.models.population import POP_TYPE_STRATA
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser.reader import manage_parsing, read
+
+
+@pytest.fixture
+def save_data(saves_folder):
+    return manage_parsing(*read(saves_folder / "a_1836.v3"))
+
+
+def expected_pops(data):
+    """ Pops of the save as a plain frame, with the owner country and region read by hand. """
+    states = data["states"]["database"]
+    rows = []
+    for pop in data["pops"]["database"].values():
+        state = states[str(pop["location"])]
+        rows.append({
+            "country": str(state["country"]),
+            "region": state["region"],
+            "strata": POP_TYPE_STRATA[pop["type"]],
+            "size": pop["workforce"] + pop["dependents"],
+            "workforce": pop["workforce"],
+            "wage": pop.get("wage"),
+        })
+    return pd.DataFrame(rows)
+
+
+def weighted_wage(pops):
+    paid = pops[pops["wage"].notna()]
+    return (paid["wage"] * paid["workforce"]).sum() / paid["workforce"].sum()
+
+
+def test_tables_are_built_when_read(save_data):
+    save = Vic3Save(**save_data)
+
+    for table in (save.pops, save.states, save.market_manager, save.building_manager, save.construction):
+        assert table.table is None
+
+    get_pops_by_state(save, "1")
+
+    assert save.pops.table is not None and save.states.table is not None
+    assert save.pops.database is None     # the raw section is released once read
+    assert save.market_manager.table is None and save.construction.table is None
+
+
+def test_dump_holds_the_tables(save_data):
+    save = Vic3Save(**save_data)
+
+    dumped = save.model_dump()
+
+    assert isinstance(dumped["pops"]["table"], pd.DataFrame)
+    assert dumped["pops"]["database"] is None
+    pd.testing.assert_frame_equal(Vic3Save(**dumped).pops.frame, save.pops.frame)
+
+
+def test_pops_and_wages_per_state(save_data):
+    save = Vic3Save(**save_data)
+    pops = expected_pops(save_data)
+
+    for tag_id, country in pops.groupby("country"):
+        by_state = get_pops_by_state(save, tag_id)
+        wages_by_state = get_wages_by_state(save, tag_id)
+
+        assert by_state == {f"pops_state_{region}": size for region, size in country.groupby("region")["size"].sum().items()}
+        for region, state in country.groupby("region"):
+            if state["wage"].notna().any():
+                assert wages_by_state[f"wage_state_{region}"] == pytest.approx(weighted_wage(state))
+            else:
+                assert f"wage_state_{region}" not in wages_by_state
+
+
+def test_wages_per_country_and_strata(save_data):
+    save = Vic3Save(**save_data)
+    pops = expected_pops(save_data)
+
+    for tag_id, country in pops.groupby("country"):
+        wages = get_wages(save, tag_id)
+
+        assert wages.pop("wage_mean") == pytest.approx(weighted_wage(country))
+        expected = {
+            f"wage_strata_{strata}": weighted_wage(group)
+            for strata, group in country.groupby("strata") if group["wage"].notna().any()
+        }
+        assert wages == pytest.approx(expected)
+
+    assert get_wages(save, "2") == {}   # a country without pops
+
+
+def test_orchestrator_columns(saves_folder):
+    warnings.simplefilter("ignore")
+    df = Orchestrator(saves_folder, {"1", "3"}, [get_population]).metrics_df
+
+    assert "wage_mean" in df.columns
+    assert any(column.startswith("wage_strata_") for column in df.columns)
+    assert any(column.startswith("pops_state_") for column in df.columns)
+    assert df["wage_mean"].notna().all()
@@ -0,0 +1,106 @@
+"""
+prefetch_files loads the next files in threads, in order, within its depth and memory budget.
+"""
+
+from pathlib import Path
+import threading
+import time
+import warnings
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_adm, get_population
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser.prefetch import prefetch_files
+
+PATHS = [Path(f"save_{idx}.v3") for idx in range(8)]     # not in disk, their size is given
+
+
+def one_mb(path):
+    return 1024**2
+
+
+class Loader():
+    """ load() of prefetch_files recording how many loads are ahead of the consumer. """
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.started = []
+        self.lock = threading.Lock()
+
+    def __call__(self, path):
+        with self.lock:
+            self.started.append(path)
+        time.sleep(self.delays.get(path, 0))
+        return path.name
+
+
+def test_order_is_kept():
+    # the first files are the slowest to load
+    loader = Loader({path: 0.05 * (len(PATHS) - idx) / len(PATHS) for idx, path in enumerate(PATHS)})
+
+    assert list(prefetch_files(PATHS, loader, depth=4, size=one_mb)) == [path.name for path in PATHS]
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_depth_bounds_the_loads_ahead(depth):
+    loader = Loader()
+    ahead = []
+
+    for consumed, _ in enumerate(prefetch_files(PATHS, loader, depth=depth, size=one_mb), 1):
+        time.sleep(0.01)    # let the threads start what they can
+        ahead.append(len(loader.started) - consumed)
+
+    assert max(ahead) == depth
+    assert len(loader.started) == len(PATHS)
+
+
+def test_memory_budget_bounds_the_loads_ahead():
+    loader = Loader()
+    ahead = []
+
+    # 3 MB per file and a 7 MB budget: two files ahead at most
+    files = prefetch_files(PATHS, loader, depth=5, memory_budget_mb=7, size=lambda path: 3 * 1024**2)
+    for consumed, _ in enumerate(files, 1):
+        time.sleep(0.01)
+        ahead.append(len(loader.started) - consumed)
+
+    assert max(ahead) == 2
+
+
+def test_file_over_the_budget_is_still_loaded():
+    files = prefetch_files(PATHS[:3], Loader(), depth=2, memory_budget_mb=1, size=lambda path: 5 * 1024**2)
+
+    assert list(files) == [path.name for path in PATHS[:3]]
+
+
+def test_errors_are_raised_in_order():
+    def load(path):
+        if path == PATHS[2]:
+            raise OSError("disk error")
+        return path.name
+
+    files = prefetch_files(PATHS, load, depth=3, size=one_mb)
+    assert [next(files), next(files)] == ["save_0.v3", "save_1.v3"]
+    with pytest.raises(OSError, match="disk error"):
+        next(files)
+
+
+def test_loads_overlap_with_the_consumer():
+    loader = Loader({path: 0.05 for path in PATHS[:4]})
+    start = time.perf_counter()
+
+    for _ in prefetch_files(PATHS[:4], loader, depth=4, size=one_mb):
+        time.sleep(0.05)    # i.e. parsing
+
+    assert time.perf_counter() - start < 0.05 * 4 * 2 * 0.8     # well under loading and parsing one after the other
+
+
+def test_orchestrator_with_prefetch(saves_folder):
+    warnings.simplefilter("ignore")
+    metrics_fn = [get_adm, get_population]
+
+    expected = Orchestrator(saves_folder, {"1", "3"}, metrics_fn).metrics_df
+    for depth, budget in ((1, None), (3, None), (2, 0.001)):
+        prefetched = Orchestrator(saves_folder, {"1", "3"}, metrics_fn, prefetch_files=depth, prefetch_memory_mb=budget)
+        pd.testing.assert_frame_equal(prefetched.metrics_df, expected)
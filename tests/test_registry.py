@@ -0,0 +1,133 @@
+"""
+The metrics registry computes the selected metrics as a graph: shared lookups are computed once,
+only the sections read by the metrics are validated, and key collisions are rejected.
+"""
+
+import warnings
+
+import pandas as pd
+import pytest
+
+from vic3_reader.metrics import get_adm, get_buildings, get_economy, get_population
+from vic3_reader.metrics.economy import ECONOMY_FN, get_budget
+from vic3_reader.metrics.registry import REGISTRY, SAVE, TAG_ID, MetricRegistry
+from vic3_reader.orchestrator import SaveMetrics, metric_plan, validate_save
+from vic3_reader.parser.reader import manage_parsing, read
+
+TAGS = {"1", "3"}
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def registry():
+    """ Registry with a lookup per save, a lookup per tag using it and two metrics of a group. """
+    registry = MetricRegistry()
+    registry.calls = []
+
+    @registry.lookup("total", inputs=(SAVE,))
+    def total(save):
+        registry.calls.append("total")
+        return sum(save.values())
+
+    @registry.lookup("share", inputs=("total", TAG_ID))
+    def share(total, tag_id):
+        registry.calls.append("share")
+        return None if tag_id == "none" else int(tag_id) / total
+
+    @registry.metric("toy", inputs=("share",), reads=("a.b",), keys=("share",))
+    def get_share(share):
+        return {"share": share}
+
+    @registry.metric("toy", inputs=("share", TAG_ID), reads=("c",), prefixes=("double_",))
+    def get_double(share, tag_id):
+        return {f"double_{tag_id}": 2 * share}
+
+    registry.members = [get_share]
+
+    @registry.group_function("toy", members=registry.members)
+    def get_toy(data, tag_id):
+        return {}
+
+    return registry
+
+
+def test_lookups_are_computed_once(registry):
+    plan = registry.plan(["get_share", "get_double"])
+
+    assert plan.compute({"x": 2, "y": 8}, ["1", "4"]) == {
+        "1": {"share": 0.1, "double_1": 0.2}, "4": {"share": 0.4, "double_4": 0.8},
+    }
+    assert registry.calls == ["total", "share", "share"]    # total does not depend on the tag
+    assert [node.name for node in plan.nodes] == ["total", "share", "get_share", "get_double"]
+    assert plan.fields == {"a", "c"}
+
+
+def test_none_input_gives_no_values(registry):
+    assert registry.plan(["get_share", "get_double"]).compute({"x": 1}, ["none"]) == {"none": {}}
+
+
+def test_registration_errors(registry):
+    with pytest.raises(ValueError, match="already registered"):
+        registry.lookup("share")(lambda save, tag_id: None)
+    with pytest.raises(ValueError, match="already registered"):
+        registry.lookup(SAVE)(lambda save, tag_id: None)
+    with pytest.raises(ValueError, match="needs 'later'"):
+        registry.metric("toy", inputs=("later",), name="early")(lambda later: {})
+
+    for keys, prefixes in ((("share",), ()), (("double_1",), ()), ((), ("double_x",)), ((), ("doub",))):
+        with pytest.raises(ValueError, match="also returned by metric"):
+            registry.metric("other", keys=keys, prefixes=prefixes, name="clash")(lambda save, tag_id: {})
+    assert "clash" not in registry.nodes
+
+
+def test_returned_keys_are_checked(registry):
+    registry.metric("other", inputs=(TAG_ID,), keys=("one",), name="sneaky")(lambda tag_id: {"two": 2})
+    with pytest.raises(ValueError, match="returned 'two'"):
+        registry.plan(["sneaky"]).compute({}, ["1"])
+
+    # functions not in the registry are not declared, but they cannot overwrite another metric
+    with pytest.raises(ValueError, match="also returned by metric"):
+        registry.plan(["get_share", lambda data, tag_id: {"share": 0}]).compute({"x": 1}, ["1"])
+
+
+def test_group_follows_its_members(registry):
+    get_toy = next(iter(registry.group_functions))
+
+    assert [node.name for node in registry.resolve([get_toy])] == ["get_share"]
+    registry.members.append(registry.nodes["get_double"].fn)
+    assert [node.name for node in registry.resolve([get_toy, "get_share"])] == ["get_share", "get_double"]
+
+    registry.members.append(lambda country: {})
+    with pytest.raises(ValueError, match="not a registered metric"):
+        registry.resolve([get_toy])
+    with pytest.raises(ValueError, match="not a registered metric or group"):
+        registry.resolve(["missing"])
+
+
+def test_default_registry_selections():
+    economy = REGISTRY.plan([get_economy])
+
+    assert [node.fn for node in economy.metrics] == ECONOMY_FN
+    assert economy.fields == {"country_manager"}
+    assert [node.name for node in REGISTRY.plan(["economy", get_budget]).metrics] == [node.name for node in economy.metrics]
+    assert REGISTRY.plan([get_economy, lambda data, tag_id: {}]).fields is None
+
+
+def test_graph_gives_the_same_table(saves_folder):
+    data = manage_parsing(*read(saves_folder / "c_1850.v3"))
+    metrics_fn = [get_adm, get_economy, get_population, get_buildings]
+    full = validate_save(data, TAGS)
+    projected = validate_save(data, TAGS, metric_plan(metrics_fn).fields)
+
+    date, table = SaveMetrics(projected, TAGS, metrics_fn).to_dataframe()
+    full_date, full_table = SaveMetrics(full, TAGS, metrics_fn).to_dataframe()
+
+    assert date == full_date
+    pd.testing.assert_frame_equal(table, full_table)
+    for tag in TAGS:    # same values as the main function of the module, called on its own
+        economy = get_economy(full, tag)
+        assert table.loc[tag, list(economy)].to_dict() == pytest.approx(economy)
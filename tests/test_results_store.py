@@ -0,0 +1,147 @@
+"""
+The results store keeps the metrics of every save in SQLite: a stored table loads back as it was,
+a run with the same database only processes new or changed saves, and the metric tables are read
+back from it like the tables of the Orchestrator.
+"""
+
+import sqlite3
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader import orchestrator
+from vic3_reader.metrics import get_adm, get_economy
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.results_store import ResultsStore
+
+TAGS = {"1", "3"}
+RUN = {"tags": ["1", "3"], "metrics": ["get_adm"]}
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(tmp_path / "db" / "results.sqlite") as store:
+        yield store
+
+
+@pytest.fixture
+def table():
+    """ A metrics table with every kind of column, missing values and a column without values. """
+    return pd.DataFrame(
+        {
+            "float": [1.5, np.nan, 3.0],
+            "int": [1, 2, 3],
+            "bool": [True, False, True],
+            "text": pd.Series(["GBR", None, "RUS"], index=["1", "3", "7"], dtype=object),
+            "empty": [np.nan, np.nan, np.nan],
+        },
+        index=pd.Index(["1", "3", "7"], name="tag_id"),
+    )
+
+
+def count_parses(monkeypatch):
+    parsed = []
+    manage_parsing = orchestrator.manage_parsing
+
+    def counted(extension, text, *args, **kwargs):
+        parsed.append(extension)
+        return manage_parsing(extension, text, *args, **kwargs)
+
+    monkeypatch.setattr(orchestrator, "manage_parsing", counted)
+    return parsed
+
+
+def test_round_trip(store, table, saves_folder):
+    save = saves_folder / "a_1836.v3"
+    game_date = pd.Timestamp("1836-01-01").date()
+
+    store.store(game_date, table, save, RUN)
+
+    loaded_date, loaded, path = store.load(save, RUN)
+    assert (loaded_date, path) == (game_date, save)
+    pd.testing.assert_frame_equal(loaded, table)
+    assert store.metrics() == ["float", "int", "bool", "text"]     # 'empty' has no stored values
+
+
+def test_load_only_the_same_save_and_run(store, table, saves_folder):
+    save = saves_folder / "a_1836.v3"
+    store.store(pd.Timestamp("1836-01-01").date(), table, save, RUN)
+
+    assert store.load(saves_folder / "b_1840.v3", RUN) is None
+    assert store.load(save, {**RUN, "tags": ["1"]}) is None
+
+    write_save(save, 1837)
+    assert store.load(save, RUN) is None
+
+    save.unlink()
+    assert store.load(save, RUN) is None
+
+
+def test_store_replaces_the_save(store, table, saves_folder):
+    save = saves_folder / "a_1836.v3"
+    store.store(pd.Timestamp("1836-01-01").date(), table, save, RUN)
+    store.store(pd.Timestamp("1836-01-01").date(), table[["int"]] * 10, save, RUN)
+
+    assert store.metrics() == ["int"]
+    assert store.long_df()["int"].tolist() == [10, 20, 30]
+    assert len(store.saves()) == 1
+    assert store.remove(save) and not store.remove(save)
+    assert store.metrics() == []
+
+
+def test_tables_equal_the_orchestrator(saves_folder, tmp_path):
+    run = Orchestrator(saves_folder, TAGS, [get_adm, get_economy], results_db=tmp_path / "results.sqlite")
+    store = run.results_store
+
+    pd.testing.assert_frame_equal(store.long_df(), run.metrics_df.sort_index(), check_dtype=False)
+    assert (store.long_df().dtypes == run.metrics_df.dtypes).drop("TAG").all()
+    pd.testing.assert_frame_equal(store.pivot("gpd"), run.metrics_df["gpd"].unstack())
+    pd.testing.assert_frame_equal(store.pivot("gpd", tags=[1]), run.metrics_df["gpd"].unstack()[["1"]])
+    pd.testing.assert_frame_equal(
+        store.long_df(["money", "infamy"], tags=["3"]),
+        run.metrics_df.xs("3", level="tag_id", drop_level=False)[["money", "infamy"]],
+    )
+    with pytest.raises(KeyError, match="'missing' is not a metric"):
+        store.pivot("missing")
+
+
+def test_restart_only_processes_new_saves(saves_folder, tmp_path, monkeypatch):
+    db = tmp_path / "results.sqlite"
+    first = Orchestrator(saves_folder, TAGS, [get_adm], results_db=db)
+    first.results_store.close()
+    write_save(saves_folder / "d_1860.v3", 1860)
+    write_save(saves_folder / "b_1840.v3", 1841)
+    parsed = count_parses(monkeypatch)
+
+    second = Orchestrator(saves_folder, TAGS, [get_adm], results_db=db)
+
+    assert len(parsed) == 2
+    assert sorted(path.name for path in second.resumed_files) == ["a_1836.v3", "c_1850.v3"]
+    pd.testing.assert_frame_equal(second.results_store.long_df(), second.metrics_df.sort_index(), check_dtype=False)
+
+    Orchestrator(saves_folder, {"1"}, [get_adm], results_db=db)
+    assert len(parsed) == 2 + 4     # other tags: every save again
+
+
+def test_database_without_layout(tmp_path, table, saves_folder):
+    path = tmp_path / "old.sqlite"
+    with ResultsStore(path) as store:
+        store.store(pd.Timestamp("1836-01-01").date(), table, saves_folder / "a_1836.v3", RUN)
+    with sqlite3.connect(path) as connection:
+        connection.execute("ALTER TABLE saves DROP COLUMN layout")     # created before the layout was stored
+
+    with ResultsStore(path) as store:
+        _, loaded, _ = store.load(saves_folder / "a_1836.v3", RUN)
+
+    # without the layout, the dtypes are inferred from the values
+    assert list(loaded.columns) == ["float", "int", "bool", "text"]
+    pd.testing.assert_frame_equal(loaded[["float", "int", "bool"]], table[["float", "int", "bool"]], check_dtype=False)
+    assert loaded["text"].isna().tolist() == [False, True, False]
@@ -0,0 +1,178 @@
+"""
+SaveServer keeps parsed saves in memory: queries must give the same results as reading the
+save again, and clients are answered in parallel.
+"""
+
+import threading
+import time
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader import server
+from vic3_reader.metrics import get_adm, get_population
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.server import SaveCache, SaveClient, SaveServer
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+# ─── Cache ──────────────────────────────────────────────────────────────────
+
+def test_cache_removes_least_recently_used():
+    cache = SaveCache(max_entries=2)
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_load(key, lambda: (key, 1.0))
+
+    assert [key for key, _ in cache.snapshot()] == ["a", "c"]
+    assert cache.stats == {"hits": 1, "misses": 3, "evicted": 1}
+
+
+def test_cache_estimated_memory_keeps_the_last_entry():
+    cache = SaveCache(estimated_memory_mb=10)
+    cache.get_or_load("a", lambda: ("a", 6.0))
+    cache.get_or_load("b", lambda: ("b", 6.0))
+    assert [key for key, _ in cache.snapshot()] == ["b"]
+
+    assert cache.get_or_load("big", lambda: ("big", 50.0)) == "big"
+    assert [key for key, _ in cache.snapshot()] == ["big"]
+
+
+def test_cache_loads_a_key_once_and_other_keys_in_parallel():
+    cache = SaveCache()
+    both_loading = threading.Barrier(2, timeout=5)
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        if key != "same":
+            both_loading.wait()     # breaks if the other key waits for this one
+        time.sleep(0.05)
+        return key, 1.0
+
+    threads = [threading.Thread(target=cache.get_or_load, args=(key, lambda key=key: load(key)))
+               for key in ("same", "same", "same", "x", "y")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(loads) == ["same", "x", "y"]
+    assert not both_loading.broken
+
+
+def test_failed_load_is_not_cached():
+    cache = SaveCache()
+    with pytest.raises(KeyError):
+        cache.get_or_load("a", lambda: {}["missing"])
+    assert cache.get_or_load("a", lambda: ("a", 1.0)) == "a"
+
+
+# ─── Queries ────────────────────────────────────────────────────────────────
+
+def sorted_df(df):
+    return df.sort_index().sort_index(axis=1)
+
+
+def test_metrics_equal_orchestrator(saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    expected = Orchestrator(saves_folder, {"1", "3"}, [get_adm, get_population]).metrics_df
+    save_server = SaveServer()
+
+    for _ in range(2):  # parsed, then from memory
+        df = save_server.metrics(saves, {"1", "3"}, [get_adm, "population"])
+        pd.testing.assert_frame_equal(sorted_df(df), sorted_df(expected))
+    assert save_server.stats()["hits"] == 3
+
+
+def test_overwritten_save_is_read_again(tmp_path):
+    save = write_save(tmp_path / "save.v3", 1836)
+    save_server = SaveServer()
+    assert save_server.get(save, "date") == "1836.1.1"
+
+    time.sleep(0.01)
+    write_save(save, 1840)
+    assert save_server.get(save, "date") == "1840.1.1"
+
+
+def test_get_and_keys(saves_folder):
+    save = saves_folder / "a_1836.v3"
+    save_server = SaveServer(max_entries=1)
+
+    assert save_server.get(save, "country_manager.database.1.budget.credit") == 1000.5
+    assert "pops" in save_server.keys(save)
+    assert save_server.keys(save, "states.database")[:2] == ["0", "1"]
+    with pytest.raises(KeyError):
+        save_server.get(save, "country_manager.database.1.missing")
+    assert len(save_server.stats()["entries"]) == 1
+
+
+def test_stats_report_the_estimate(saves_folder):
+    save_server = SaveServer()
+    save_server.get(saves_folder / "a_1836.v3", "pops")
+
+    stats = save_server.stats()
+    assert stats["estimated_memory_mb"] == pytest.approx(sum(entry["mb"] for entry in stats["entries"]), abs=0.1)
+    assert save_server.evict() == 1
+
+
+# ─── Client ─────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def running_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "KEY_PATH", tmp_path / "server.key")
+    address = str(tmp_path / "server.sock")
+    save_server = SaveServer(address)
+    thread = threading.Thread(target=save_server.serve_forever, daemon=True)
+    thread.start()
+    while not (tmp_path / "server.sock").exists():
+        time.sleep(0.01)
+    yield save_server
+    save_server.shutdown()
+    thread.join(timeout=5)
+
+
+def test_clients_are_answered_in_parallel(running_server, saves_folder, monkeypatch):
+    save, other = sorted(saves_folder.glob("*.v3"))[:2]
+    started, release = threading.Event(), threading.Event()
+    parse = running_server._parse
+
+    def slow_parse(path, sections):
+        if path.name == save.name:
+            started.set()
+            release.wait(timeout=5)
+        return parse(path, sections)
+
+    monkeypatch.setattr(running_server, "_parse", slow_parse)
+
+    with SaveClient(running_server.address) as slow, SaveClient(running_server.address) as fast:
+        result = []
+        thread = threading.Thread(target=lambda: result.append(slow.get(save, "date")))
+        thread.start()
+        assert started.wait(timeout=5)
+
+        # answered while the other save is still loading
+        assert fast.get(other, "date") == "1840.1.1"
+        assert fast.stats()["misses"] == 1
+
+        release.set()
+        thread.join(timeout=5)
+        assert result == ["1836.1.1"]
+
+
+def test_client_queries_and_errors(running_server, saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    with SaveClient(running_server.address) as client:
+        df = client.metrics(saves, ["GER", "1"], ["adm"])
+        assert set(df.index.get_level_values("tag_id")) == {"1", "5"}
+
+        with pytest.raises(KeyError):
+            client.get(saves[0], "missing_section")
+        with pytest.raises(ValueError, match="Unknown command"):
+            client._call("drop_everything")
+        assert client.get(saves[0], "date") == "1836.1.1"   # the connection is still usable
@@ -0,0 +1,106 @@
+"""
+The TagIndex resolves 3 letter tags and player names to the tag id of each save, scanning
+each save from the text the Orchestrator already read to parse it.
+"""
+
+from datetime import date
+from pathlib import Path
+import json
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader import orchestrator
+from vic3_reader.metrics import get_adm
+from vic3_reader.metrics.tags_and_players import TagIndex, scan_save_tags
+from vic3_reader.orchestrator import Orchestrator
+from vic3_reader.parser import reader
+from vic3_reader.parser.reader import manage_parsing, read
+
+
+@pytest.fixture(autouse=True)
+def no_warnings():
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    """ Number of times each file is read, by name. """
+    reads = {}
+
+    def counted_read(path):
+        reads[path.name] = reads.get(path.name, 0) + 1
+        return read(path)
+
+    monkeypatch.setattr(reader, "read", counted_read)
+    monkeypatch.setattr(orchestrator, "read", counted_read)
+    return reads
+
+
+def run(folder, tags, **kwargs):
+    return Orchestrator(folder, set(tags), [get_adm], **kwargs)
+
+
+def test_history_and_resolve(saves_folder):
+    saves = sorted(saves_folder.glob("*.v3"))
+    index = TagIndex.from_files(saves)
+
+    assert index.history("5") == [(date(1836, 1, 1), "PRU"), (date(1840, 1, 1), "PRU"), (date(1850, 1, 1), "GER")]
+    assert index.resolve("GER", saves[0]) == "5"     # before it is formed, from the closest save
+    assert index.resolve("bob", saves[0]) == "9"
+    assert index.resolve("17", saves[0]) == "17"
+    assert index.resolve("XXX", saves[0]) is None
+
+
+def test_each_save_is_read_once(saves_folder, count_reads):
+    named = run(saves_folder, {"GBR", "alice"}).metrics_df
+
+    assert count_reads == {path.name: 1 for path in saves_folder.glob("*.v3")}
+    pd.testing.assert_frame_equal(named, run(saves_folder, {"1", "5"}).metrics_df)
+
+
+def test_other_saves_are_scanned_when_a_tag_is_missing(saves_folder, count_reads):
+    named = run(saves_folder, {"GER"})
+
+    assert sum(count_reads.values()) == 3 + 2   # GER is not in the first save, the other two are scanned for it
+    assert named.tag_index.pending == set()
+    pd.testing.assert_frame_equal(named.metrics_df, run(saves_folder, {"5"}).metrics_df)
+
+
+def test_prefetched_saves_are_scanned(saves_folder, count_reads):
+    named = run(saves_folder, {"GBR", "bob"}, prefetch_files=2).metrics_df
+
+    assert count_reads == {path.name: 1 for path in saves_folder.glob("*.v3")}
+    pd.testing.assert_frame_equal(named, run(saves_folder, {"1", "9"}).metrics_df)
+
+
+def test_save_that_cannot_be_scanned_is_skipped(saves_folder):
+    (saves_folder / "broken.v3").write_text("date=1845.1.1\n", encoding='utf-8')
+
+    named = run(saves_folder, {"alice"})
+
+    assert [(Path(error.path).name, error.stage) for error in named.errors] == [("broken.v3", "tags")]
+    assert len(named.metrics_df) == 3
+
+
+def test_json_country_without_definition_is_skipped(saves_folder, tmp_path):
+    data = manage_parsing(*read(saves_folder / "a_1836.v3"))
+    data.pop("file coding")
+    del data["country_manager"]["database"]["3"]["definition"]
+    cache = tmp_path / "save.json"
+    cache.write_text(json.dumps(data), encoding='utf-8')
+
+    tags = scan_save_tags(cache)
+
+    assert tags.definitions == {"1": "GBR", "4": "FRA", "5": "PRU", "9": "USA"}
+    assert tags.players == {"alice": "5", "bob": "9"}
+
+
+def test_already_read_content_is_scanned(saves_folder, count_reads):
+    path = saves_folder / "a_1836.v3"
+    content = read(path)
+
+    assert scan_save_tags(path, content) == scan_save_tags(write_save(saves_folder / "copy.v3", 1836))
+    assert "a_1836.v3" not in count_reads
@@ -0,0 +1,98 @@
+"""
+A trusted cache rebuilds a validated save without validating it again, and is ignored
+when the save, the tags, the fields or the cache file change.
+"""
+
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import write_save
+from vic3_reader import orchestrator
+from vic3_reader.metrics import get_adm, get_buildings, get_population
+from vic3_reader.orchestrator import Orchestrator, SaveMetrics, metric_plan, validate_save
+from vic3_reader.parser import trusted_cache
+from vic3_reader.parser.reader import manage_parsing, read
+from vic3_reader.parser.trusted_cache import load_trusted, nominate_trusted_cache, save_trusted
+
+TAGS = {"1", "3"}
+METRICS = [get_adm, get_population, get_buildings]
+
+
+@pytest.fixture(autouse=True)
+def signing_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(trusted_cache, "KEY_PATH", tmp_path / "keys" / "trusted_cache.key")
+    warnings.simplefilter("ignore")
+
+
+@pytest.fixture
+def save(saves_folder):
+    return saves_folder / "a_1836.v3"
+
+
+def validated(path, fields):
+    return validate_save(manage_parsing(*read(path)), TAGS, fields)
+
+
+def metrics_of(save):
+    return SaveMetrics(save, TAGS, METRICS).to_dataframe()[1]
+
+
+@pytest.mark.parametrize("fields", [None, metric_plan(METRICS).fields])
+def test_round_trip(save, fields):
+    original = validated(save, fields)
+    expected = metrics_of(original)
+    save_trusted(save, original, TAGS, fields)
+
+    rebuilt = load_trusted(save, TAGS, fields)
+
+    assert rebuilt is not None
+    assert set(rebuilt.country_manager.database) == TAGS
+    pd.testing.assert_frame_equal(metrics_of(rebuilt), expected)
+
+
+def test_stale_cache_is_ignored(save):
+    fields = metric_plan(METRICS).fields
+    save_trusted(save, validated(save, fields), TAGS, fields)
+
+    assert load_trusted(save, {"1"}, fields) is None
+    assert load_trusted(save, TAGS, None) is None
+
+    write_save(save, 1837)
+    assert load_trusted(save, TAGS, fields) is None
+
+
+@pytest.mark.parametrize("edit, tags", [
+    (lambda header, payload: (header, payload[:-1] + bytes([payload[-1] ^ 1])), TAGS),
+    (lambda header, payload: (header.replace(b'["1", "3"]', b'["1", "4"]'), payload), {"1", "4"}),
+    (lambda header, payload: (b"not json\n", payload), TAGS),
+])
+def test_modified_cache_is_ignored(save, edit, tags):
+    save_trusted(save, validated(save, None), TAGS)
+    cache = nominate_trusted_cache(save)
+    header, payload = cache.read_bytes().split(b"\n", 1)
+
+    header, payload = edit(header + b"\n", payload)
+    cache.write_bytes(header + payload)
+
+    assert load_trusted(save, tags) is None
+
+
+def test_other_key_is_not_trusted(save, tmp_path, monkeypatch):
+    save_trusted(save, validated(save, None), TAGS)
+    monkeypatch.setattr(trusted_cache, "KEY_PATH", tmp_path / "other.key")
+
+    assert load_trusted(save, TAGS) is None
+
+
+def test_orchestrator_skips_validation(saves_folder, monkeypatch):
+    first = Orchestrator(saves_folder, TAGS, METRICS, trusted_cache=True)
+    validations = []
+    monkeypatch.setattr(orchestrator, "validate_save", lambda *args: validations.append(args))
+
+    second = Orchestrator(saves_folder, TAGS, METRICS, trusted_cache=True)
+
+    assert validations == []
+    assert second.cache_stats["hits"] == 3
+    pd.testing.assert_frame_equal(second.metrics_df, first.metrics_df)